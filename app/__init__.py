@@ -33,6 +33,7 @@ def create_app():
         UPLOAD_FOLDER=os.path.join(app.root_path, "static", "uploads"),
         STRIPE_SECRET_KEY=os.getenv("STRIPE_SECRET_KEY"),
         STRIPE_PUBLISHABLE_KEY=os.getenv("STRIPE_PUBLISHABLE_KEY"),
+        PAGE_CACHE_URL=os.getenv("PAGE_CACHE_URL", "memory://"),
     )
 
     # Inizializza estensioni
@@ -95,6 +96,41 @@ def create_app():
     app.register_blueprint(lang_bp)
     app.register_blueprint(petitions_bp)
 
+    # Registro delle colonne per modello (letto dai blueprint al posto dell'introspezione)
+    from app.utils.schema import init_schema
+    init_schema(app)
+
+    # Indice di ricerca full-text (hook dei modelli + `flask search reindex`)
+    from app.utils.search import init_search
+    init_search(app)
+
+    # Geohash dei modelli geolocalizzati (hook + `flask geo backfill`)
+    from app.utils.geo import init_geo
+    init_geo(app)
+
+    # Tabella event_skill allineata a Event.skills
+    from app.utils.skills import register_skill_hooks
+    register_skill_hooks()
+
+    # Chiave di ordinamento dei nomi (elenco A-Z delle associazioni)
+    from app.utils.associations import register_name_key_hooks
+    register_name_key_hooks()
+
+    # Cache delle pagine pubbliche (invalidata ai commit che toccano le tabelle da cui dipendono)
+    from app.utils.cache import init_cache
+    init_cache(app)
+
+    # Comandi CLI di manutenzione (`flask applause reconcile`, `flask participation reconcile`, `flask receipts build`)
+    from app.utils.applause import applause_cli
+    app.cli.add_command(applause_cli)
+    from app.utils.participation import participation_cli
+    app.cli.add_command(participation_cli)
+    from app.utils.receipts import receipts_cli
+    app.cli.add_command(receipts_cli)
+
+    # Badge notifiche nella navbar (COUNT indicizzato in cache)
+    from app.utils.notifications import notifications_context
+    app.context_processor(notifications_context)
 
     # Homepage
     @app.route("/")
@@ -1,6 +1,6 @@
 # app/blueprints/associations/routes.py
 
-from flask import Blueprint, render_template, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, request
 from flask_login import login_required, current_user
 from app import db
 
@@ -9,6 +9,8 @@ from app.database.models.user import User
 from app.database.models.post import Post
 from app.database.models.event import Event
 from app.database.models.campaign import Campaign
+from app.utils.applause import applauded_by_current_user
+from app.utils.associations import ALPHABET, associations_page
 
 associations_bp = Blueprint("associations", __name__, url_prefix="/associations")
 
@@ -17,12 +19,17 @@ associations_bp = Blueprint("associations", __name__, url_prefix="/associations"
 @associations_bp.route("/associazioni")
 @login_required
 def list_associations():
-    associations = (
-        User.query.filter_by(user_type="association")
-        .order_by(User.name.asc())
-        .all()
+    letter = (request.args.get("letter") or "").upper()
+    letter = letter if letter in ALPHABET else None
+    associations, followers, next_cursor = associations_page(cursor=request.args.get("cursor"), letter=letter)
+    return render_template(
+        "pages/associations_list.html",
+        associations=associations,
+        follower_counts=followers,
+        next_cursor=next_cursor,
+        letter=letter,
+        alphabet=ALPHABET,
     )
-    return render_template("pages/associations_list.html", associations=associations)
 
 
 # ➕ Segui un'associazione (solo volontari)
@@ -98,6 +105,7 @@ def public_profile(association_id: int):
         events=events,
         posts=posts,
         campaigns=campaigns,
+        applauded_post_ids=applauded_by_current_user(posts),
     )
 
 
@@ -121,10 +129,7 @@ def detail(content_type: str, item_id: int):
     capacity = None
     if content_type == "event":
         total_seats = item.capacity_max  # None -> illimitati
-        try:
-            accepted_count = len([p for p in item.participants if getattr(p, "status", "accepted") == "accepted"])
-        except Exception:
-            accepted_count = len(getattr(item, "participants", []) or [])
+        accepted_count = item.accepted_count
         seats_left = (total_seats - accepted_count) if total_seats is not None else None
         is_full = (total_seats is not None and seats_left is not None and seats_left <= 0)
         capacity = {
@@ -1,8 +1,20 @@
-from flask import Blueprint, jsonify, render_template, abort
+from flask import Blueprint, jsonify, render_template, abort, request
 from flask_login import login_required, current_user
 from app import db
 from app.database.models.user import User
 from app.database.models.chat import Chat
+from app.utils.chats import (
+    CONVERSATIONS_MAX_PAGE_SIZE,
+    CONVERSATIONS_PAGE_SIZE,
+    MESSAGES_PAGE_SIZE,
+    chat_between,
+    conversations_page,
+    get_or_create_chat,
+    messages_page,
+    publish_message,
+    send_message,
+)
+from app.blueprints.notifications.routes import notifications_stream
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/chat")
 
@@ -30,26 +42,48 @@ def start_chat(user_id):
 
 
 # API → lista conversazioni dell’utente loggato (usata da chat.html via JS)
+# Servita anche come /public/api/conversations (stessa view, vedi public/routes.py)
 @chat_bp.route("/api/conversations")
 @login_required
 def list_conversations():
-    chats = Chat.query.filter(
-        (Chat.user1_id == current_user.id) | (Chat.user2_id == current_user.id)
-    ).all()
-
-    results = []
-    for c in chats:
-        other_id = c.user2_id if c.user1_id == current_user.id else c.user1_id
-        other = User.query.get(other_id)
-        if not other:
-            continue
-        results.append({
-            "id": other.id,
-            "name": other.name,
-            "photo": (
-                f"/static/uploads/profile-photo/{other.photo_filename}"
-                if other.photo_filename else "/static/img/avatar-placeholder.png"
-            ),
-        })
-
-    return jsonify(results)
+    limit = min(max(request.args.get("limit", CONVERSATIONS_PAGE_SIZE, type=int), 1), CONVERSATIONS_MAX_PAGE_SIZE)
+    items, next_cursor = conversations_page(current_user.id, cursor=request.args.get("cursor"), limit=limit)
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+# API → cronologia dei messaggi con un utente, a ritroso (cursore = id del messaggio più vecchio ricevuto)
+@chat_bp.route("/api/conversations/<int:other_id>/messages", methods=["GET"])
+@login_required
+def list_messages(other_id):
+    chat = chat_between(current_user.id, other_id)
+    if not chat:
+        return jsonify({"items": [], "next_cursor": None})
+
+    limit = min(max(request.args.get("limit", MESSAGES_PAGE_SIZE, type=int), 1), 200)
+    items, next_cursor = messages_page(chat.id, before_id=request.args.get("cursor", type=int), limit=limit)
+    return jsonify({"items": [m.to_dict() for m in items], "next_cursor": next_cursor})
+
+
+# API → invio di un messaggio (crea la chat se non esiste ancora)
+@chat_bp.route("/api/conversations/<int:other_id>/messages", methods=["POST"])
+@login_required
+def post_message(other_id):
+    data = request.get_json(silent=True) or request.form
+    content = (data.get("content") or "").strip()
+    if not content:
+        return jsonify({"error": "Messaggio vuoto."}), 400
+    if other_id == current_user.id:
+        return jsonify({"error": "Non puoi chattare con te stesso."}), 400
+    User.query.get_or_404(other_id)
+
+    chat = get_or_create_chat(current_user.id, other_id)
+    msg = send_message(chat, current_user.id, content)
+    db.session.commit()
+
+    # 📡 Push agli stream aperti dei due utenti (dopo il commit: chi riceve può già rileggerlo)
+    publish_message(chat, msg)
+    return jsonify(msg.to_dict()), 201
+
+
+# 📡 Stream SSE dell'utente (stessa view di notifications.notifications_stream, vecchio URL)
+chat_bp.add_url_rule("/stream", endpoint="stream", view_func=notifications_stream)
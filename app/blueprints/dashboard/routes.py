@@ -14,6 +14,10 @@ from app.database.models.report import Report
 from app.database.models.donation import Donation
 from app.database.models.participation import Participation
 from app.database.models.petition import Petition
+from app.database.loaders import loader_options
+from app.utils.applause import applauded_by_current_user
+from app.utils.matching import suggested_events
+from app.utils.receipts import annual_archive_years
 
 
 
@@ -38,6 +42,7 @@ os.makedirs(UPLOAD_FOLDER_PROFILE_PHOTO, exist_ok=True)
 def _get_user_donations(user_id: int):
     return (
         Donation.query
+        .options(*loader_options("donation.campaign"))
         .filter(Donation.user_id == user_id)
         .order_by(Donation.created_at.desc())
         .all()
@@ -91,6 +96,7 @@ def dashboard_volunteer():
     participations = (
         Participation.query
         .join(Event)
+        .options(*loader_options("participation.event_joined"))
         .filter(Participation.volunteer_id == current_user.id)
         .order_by(Event.date.desc())
         .all()
@@ -133,6 +139,7 @@ def dashboard_volunteer():
         participations=upcoming_participations,
         activities=activities,
         history_items=history_items,
+        suggested_events=suggested_events(current_user),
     )
 
 
@@ -170,6 +177,7 @@ def dashboard_association():
     # 💰 Donazioni ricevute (restano nella tab Donazioni, non nello Storico)
     donations = (
         Donation.query.join(Campaign, Donation.campaign_id == Campaign.id)
+        .options(*loader_options("donation.campaign_user"))
         .filter(Campaign.association_id == current_user.id)
         .order_by(Donation.created_at.desc())
         .all()
@@ -227,10 +235,12 @@ def dashboard_association():
     return render_template(
         "pages/dashboard_association.html",
         posts=posts,
+        applauded_post_ids=applauded_by_current_user(posts),
         my_events=my_events,
         my_campaigns=my_campaigns,
         donations=donations,
         history_items=history_items,
+        annual_archive_years=annual_archive_years(current_user.id),
         now=now,
     )
 
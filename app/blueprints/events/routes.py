@@ -25,9 +25,13 @@ from app.database.models.event import Event
 from app.database.models.user import User
 from app.database.models.report import Report
 from app.database.models.campaign import Campaign
-from app.utils.feed import get_feed_items
 from app.database.models.participation import Participation
-from app.database.models.notification import Notification
+from app.utils.geo import detail_url, features_in_bbox, parse_bbox
+from app.utils.matching import suggested_volunteers
+from app.utils.notifications import notify, notify_many
+from app.utils.participation import join_waitlist, promote_waitlist, remove_participation, set_participation_status
+from app.utils.schema import has_column, is_json_column
+from app.utils.skills import skills_clause
 
 import sqlalchemy as sa
 
@@ -65,21 +69,6 @@ def _normalize(s: str) -> str:
     return "".join(ch for ch in s if not unicodedata.combining(ch))
 
 
-# ---- colonne dinamiche sull'Event -------------------------------------------
-def _event_has_col(name: str) -> bool:
-    try:
-        return name in Event.__table__.c  # type: ignore[attr-defined]
-    except Exception:
-        return False
-
-def _is_skills_json_column() -> bool:
-    if not _event_has_col("skills"):
-        return False
-    try:
-        return isinstance(Event.__table__.c.skills.type, sa.JSON)  # type: ignore[attr-defined]
-    except Exception:
-        return False
-
 def _parse_skills_from_request() -> List[str]:
     items = request.form.getlist("skills")
     if not items:
@@ -93,31 +82,43 @@ def _parse_skills_from_request() -> List[str]:
             clean.append(s)
     return clean
 
+
+# ---- colonne opzionali sull'Event (registro calcolato all'avvio) --------------
 def _coerce_skills_for_db(skills_list: List[str]):
-    if not _event_has_col("skills"):
+    if not has_column(Event, "skills"):
         return None
-    if _is_skills_json_column():
+    if is_json_column(Event, "skills"):
         return skills_list or []
     return ",".join(skills_list) if skills_list else ""
 
 def _get_duration_from_request(default: str = "temporary") -> Optional[str]:
-    if not _event_has_col("duration"):
+    if not has_column(Event, "duration"):
         return None
     val = (request.form.get("duration") or "").strip().lower()
     return val if val in {"temporary", "perennial"} else default
 
 def _get_type_from_request(default: str = "general") -> Optional[str]:
-    if not _event_has_col("type"):
+    if not has_column(Event, "type"):
         return None
     val = (request.form.get("type") or "").strip().lower()
     return val or default
 
 def _get_activity_from_request() -> Optional[str]:
-    if not _event_has_col("activity"):
+    if not has_column(Event, "activity"):
         return None
     val = (request.form.get("activity") or "").strip()
     return val or None
 
+# ---- destinatari notifiche --------------------------------------------------
+def _participant_ids(event_id: int, statuses) -> List[int]:
+    """Id dei volontari dell'evento con uno degli stati indicati (solo la colonna, niente oggetti ORM)."""
+    return db.session.execute(
+        sa.select(Participation.volunteer_id).where(
+            Participation.event_id == event_id,
+            Participation.status.in_(statuses),
+        )
+    ).scalars().all()
+
 
 # -----------------------------------------------------------------------------
 # Routes
@@ -170,7 +171,7 @@ def create_event():
             event.activity = activity  # type: ignore[attr-defined]
         if skills_value is not None:
             event.skills = skills_value  # type: ignore[attr-defined]
-        if _event_has_col("updated_at"):
+        if has_column(Event, "updated_at"):
             event.updated_at = datetime.utcnow()  # type: ignore[attr-defined]
 
         db.session.add(event)
@@ -218,11 +219,11 @@ def edit_event(event_id: int):
         event.longitude = float(lng) if lng and lng.strip() != "" else event.longitude
 
         # campi opzionali
-        duration = _get_duration_from_request(event.duration if _event_has_col("duration") else "temporary")
+        duration = _get_duration_from_request(event.duration if has_column(Event, "duration") else "temporary")
         if duration is not None:
             event.duration = duration  # type: ignore[attr-defined]
 
-        ev_type = _get_type_from_request(event.type if _event_has_col("type") else "general")
+        ev_type = _get_type_from_request(event.type if has_column(Event, "type") else "general")
         if ev_type is not None:
             event.type = ev_type  # type: ignore[attr-defined]
 
@@ -236,7 +237,7 @@ def edit_event(event_id: int):
             if coerced is not None:
                 event.skills = coerced  # type: ignore[attr-defined]
 
-        if _event_has_col("updated_at"):
+        if has_column(Event, "updated_at"):
             event.updated_at = datetime.utcnow()  # type: ignore[attr-defined]
 
         # aggiorna capacity_max
@@ -246,19 +247,16 @@ def edit_event(event_id: int):
             else:
                 event.capacity_max = None
 
-        db.session.commit()
+        # ⏫ Se la capienza è aumentata, i primi in lista d'attesa prendono i nuovi posti
+        promote_waitlist(event.id)
 
-        # 🔔 Notifica volontari (accepted o pending)
-        participations = Participation.query.filter_by(event_id=event.id).all()
-        for p in participations:
-            if p.status in ("accepted", "pending"):
-                notif = Notification(
-                    user_id=p.volunteer_id,
-                    type="event_update",
-                    message=f"L’evento '{event.title}' è stato aggiornato dall’associazione {current_user.name}.",
-                    url=url_for("events.event_detail", event_id=event.id)
-                )
-                db.session.add(notif)
+        # 🔔 Notifica volontari (accepted, pending o in lista d'attesa), nella stessa transazione dell'update
+        notify_many(
+            _participant_ids(event.id, ("accepted", "pending", "waitlisted")),
+            type="event_update",
+            message=f"L’evento '{event.title}' è stato aggiornato dall’associazione {current_user.name}.",
+            url=url_for("events.event_detail", event_id=event.id),
+        )
 
         db.session.commit()
 
@@ -297,45 +295,39 @@ def my_events():
 
 @events_bp.route("/api", methods=["GET"])
 def api_events():
-    events = Event.query.filter(
-        Event.latitude.isnot(None), Event.longitude.isnot(None)
-    ).all()
-    campaigns = Campaign.query.filter(
-        Campaign.latitude.isnot(None), Campaign.longitude.isnot(None)
-    ).all()
-
+    """
+    Eventi e campagne geolocalizzati, con i soli campi del marker.
+    Parametri opzionali: ?bbox=ovest,sud,est,nord, ?skill=...&skill=... (solo eventi
+    che richiedono una delle skills, o tutte con ?match=all).
+    """
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    skills = [s for s in request.args.getlist("skill") if s.strip()]
+    if skills:
+        # Le campagne non hanno skills: con il filtro restano solo gli eventi
+        criteria = {"event": [skills_clause(skills, match_all=request.args.get("match") == "all")]}
+        features, _ = features_in_bbox(bbox, ["event"], criteria=criteria)
+    else:
+        features, _ = features_in_bbox(bbox, ["event", "campaign"])
     payload: List[Dict[str, Any]] = []
-    for e in events:
-        payload.append(
-            {
-                "id": e.id,
-                "type": "event",
-                "name": e.title,
-                "title": e.title,
-                "latitude": e.latitude,
-                "longitude": e.longitude,
-                "description": e.description,
-                "location": e.location,
-                "image_filename": e.image_filename,
-                "url": url_for("events.event_detail", event_id=e.id),
-            }
-        )
-    for c in campaigns:
+    for f in features:
+        props = f["properties"]
+        lng, lat = f["geometry"]["coordinates"]
         payload.append(
             {
-                "id": c.id,
-                "type": "campaign",
-                "name": c.title,
-                "title": c.title,
-                "latitude": c.latitude,
-                "longitude": c.longitude,
-                "description": c.description,
-                "location": c.location,
-                "image_filename": c.image_filename,
-                "url": url_for("campaigns.campaign_detail", campaign_id=c.id),
+                "id": props["id"],
+                "type": props["type"],
+                "name": props["title"],
+                "title": props["title"],
+                "latitude": lat,
+                "longitude": lng,
+                "date": props["date"],
+                "url": detail_url(props["type"], props["id"]),
             }
         )
-
     return jsonify(payload)
 
 
@@ -383,17 +375,13 @@ def delete_event(event_id: int):
         flash("Non puoi cancellare un evento già iniziato o concluso.", "warning")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
-    # 🔔 Notifica volontari accepted o pending
-    participations = Participation.query.filter_by(event_id=event.id).all()
-    for p in participations:
-        if p.status in ("accepted", "pending"):
-            notif = Notification(
-                user_id=p.volunteer_id,
-                type="event_deleted",
-                message=f"L’evento '{event.title}' è stato cancellato dall’associazione {current_user.name}.",
-                url=url_for("home.home")
-            )
-            db.session.add(notif)
+    # 🔔 Notifica volontari accepted, pending o in lista d'attesa
+    notify_many(
+        _participant_ids(event.id, ("accepted", "pending", "waitlisted")),
+        type="event_deleted",
+        message=f"L’evento '{event.title}' è stato cancellato dall’associazione {current_user.name}.",
+        url=url_for("home.home"),
+    )
 
     # ❗ Elimina partecipazioni collegate e poi l'evento
     Participation.query.filter_by(event_id=event.id).delete()
@@ -413,11 +401,6 @@ def confirm_participation(event_id: int):
 
     event = Event.query.get_or_404(event_id)
 
-    # Controllo capienza massima
-    if event.is_full():
-        flash("⚠️ Questo evento ha già raggiunto il numero massimo di partecipanti.", "warning")
-        return redirect(url_for("events.event_detail", event_id=event_id))
-
     existing = Participation.query.filter_by(
         volunteer_id=current_user.id,
         event_id=event.id
@@ -425,18 +408,26 @@ def confirm_participation(event_id: int):
 
     if existing:
         flash("Hai già inviato una candidatura per questo evento.", "info")
+    elif event.is_full():
+        # ⏳ Evento al completo (contatore sull'evento, nessun COUNT): lista d'attesa FIFO
+        participation = join_waitlist(event.id, current_user.id)
+        db.session.commit()
+        flash(
+            f"Evento al completo: sei in lista d’attesa (posizione {participation.waitlist_position()}). "
+            "Ti avviseremo se si libera un posto.",
+            "info",
+        )
     else:
         participation = Participation(volunteer_id=current_user.id, event_id=event.id)
         db.session.add(participation)
 
         # 🔔 Notifica per l’associazione organizzatrice
-        notif = Notification(
-            user_id=event.association_id,
+        notify(
+            event.association_id,
             type="participation_request",
             message=f"{current_user.name} si è candidato all’evento '{event.title}'",
-            url=url_for("events.participants", event_id=event.id)
+            url=url_for("events.participants", event_id=event.id),
         )
-        db.session.add(notif)
 
         db.session.commit()
         flash("Candidatura inviata con successo!", "success")
@@ -462,20 +453,19 @@ def cancel(event_id: int):
     # Salviamo lo stato prima della cancellazione
     previous_status = part.status
 
-    # ✅ Cancellazione effettiva
-    db.session.delete(part)
-    db.session.commit()
+    # ✅ Cancellazione effettiva (libera il posto se era accettata)
+    remove_participation(part)
 
     # 🔔 Se era ACCEPTED, notifica all’associazione
     if previous_status == "accepted":
-        notif = Notification(
-            user_id=event.association_id,
+        notify(
+            event.association_id,
             type="participation_update",
             message=f"{current_user.name} ha annullato la propria partecipazione all’evento '{event.title}'.",
-            url=url_for("events.participants", event_id=event.id)
+            url=url_for("events.participants", event_id=event.id),
         )
-        db.session.add(notif)
-        db.session.commit()
+
+    db.session.commit()
 
     flash("Hai annullato la tua partecipazione.", "info")
     return redirect(url_for("events.event_detail", event_id=event_id))
@@ -490,7 +480,10 @@ def participants(event_id: int):
         abort(403)
 
     participations = Participation.query.filter_by(event_id=event.id).all()
-    return render_template("pages/participants.html", event=event, participations=participations)
+    suggestions = suggested_volunteers(event) if event.date >= datetime.utcnow() else []
+    return render_template(
+        "pages/participants.html", event=event, participations=participations, suggested_volunteers=suggestions
+    )
 
 
 @events_bp.route("/<int:event_id>/participants/<int:part_id>/<string:action>", methods=["POST"])
@@ -505,30 +498,31 @@ def update_participation(event_id: int, part_id: int, action: str):
     old_status = part.status  # salviamo lo stato precedente
 
     if action == "accept":
-        part.status = "accepted"
+        # Prenotazione atomica del posto: fallisce se nel frattempo l'evento si è riempito
+        if not set_participation_status(part, "accepted"):
+            flash("⚠️ Evento al completo: non ci sono più posti disponibili.", "warning")
+            return redirect(url_for("events.participants", event_id=event_id))
         flash("Volontario accettato!", "success")
 
         # notifica al volontario
-        notif = Notification(
-            user_id=part.volunteer_id,
+        notify(
+            part.volunteer_id,
             type="participation_update",
             message=f"Sei stato ACCETTATO all’evento '{event.title}'",
-            url=url_for("events.event_detail", event_id=event.id)
+            url=url_for("events.event_detail", event_id=event.id),
         )
-        db.session.add(notif)
 
     elif action == "reject":
-        part.status = "rejected"
+        set_participation_status(part, "rejected")
         flash("Volontario rifiutato.", "warning")
 
         # notifica al volontario
-        notif = Notification(
-            user_id=part.volunteer_id,
+        notify(
+            part.volunteer_id,
             type="participation_update",
             message=f"Sei stato RIFIUTATO all’evento '{event.title}'",
-            url=url_for("events.event_detail", event_id=event.id)
+            url=url_for("events.event_detail", event_id=event.id),
         )
-        db.session.add(notif)
 
     # Se cambia da accettato a rifiutato o viceversa, viene comunque intercettato qui,
     # perché aggiorniamo sempre lo stato e generiamo la notifica.
@@ -1,16 +1,22 @@
 # app/blueprints/full_map/routes.py
 from __future__ import annotations
+from datetime import datetime, time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
-from flask import Blueprint, render_template, url_for
+from flask import Blueprint, abort, jsonify, render_template, request
 from flask_login import login_required, current_user
 
-from app.database.models.event import Event
-from app.database.models.campaign import Campaign
 from app.database.models.report import Report
 from app.database.models.petition import Petition
-from sqlalchemy import and_
+from app.utils.geo import (
+    CLUSTER_MAX_ZOOM,
+    clusters_in_bbox,
+    feature_detail,
+    features_in_bbox,
+    parse_bbox,
+)
+from app.utils.schema import geo_fields
 
 # ---- Blueprint ----
 STATIC_ROOT = Path(__file__).resolve().parent.parent / "blueprints" / "static"
@@ -25,139 +31,72 @@ full_map_bp = Blueprint(
 )
 
 # ---- Helpers ----
-def _get_lat(obj) -> Optional[float]:
-    val = getattr(obj, "latitude", None)
-    if val is None:
-        val = getattr(obj, "lat", None)
-    try:
-        return float(val) if val is not None else None
-    except (TypeError, ValueError):
-        return None
-
-def _get_lng(obj) -> Optional[float]:
-    val = getattr(obj, "longitude", None)
-    if val is None:
-        val = getattr(obj, "lng", None)
-    try:
-        return float(val) if val is not None else None
-    except (TypeError, ValueError):
-        return None
-
-def _has_latlng_model_fields(model) -> str:
-    """
-    Ritorna "latlng" se il modello ha campi lat/lng,
-            "latitude_longitude" se ha latitude/longitude,
-            "" se nessuno dei due.
-    """
-    if hasattr(model, "lat") and hasattr(model, "lng"):
-        return "latlng"
-    if hasattr(model, "latitude") and hasattr(model, "longitude"):
-        return "latitude_longitude"
-    return ""
-
-# ---- Serializers ----
-def _serialize_event_for_map(e: Event) -> Dict[str, Any]:
-    return {
-        "id": e.id,
-        "title": e.title,
-        "description": e.description,
-        "date": e.date.isoformat() if getattr(e, "date", None) else None,
-        "latitude": _get_lat(e),
-        "longitude": _get_lng(e),
-        "type": "event",
-        "location": getattr(e, "location", None),
-        "image_filename": getattr(e, "image_filename", None),
-        "url": url_for("events.event_detail", event_id=e.id),
-    }
-
-def _serialize_campaign_for_map(c: Campaign) -> Dict[str, Any]:
-    return {
-        "id": c.id,
-        "title": c.title,
-        "description": c.description,
-        "date": c.created_at.isoformat() if getattr(c, "created_at", None) else None,
-        "latitude": _get_lat(c),
-        "longitude": _get_lng(c),
-        "type": "campaign",
-        "location": getattr(c, "location", None),
-        "image_filename": getattr(c, "image_filename", None),
-        "url": url_for("campaigns.campaign_detail", campaign_id=c.id),
-    }
-
-def _serialize_report_for_map(r: Report) -> Dict[str, Any]:
-    return {
-        "id": r.id,
-        "title": r.title,
-        "description": r.description,
-        "date": r.created_at.isoformat() if getattr(r, "created_at", None) else None,
-        "latitude": _get_lat(r),
-        "longitude": _get_lng(r),
-        "type": "report",
-        "location": getattr(r, "location", None),
-        "image_filename": getattr(r, "image_filename", None),
-        "url": url_for("public.detail", content_type="report", item_id=r.id),
-    }
-
-def _serialize_petition_for_map(p: Petition) -> Dict[str, Any]:
-    return {
-        "id": p.id,
-        "title": p.title,
-        "description": p.description,
-        "date": p.created_at.isoformat() if getattr(p, "created_at", None) else None,
-        "latitude": _get_lat(p),       # normalizzato a float
-        "longitude": _get_lng(p),      # normalizzato a float
-        "type": "petition",
-        "location": getattr(p, "location", None),
-        "image_filename": getattr(p, "image_filename", None),
-        "url": url_for("petitions.petition_detail", petition_id=p.id),
-    }
+def _allowed_types() -> List[str]:
+    """Tipi visibili all'utente corrente (segnalazioni: solo associazioni)."""
+    types = ["event", "campaign"]
+    if getattr(current_user, "user_type", None) == "association" and geo_fields(Report) == "latitude_longitude":
+        types.append("report")
+    if geo_fields(Petition) == "latitude_longitude":
+        types.append("petition")
+    return types
+
+def _parse_date(raw: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(raw) if raw else None
 
 # ---- Routes ----
 @full_map_bp.route("/", methods=["GET"])
 @login_required
 def full_map():
-    # Eventi e campagne: sempre geolocalizzati
-    events = Event.query.filter(
-        Event.latitude.isnot(None), Event.longitude.isnot(None)
-    ).all()
-    campaigns = Campaign.query.filter(
-        Campaign.latitude.isnot(None), Campaign.longitude.isnot(None)
-    ).all()
+    # I dati arrivano da /map/api/features in base all'area visibile
+    return render_template("pages/full_map.html")
 
-    # --- REPORT: SOLO associazioni ---
-    if getattr(current_user, "user_type", None) == "association":
-        reports_fieldset = _has_latlng_model_fields(Report)
-        if reports_fieldset == "latitude_longitude":
-            reports = Report.query.filter(
-                Report.latitude.isnot(None), Report.longitude.isnot(None)
-            ).all()
-        elif reports_fieldset == "latlng":
-            reports = Report.query.filter(
-                Report.lat.isnot(None), Report.lng.isnot(None)
-            ).all()
-        else:
-            reports = []  # nessun campo coord nel modello
-    else:
-        reports = []  # volontari: nessuna segnalazione
 
-    # --- PETIZIONI: SEMPRE visibili (ma devono essere geolocalizzate) ---
-    petitions_fieldset = _has_latlng_model_fields(Petition)
-    if petitions_fieldset == "latitude_longitude":
-        petitions = Petition.query.filter(
-            Petition.latitude.isnot(None), Petition.longitude.isnot(None)
-        ).all()
-    elif petitions_fieldset == "latlng":
-        petitions = Petition.query.filter(
-            Petition.lat.isnot(None), Petition.lng.isnot(None)
-        ).all()
+@full_map_bp.route("/api/features", methods=["GET"])
+@login_required
+def api_features():
+    """
+    GeoJSON delle feature nel riquadro visibile:
+    ?bbox=ovest,sud,est,nord&zoom=12&types=event,campaign[&q=...&from=YYYY-MM-DD&to=YYYY-MM-DD]
+    Sotto CLUSTER_MAX_ZOOM le feature sono cluster (properties.cluster=true) o punti isolati.
+    """
+    allowed = _allowed_types()
+    requested = [t for t in (request.args.get("types") or "").split(",") if t]
+    types = [t for t in requested if t in allowed] if requested else allowed
+
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+        zoom = request.args.get("zoom", type=int)
+        date_from = _parse_date(request.args.get("from"))
+        date_to = _parse_date(request.args.get("to"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if date_to is not None and date_to.time() == time.min:
+        date_to = datetime.combine(date_to.date(), time.max)
+
+    filters = dict(date_from=date_from, date_to=date_to, q=(request.args.get("q") or "").strip())
+
+    # Zoom basso: cluster a griglia calcolati nel DB invece di migliaia di marker
+    clustered = zoom is not None and zoom < CLUSTER_MAX_ZOOM
+    if clustered:
+        features, truncated = clusters_in_bbox(bbox, max(zoom, 0), types, **filters), False
     else:
-        petitions = []  # modello senza coord: non passiamo petizioni
+        features, truncated = features_in_bbox(bbox, types, **filters)
 
-    return render_template(
-        "pages/full_map.html",
-        events=[_serialize_event_for_map(e) for e in events],
-        campaigns=[_serialize_campaign_for_map(c) for c in campaigns],
-        reports=[_serialize_report_for_map(r) for r in reports],
-        petitions=[_serialize_petition_for_map(p) for p in petitions],
-    )
+    return jsonify({
+        "type": "FeatureCollection",
+        "features": features,
+        "zoom": zoom,
+        "clustered": clustered,
+        "truncated": truncated,
+    })
 
+
+@full_map_bp.route("/api/features/<string:kind>/<int:item_id>", methods=["GET"])
+@login_required
+def api_feature_detail(kind: str, item_id: int):
+    if kind not in _allowed_types():
+        abort(404)
+    detail = feature_detail(kind, item_id)
+    if detail is None:
+        abort(404)
+    return jsonify(detail)
@@ -1,19 +1,42 @@
 # app/blueprints/home/routes.py
-from flask import Blueprint, render_template, request
-from flask_login import login_required
+from flask import Blueprint, render_template, request, jsonify, url_for
+from flask_login import current_user, login_required
 from app.database.models.user import User
-from app.utils.feed import get_feed_items, collect_search_text, matches_query
+from app.utils.feed import FEED_PAGE_SIZE, InvalidCursor, get_feed_page, get_near_feed_page, feed_filters_from_args
+from app.utils.search import SEARCH_PAGE_SIZE, SEARCH_SOURCES, search
+from app.utils.applause import applauded_by_current_user
 from app.database.models.petition import Petition
 
 
 home_bp = Blueprint("home", __name__, url_prefix="/")
 
+
+def _applauded_in(feed_items):
+    return applauded_by_current_user(it["item"] for it in feed_items if it["type"] == "post")
+
+
+def _near_coords():
+    """(lat, lng) dell'utente se ha chiesto il feed "vicino a me" e ha una posizione salvata."""
+    if request.args.get("sort") != "near":
+        return None
+    lat, lng = current_user.latitude, current_user.longitude
+    if lat is None or lng is None:
+        return None
+    return lat, lng
+
+
+def _feed_page(cursor=None, limit=FEED_PAGE_SIZE, **filters):
+    coords = _near_coords()
+    if coords:
+        return get_near_feed_page(*coords, cursor=cursor, limit=limit, **filters)
+    return get_feed_page(cursor=cursor, limit=limit, **filters)
+
+
 @home_bp.route("", methods=["GET"])
 @login_required
 def home():
-    q = (request.args.get('q') or '').strip()
-    types = request.args.getlist('type')
-    assoc_ids = request.args.getlist('association_id')
+    filters = feed_filters_from_args(request.args)
+    q = filters["q"]
     petitions = Petition.query.order_by(Petition.created_at.desc()).all()
 
 
@@ -22,40 +45,96 @@ def home():
         for u in User.query.filter(User.user_type == "association").order_by(User.name.asc()).all()
     ]
 
-    feed_items = get_feed_items()
-
-    # Filtri
-    if types:
-        feed_items = [it for it in feed_items if it.get("type") in types]
-
-    if assoc_ids:
-        def _belongs(it):
-            obj = it.get("item")
-            if not obj:
-                return False
-            assoc = getattr(obj, "association", None)
-            if assoc and getattr(assoc, "id", None):
-                return str(assoc.id) in assoc_ids
-            assoc_fk = getattr(obj, "association_id", None)
-            return str(assoc_fk) in assoc_ids if assoc_fk else False
-        feed_items = [it for it in feed_items if _belongs(it)]
+    # Filtri applicati nel DB; solo la prima pagina: le successive arrivano da home.feed
+    feed_items, next_cursor = _feed_page(**filters)
 
     if q:
-        def _matches(it):
-            obj = it.get('item')
-            return obj and matches_query(collect_search_text(obj), q)
-        feed_items = [it for it in feed_items if _matches(it)]
-        found_associations = User.query.filter(
-            User.user_type == 'association',
-            User.name.ilike(f"%{q}%"),
-        ).all()
+        hits, _ = search(q, types=["association"])
+        by_id = {u.id: u for u in User.query.filter(User.id.in_([h["id"] for h in hits])).all()}
+        found_associations = [by_id[h["id"]] for h in hits if h["id"] in by_id]
     else:
         found_associations = []
 
     return render_template(
         "pages/home.html",
         feed_items=feed_items,
+        next_cursor=next_cursor,
+        feed_sort="near" if _near_coords() else "recent",
+        # Filtri da conservare nei link di ordinamento
+        feed_filter_args={
+            "type": filters["types"],
+            "association_id": filters["association_ids"],
+            "q": q or None,
+        },
+        can_sort_near=current_user.latitude is not None and current_user.longitude is not None,
+        applauded_post_ids=_applauded_in(feed_items),
         found_associations=found_associations,
         associations_options=associations_options,
         petitions=petitions,  # 👈 passa la lista al template
     )
+
+
+# 📜 API: pagina successiva del feed (scroll infinito)
+@home_bp.route("feed", methods=["GET"])
+@login_required
+def feed():
+    cursor = request.args.get("cursor")
+    filters = feed_filters_from_args(request.args)
+    limit = max(1, min(request.args.get("limit", FEED_PAGE_SIZE, type=int) or FEED_PAGE_SIZE, 100))
+
+    try:
+        feed_items, next_cursor = _feed_page(cursor=cursor, limit=limit, **filters)
+    except InvalidCursor:
+        return jsonify({"error": "invalid cursor"}), 400
+
+    return jsonify({
+        "items": [
+            {
+                "type": it["type"],
+                "id": it["item"].id,
+                "title": it["title"],
+                "description": it["description"],
+                "timestamp": it["timestamp"].isoformat() if it["timestamp"] else None,
+                "url": it["url"],
+                "distance_km": round(it["distance_km"], 1) if "distance_km" in it else None,
+            }
+            for it in feed_items
+        ],
+        "html": render_template(
+            "partials/feed_items.html",
+            feed_items=feed_items,
+            applauded_post_ids=_applauded_in(feed_items),
+        ),
+        "next_cursor": next_cursor,
+    })
+
+
+def _search_result_url(hit) -> str:
+    kind, item_id = hit["type"], hit["id"]
+    if kind in ("event", "campaign", "report"):
+        return url_for("public.detail", content_type=kind, item_id=item_id)
+    if kind == "post":
+        return url_for("posts.post_detail", post_id=item_id)
+    if kind == "petition":
+        return url_for("petitions.petition_detail", petition_id=item_id)
+    return url_for("public.public_profile", association_id=item_id)
+
+
+# 🔎 API: ricerca full-text ordinata per rilevanza (paginata)
+@home_bp.route("search", methods=["GET"])
+@login_required
+def search_api():
+    q = (request.args.get("q") or "").strip()
+    types = [t for t in request.args.getlist("type") if t in SEARCH_SOURCES]
+    page = max(request.args.get("page", 1, type=int) or 1, 1)
+    per_page = max(1, min(request.args.get("per_page", SEARCH_PAGE_SIZE, type=int) or SEARCH_PAGE_SIZE, 100))
+
+    hits, has_more = search(q, types=types, page=page, per_page=per_page)
+    for hit in hits:
+        hit["url"] = _search_result_url(hit)
+
+    return jsonify({
+        "results": hits,
+        "page": page,
+        "next_page": page + 1 if has_more else None,
+    })
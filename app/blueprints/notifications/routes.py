@@ -1,17 +1,54 @@
 # app/blueprints/notifications/routes.py
-from flask import Blueprint, jsonify
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request
 from flask_login import login_required, current_user
 from app import db
-from app.database.models.notification import Notification
+from app.utils.notifications import (
+    NOTIFICATIONS_PAGE_SIZE,
+    mark_read,
+    notifications_page,
+    unread_count,
+)
+from app.utils.streams import SSE_HEADERS, user_stream
 
 notifications_bp = Blueprint("notifications", __name__, url_prefix="/notifications")
 
-# ✅ Segna tutte le notifiche come lette
+
+# 📬 Notifiche paginate (cursore = id dell'ultima notifica ricevuta)
+@notifications_bp.route("/api", methods=["GET"])
+@login_required
+def notifications_api():
+    limit = max(1, min(request.args.get("limit", NOTIFICATIONS_PAGE_SIZE, type=int), 100))
+    before_id = request.args.get("cursor", type=int)
+
+    items, next_cursor = notifications_page(current_user.id, before_id=before_id, limit=limit)
+    return jsonify({
+        "items": [n.to_dict() for n in items],
+        "next_cursor": next_cursor,
+        "unread": unread_count(current_user.id),
+    })
+
+
+# ✅ Segna come lette le notifiche (opzionalmente fino a un id/istante già visto)
 @notifications_bp.route("/mark_all_read", methods=["POST"])
 @login_required
 def mark_all_read():
-    unread = current_user.notifications.filter_by(is_read=False).all()
-    for n in unread:
-        n.is_read = True
+    data = request.get_json(silent=True) or request.form
+    try:
+        up_to_id = int(data["up_to_id"]) if data.get("up_to_id") not in (None, "") else None
+        before = datetime.fromisoformat(data["before"]) if data.get("before") else None
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "error": "Parametri non validi."}), 400
+
+    cleared = mark_read(current_user.id, up_to_id=up_to_id, before=before)
     db.session.commit()
-    return jsonify({"status": "ok", "cleared": len(unread)})
+    return jsonify({"status": "ok", "cleared": cleared, "unread": unread_count(current_user.id)})
+
+
+# 📡 Stream SSE dell'utente: notifiche e messaggi di tutte le sue chat, su una sola connessione
+@notifications_bp.route("/stream")
+@login_required
+def notifications_stream():
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return Response(user_stream(current_user.id, last_event_id), mimetype="text/event-stream", headers=SSE_HEADERS)
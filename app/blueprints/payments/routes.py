@@ -1,20 +1,20 @@
 # app/blueprints/payments/routes.py
-from pathlib import Path
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import os
 from app.database.models.user import User
 
 from flask import (
     render_template, redirect, request, url_for, flash,
-    send_from_directory, abort
+    send_file, send_from_directory, abort, jsonify, session as flask_session
 )
 from app import db
 from app.database.models import Campaign, Donation
-from app.utils.pdf_generator import generate_receipt
+from app.utils.pdf_generator import RECEIPTS_DIR
+from app.utils.receipts import annual_zip_path, queue_receipt, receipt_ready
 from . import payments_bp
 
 # 👇 NEW
-from flask_login import current_user  # <— ci serve per legare la donazione al volontario
+from flask_login import current_user, login_required  # <— ci serve per legare la donazione al volontario
 
 import stripe
 
@@ -23,14 +23,6 @@ import stripe
 # -----------------------------------------------------------------------------
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")  # usa sk_test_... in sandbox
 
-# -----------------------------------------------------------------------------
-# Percorso ricevute (statico dedicato)
-# -----------------------------------------------------------------------------
-# app/blueprints/static/download/receipts
-BASE_DIR = Path(__file__).resolve().parent.parent  # → app/blueprints
-RECEIPTS_FOLDER = BASE_DIR / "static" / "download" / "receipts"
-RECEIPTS_FOLDER.mkdir(parents=True, exist_ok=True)
-
 
 
 @payments_bp.route("/donation/<int:campaign_id>")
@@ -108,8 +100,7 @@ def success():
     Ritorno da Stripe con ?session_id=cs_...
     - Verifica pagamento completato
     - Crea Donation
-    - Genera PDF ricevuta
-    - Mostra link di download
+    - Accoda la generazione del PDF (la pagina fa polling su receipt_status)
     """
     session_id = request.args.get("session_id")
     if not session_id:
@@ -159,17 +150,57 @@ def success():
     db.session.add(donation)
     db.session.commit()
 
-    # Genera ricevuta direttamente in app/blueprints/static/download/receipts
-    filename = generate_receipt(donation, campaign)
-    donation.pdf_filename = filename
-    db.session.commit()
-
-    # URL alla route di download (NON static globale)
-    receipt_url = url_for("payments.download_receipt", filename=donation.pdf_filename)
+    # Ricevuta in background: il PDF non pesa più sulla latenza del checkout
+    queue_receipt(donation.id)
+    _remember_receipt(donation.id)
 
     related_events = campaign.related_events[:3]  # max 3 suggerimenti
 
-    return render_template("pages/donation_success.html", donation=donation, receipt_url=receipt_url, related_events=related_events)
+    return render_template(
+        "pages/donation_success.html",
+        donation=donation,
+        receipt_url=None,
+        receipt_status_url=url_for("payments.receipt_status", donation_id=donation.id),
+        related_events=related_events,
+    )
+
+
+# -----------------------------------------------------------------------------
+# Stato ricevuta (polling dalla pagina di successo)
+# -----------------------------------------------------------------------------
+def _remember_receipt(donation_id: int) -> None:
+    """Autorizza questa sessione browser a interrogare lo stato della ricevuta."""
+    ids = flask_session.get("receipt_donation_ids", [])
+    flask_session["receipt_donation_ids"] = (ids + [donation_id])[-20:]
+
+
+def _can_view_receipt(donation: Donation) -> bool:
+    """Donatore (utente o sessione del checkout) oppure associazione che ha ricevuto la donazione."""
+    if donation.id in flask_session.get("receipt_donation_ids", []):
+        return True
+    if not getattr(current_user, "is_authenticated", False):
+        return False
+    if donation.user_id == current_user.id:
+        return True
+    return donation.campaign is not None and donation.campaign.association_id == current_user.id
+
+
+@payments_bp.route("/receipt/status/<int:donation_id>")
+def receipt_status(donation_id: int):
+    donation = Donation.query.get_or_404(donation_id)
+
+    if not _can_view_receipt(donation):
+        abort(404)
+
+    if receipt_ready(donation):
+        return jsonify({
+            "status": "ready",
+            "url": url_for("payments.download_receipt", filename=donation.pdf_filename),
+        })
+
+    # Job perso (riavvio/errore): riaccoda, è idempotente
+    queue_receipt(donation.id)
+    return jsonify({"status": "pending"})
 
 
 @payments_bp.route("/donation/error")
@@ -178,15 +209,36 @@ def error():
 
 
 # -----------------------------------------------------------------------------
-# Download ricevuta (file statico dedicato, NON nello static globale app/)
+# Download ricevuta (instance/receipts, fuori dagli static: solo agli aventi diritto)
 # -----------------------------------------------------------------------------
-@payments_bp.route("/receipt/<path:filename>")
+@payments_bp.route("/receipt/<filename>")
 def download_receipt(filename: str):
-    if not filename:
+    stem, _, ext = filename.partition(".")
+    prefix, _, donation_id = stem.partition("_")
+    if ext != "pdf" or prefix != "donation" or not donation_id.isdigit():
+        abort(404)
+
+    donation = db.session.get(Donation, int(donation_id))
+    if donation is None or donation.pdf_filename != filename or not _can_view_receipt(donation):
         abort(404)
     return send_from_directory(
-        RECEIPTS_FOLDER,
+        RECEIPTS_DIR,
         filename,
         as_attachment=False,          # True se vuoi forzare il download
         download_name=filename
     )
+
+
+# -----------------------------------------------------------------------------
+# Archivio annuale (`flask receipts build`): solo l'associazione proprietaria
+# -----------------------------------------------------------------------------
+@payments_bp.route("/receipts/annual/<int:year>")
+@login_required
+def annual_receipts(year: int):
+    if current_user.user_type != "association":
+        abort(403)
+    zip_path = annual_zip_path(current_user.id, year)
+    if not zip_path.exists():
+        abort(404)
+    return send_file(zip_path, mimetype="application/zip", as_attachment=True,
+                     download_name=f"ricevute_{year}.zip")
@@ -13,6 +13,10 @@ from app.database.models.post import Post
 from app.database.models.applause import Applause
 from app.blueprints.posts.forms import PostForm
 from app.database.models.notification import Notification
+from app.utils.applause import applauded_by_current_user
+from app.utils.cache import cached_page
+from app.utils.notifications import notify
+from sqlalchemy.exc import IntegrityError
 
 
 # 📌 Percorsi statici coerenti con gli altri blueprint (events, campaigns, reports)
@@ -141,6 +145,11 @@ def toggle_applause(post_id: int):
         # Rimuovo l’applauso
         db.session.delete(existing)
 
+        # Decremento atomico del contatore (UPDATE ... SET applause_count = applause_count - 1)
+        Post.query.filter(Post.id == post.id, Post.applause_count > 0).update(
+            {Post.applause_count: Post.applause_count - 1}, synchronize_session=False
+        )
+
         # Rimuovo eventuale notifica associata a questo post e a questo utente
         notif = Notification.query.filter_by(
             user_id=post.association_id,
@@ -151,12 +160,24 @@ def toggle_applause(post_id: int):
             db.session.delete(notif)
 
         db.session.commit()
-        return jsonify({"status": "removed", "count": len(post.applause)})
+        return jsonify({"status": "removed", "count": _applause_count(post.id)})
 
     else:
         applause = Applause(post_id=post.id, user_id=current_user.id)
         db.session.add(applause)
 
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Doppio click concorrente: l’applauso esiste già, il contatore è già aggiornato
+            db.session.rollback()
+            return jsonify({"status": "added", "count": _applause_count(post.id)})
+
+        # Incremento atomico del contatore nella stessa transazione dell’insert
+        Post.query.filter(Post.id == post.id).update(
+            {Post.applause_count: Post.applause_count + 1}, synchronize_session=False
+        )
+
         # Creo la notifica solo se l’utente che applaude non è l’associazione stessa
         if current_user.id != post.association_id:
             existing_notif = Notification.query.filter_by(
@@ -165,16 +186,20 @@ def toggle_applause(post_id: int):
                 type="post"
             ).first()
             if not existing_notif:
-                notif = Notification(
-                    user_id=post.association_id,
-                    type="post",  # 👈 campo obbligatorio
+                notify(
+                    post.association_id,
+                    type="post",
                     message=f"{current_user.name} ha applaudito il tuo post: {post.title}",
-                    post_id=post.id
+                    post_id=post.id,
                 )
-                db.session.add(notif)
 
         db.session.commit()
-        return jsonify({"status": "added", "count": len(post.applause)})
+        return jsonify({"status": "added", "count": _applause_count(post.id)})
+
+
+def _applause_count(post_id: int) -> int:
+    """Legge il contatore dal DB (senza caricare le righe di Applause)."""
+    return db.session.query(Post.applause_count).filter(Post.id == post_id).scalar() or 0
 
 
 # --------------------------------------------------------------------------
@@ -189,8 +214,13 @@ def post_file(filename: str):
 # Post detail (public)
 # --------------------------------------------------------------------------
 @posts_bp.route("/<int:post_id>", methods=["GET"])
+@cached_page("post", "user")
 def post_detail(post_id: int):
     """Dettaglio pubblico di un singolo post."""
     post = Post.query.get_or_404(post_id)
-    return render_template("pages/post.html", post=post)
+    return render_template(
+        "pages/post.html",
+        post=post,
+        applauded_post_ids=applauded_by_current_user([post]),
+    )
 
@@ -1,6 +1,6 @@
 # app/blueprints/public/routes.py
 
-from flask import Blueprint, render_template, abort, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, abort, redirect, url_for, flash, jsonify, request
 from flask_login import login_required, current_user
 from app import db
 from app.database.models.user import User
@@ -9,6 +9,10 @@ from app.database.models.event import Event
 from app.database.models.campaign import Campaign
 from app.database.models.report import Report   # 👈 aggiunto import
 from app.database.models.chat import Chat
+from app.blueprints.chat.routes import list_conversations
+from app.utils.applause import applauded_by_current_user
+from app.utils.associations import ALPHABET, associations_page
+from app.utils.cache import cached_page
 from datetime import datetime
 
 
@@ -17,14 +21,18 @@ public_bp = Blueprint("public", __name__)
 
 # 🔍 Elenco di tutte le associazioni
 @public_bp.route("/associazioni")
+@cached_page("user")
 def list_associations():
-    associations = (
-        User.query.filter_by(user_type="association")
-        .order_by(User.name.asc())
-        .all()
-    )
+    letter = (request.args.get("letter") or "").upper()
+    letter = letter if letter in ALPHABET else None
+    associations, followers, next_cursor = associations_page(cursor=request.args.get("cursor"), letter=letter)
     return render_template(
-        "pages/associations_list.html", associations=associations
+        "pages/associations_list.html",
+        associations=associations,
+        follower_counts=followers,
+        next_cursor=next_cursor,
+        letter=letter,
+        alphabet=ALPHABET,
     )
 
 
@@ -85,6 +93,7 @@ def unfollow_association(association_id):
 
 # 👤 Profilo pubblico di una singola associazione
 @public_bp.route("/associazioni/<int:association_id>")
+@cached_page("user", "event", "post", "campaign")
 def public_profile(association_id):
     association = User.query.get_or_404(association_id)
 
@@ -113,6 +122,7 @@ def public_profile(association_id):
         events=events,
         posts=posts,
         campaigns=campaigns,
+        applauded_post_ids=applauded_by_current_user(posts),
     )
 
 
@@ -146,6 +156,7 @@ def volunteer_followed_associations(volunteer_id):
 
 # 📄 Pagina di dettaglio dinamica (evento, campagna, post, segnalazione)
 @public_bp.route("/detail/<string:content_type>/<int:item_id>")
+@cached_page("event", "campaign", "report", "user")
 def detail(content_type, item_id):
     """
     Mostra la pagina di dettaglio per:
@@ -188,43 +199,8 @@ def detail(content_type, item_id):
 
 
 
-# 💬 API: elenco conversazioni dell'utente corrente
-@public_bp.route("/api/conversations")
-@login_required
-def api_conversations():
-    chats = Chat.query.filter(
-        (Chat.user1_id == current_user.id)
-        | (Chat.user2_id == current_user.id)
-    ).all()
-
-    users = []
-    for chat in chats:
-        other_id = (
-            chat.user1_id
-            if chat.user2_id == current_user.id
-            else chat.user2_id
-        )
-        user = User.query.get(other_id)
-        if user:
-            users.append(user)
-
-    return jsonify(
-        [
-            {
-                "id": u.id,
-                "name": u.name,
-                "photo": url_for(
-                    "dashboard.static",
-                    filename="uploads/profile-photo/" + u.photo_filename,
-                )
-                if u.photo_filename
-                else url_for(
-                    "static", filename="img/avatar-placeholder.png"
-                ),
-            }
-            for u in users
-        ]
-    )
+# 💬 API: elenco conversazioni dell'utente corrente (stessa implementazione di chat.list_conversations)
+public_bp.add_url_rule("/api/conversations", endpoint="api_conversations", view_func=list_conversations)
 
 
 # 💬 API: crea una nuova chat (se non esiste già)
@@ -8,6 +8,7 @@ from werkzeug.utils import secure_filename
 
 from app import db
 from app.database.models.user import User
+from app.utils.schema import has_column
 from app.blueprints.dashboard.forms import ProfileForm  # eventualmente spostalo in forms/settings.py
 
 # --- Costanti ---
@@ -48,7 +49,7 @@ def edit_profile():
         # Aggiorna i dati base
         current_user.name = form.name.data
         current_user.bio = form.bio.data
-        if hasattr(current_user, "age"):
+        if has_column(User, "age"):
             current_user.age = form.age.data
 
         # Upload immagine profilo
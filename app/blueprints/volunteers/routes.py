@@ -4,6 +4,7 @@ from app import db
 from app.database.models.user import User
 from app.database.models.report import Report
 from app.database.models.participation import Participation
+from app.database.loaders import loader_options
 
 # 📌 Blueprint per i Volontari
 volunteers_bp = Blueprint("volunteers", __name__, url_prefix="/volunteers")
@@ -22,9 +23,13 @@ def public_profile(volunteer_id: int) -> ResponseReturnValue:
 
     # 📊 Recupera le informazioni collegate
     reports: list[Report] = Report.query.filter_by(user_id=volunteer.id).all()
-    participations: list[Participation] = Participation.query.filter_by(volunteer_id=volunteer.id).all()
+    participations: list[Participation] = (
+        Participation.query.options(*loader_options("participation.event"))
+        .filter_by(volunteer_id=volunteer.id)
+        .all()
+    )
 
-    followed_count = len(volunteer.followed_associations.all())
+    followed_count = volunteer.followed_associations.count()
 
 
     return render_template(
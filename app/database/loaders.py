@@ -0,0 +1,65 @@
+# app/database/loaders.py
+"""
+Strategie di eager loading per vista.
+
+Ogni profilo elenca le relazioni che il template corrispondente attraversa
+per ogni riga, caricate in blocco (joinedload per i many-to-one,
+selectinload per le collezioni) invece di una query lazy per riga.
+Le opzioni vengono costruite su richiesta perché alcune relazioni (es.
+``Post.association``) esistono solo dopo la configurazione dei mapper.
+"""
+from sqlalchemy.orm import contains_eager, joinedload
+
+from app.database.models.campaign import Campaign
+from app.database.models.donation import Donation
+from app.database.models.event import Event
+from app.database.models.participation import Participation
+from app.database.models.post import Post
+
+
+def _feed_event():
+    return [joinedload(Event.association)]
+
+
+def _feed_post():
+    return [joinedload(Post.association)]
+
+
+def _feed_campaign():
+    return [joinedload(Campaign.association)]
+
+
+def _participation_event():
+    return [joinedload(Participation.event)]
+
+
+def _participation_event_joined():
+    # La query fa già JOIN su Event: riusa le colonne invece di un secondo join
+    return [contains_eager(Participation.event)]
+
+
+def _donation_campaign():
+    return [joinedload(Donation.campaign)]
+
+
+def _donation_campaign_user():
+    return [joinedload(Donation.campaign), joinedload(Donation.user)]
+
+
+LOADER_PROFILES = {
+    # home.home / home.feed
+    "feed.event": _feed_event,
+    "feed.post": _feed_post,
+    "feed.campaign": _feed_campaign,
+    # dashboard_volunteer / volunteers.public_profile
+    "participation.event": _participation_event,
+    "participation.event_joined": _participation_event_joined,
+    "donation.campaign": _donation_campaign,
+    # dashboard_association
+    "donation.campaign_user": _donation_campaign_user,
+}
+
+
+def loader_options(profile: str) -> list:
+    """Ritorna le opzioni di caricamento per il profilo indicato (KeyError se sconosciuto)."""
+    return LOADER_PROFILES[profile]()
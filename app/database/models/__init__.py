@@ -9,9 +9,10 @@ from .report import Report
 from .donation import Donation
 from .participation import Participation
 from .notification import Notification
-from .chat import Chat
+from .chat import Chat, ChatMessage
 from .applause import Applause
 from .petition import Petition, PetitionSignature, PetitionSupport
+from .search import SearchDocument
 
 
 __all__ = [
@@ -24,4 +25,5 @@ __all__ = [
     "Participation",
     "Notification",
     "Chat",
+    "ChatMessage",
 ]
@@ -24,6 +24,7 @@ class Campaign(db.Model):
     # Location (optional)
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # Geohash cell, for radius queries
     location = db.Column(db.String(255), nullable=True, index=True)
 
     # Optional image
@@ -1,4 +1,5 @@
 # app/database/models/chat.py
+from datetime import datetime
 from app import db
 
 
@@ -10,15 +11,57 @@ class Chat(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     # Participants
-    user1_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
-    user2_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    user1_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    user2_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
 
     # Creation timestamp
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    # Last activity (creation or last message), for conversation ordering
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now(), nullable=False)
+
     __table_args__ = (
         db.UniqueConstraint("user1_id", "user2_id", name="_user_pair_uc"),
     )
 
+    # Messages (newest last; use app.utils.chats for paginated history)
+    messages = db.relationship("ChatMessage", backref="chat", lazy="dynamic", cascade="all, delete-orphan")
+
+    def other_user_id(self, user_id: int) -> int:
+        """Id of the counterpart of ``user_id`` in this conversation."""
+        return self.user2_id if self.user1_id == user_id else self.user1_id
+
     def __repr__(self) -> str:
         return f"<Chat id={self.id} users=({self.user1_id}, {self.user2_id})>"
+
+
+class ChatMessage(db.Model):
+    """Model representing a message sent in a conversation."""
+
+    __tablename__ = "chat_messages"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    chat_id = db.Column(db.Integer, db.ForeignKey("chats.id", ondelete="CASCADE"), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # History pages: WHERE chat_id = ? AND id < cursor ORDER BY id DESC
+        db.Index("ix_chat_messages_chat_id_id", "chat_id", "id"),
+    )
+
+    def to_dict(self):
+        """Return a dictionary representation of the message."""
+        return {
+            "id": self.id,
+            "chat_id": self.chat_id,
+            "sender_id": self.sender_id,
+            "content": self.content,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self) -> str:
+        return f"<ChatMessage id={self.id} chat_id={self.chat_id} sender_id={self.sender_id}>"
@@ -2,6 +2,15 @@ from datetime import datetime
 from app import db
 
 
+# Normalized skills of each event (kept in sync with Event.skills by app.utils.skills)
+event_skill = db.Table(
+    "event_skill",
+    db.Column("event_id", db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("skill", db.String(50), primary_key=True),
+    db.Index("ix_event_skill_skill_event", "skill", "event_id"),
+)
+
+
 class Event(db.Model):
     """Model representing an event created by an association."""
 
@@ -23,6 +32,7 @@ class Event(db.Model):
     # Optional coordinates
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12), index=True)  # Geohash cell, for radius queries
 
     # Tracking
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -42,6 +52,8 @@ class Event(db.Model):
 
     # Capacity (None = unlimited)
     capacity_max = db.Column(db.Integer, nullable=True)
+    # Denormalized count of accepted participations (see app.utils.participation)
+    accepted_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Association relationship
     association_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
@@ -64,21 +76,21 @@ class Event(db.Model):
         """Return True if event has a participant limit."""
         return self.capacity_max is not None
 
-    def accepted_count(self) -> int:
-        """Count accepted participations for this event."""
-        from app.database.models.participation import Participation
-        return Participation.query.filter_by(event_id=self.id, status="accepted").count()
-
     def seats_left(self) -> int | None:
         """Return available seats, or None if unlimited."""
         if not self.is_limited:
             return None
-        return max(self.capacity_max - self.accepted_count(), 0)
+        return max(self.capacity_max - self.accepted_count, 0)
 
     def is_full(self) -> bool:
         """Return True if event reached maximum capacity."""
         return self.is_limited and self.seats_left() == 0
 
+    def participation_of(self, user_id: int):
+        """Return the participation of the given volunteer, if any (single indexed lookup)."""
+        from app.database.models.participation import Participation
+        return Participation.query.filter_by(event_id=self.id, volunteer_id=user_id).first()
+
     @property
     def related_campaigns(self):
         """Return active fundraising campaigns of the same association."""
@@ -56,4 +56,3 @@ class Notification(db.Model):
 
 # Useful indexes
 db.Index("ix_notification_user_read", Notification.user_id, Notification.is_read)
-db.Index("ix_notification_created_at", Notification.created_at)
@@ -14,7 +14,7 @@ class Participation(db.Model):
     volunteer_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
     event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False, index=True)
 
-    # Participation status: "pending", "accepted", "rejected", "cancelled"
+    # Participation status: "pending", "accepted", "rejected", "cancelled", "waitlisted"
     status = db.Column(db.String(20), nullable=False, default="pending")
 
     # Tracking
@@ -27,7 +27,25 @@ class Participation(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint("volunteer_id", "event_id", name="uq_participation_unique"),
+        # FIFO waitlist: next in line = first row of (event_id, "waitlisted") by applied_at
+        db.Index("ix_participation_event_status_applied", "event_id", "status", "applied_at"),
     )
 
+    def waitlist_position(self) -> int:
+        """1-based position in the event's waitlist (0 if not waitlisted)."""
+        if self.status != "waitlisted":
+            return 0
+        ahead = db.session.execute(
+            db.select(db.func.count(Participation.id)).where(
+                Participation.event_id == self.event_id,
+                Participation.status == "waitlisted",
+                db.or_(
+                    Participation.applied_at < self.applied_at,
+                    db.and_(Participation.applied_at == self.applied_at, Participation.id < self.id),
+                ),
+            )
+        ).scalar()
+        return ahead + 1
+
     def __repr__(self) -> str:
         return f"<Participation id={self.id} volunteer_id={self.volunteer_id} event_id={self.event_id} status={self.status}>"
@@ -13,6 +13,7 @@ class Petition(db.Model):
 
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # Geohash cell, for radius queries
     location = db.Column(db.String(255), nullable=True)
     image_filename = db.Column(db.String(255), nullable=True)
 
@@ -45,3 +46,7 @@ class PetitionSupport(db.Model):
 
     petition = db.relationship("Petition", back_populates="supports")
     association = db.relationship("User")
+
+
+# Bounding-box queries of the full map
+db.Index("ix_petition_geo", Petition.latitude, Petition.longitude)
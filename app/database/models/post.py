@@ -11,10 +11,13 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     image_filename = db.Column(db.String(255), nullable=True)
 
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
     association_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    # Contatore denormalizzato degli applausi (aggiornato da posts.toggle_applause)
+    applause_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     applause = db.relationship(
         "Applause",
         back_populates="post",          # 👈 cambiato da backref a back_populates
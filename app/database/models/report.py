@@ -18,6 +18,7 @@ class Report(db.Model):
     address = db.Column(db.String(255))
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    geohash = db.Column(db.String(12), index=True)  # Geohash cell, for radius queries
 
     # Optional image
     image_filename = db.Column(db.String(255), nullable=True)
@@ -30,3 +31,7 @@ class Report(db.Model):
 
     def __repr__(self) -> str:
         return f"<Report id={self.id} title='{self.title}'>"
+
+
+# Bounding-box queries of the full map
+db.Index("ix_report_geo", Report.latitude, Report.longitude)
@@ -0,0 +1,69 @@
+# app/database/models/search.py
+from datetime import datetime
+from sqlalchemy import DDL, event
+from app import db
+
+
+class SearchDocument(db.Model):
+    """Denormalized, accent-folded search text for one searchable item.
+
+    Rows are maintained by the mapper hooks in ``app.utils.search``. On SQLite
+    an FTS5 external-content table (``search_document_fts``) mirrors ``body``
+    through triggers; on PostgreSQL a GIN index on ``to_tsvector('simple', body)``
+    serves the same role.
+    """
+
+    __tablename__ = "search_document"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Source item: "event" | "post" | "campaign" | "petition" | "report" | "association"
+    doc_type = db.Column(db.String(20), nullable=False)
+    doc_id = db.Column(db.Integer, nullable=False)
+
+    # Owning association (None for petitions and reports)
+    association_id = db.Column(db.Integer, nullable=True, index=True)
+
+    # Display title and folded full text
+    title = db.Column(db.String(255), nullable=True)
+    body = db.Column(db.Text, nullable=False, default="")
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("doc_type", "doc_id", name="uq_search_document_item"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<SearchDocument {self.doc_type}:{self.doc_id}>"
+
+
+# SQLite: FTS5 external-content table kept in sync by triggers
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_document_fts USING fts5("
+    "body, content='search_document', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_document_fts(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_document_fts(rowid, body) VALUES (new.id, new.body); END",
+]
+
+# PostgreSQL: GIN index on the tsvector of the folded body
+POSTGRES_FTS_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_search_document_tsv "
+    "ON search_document USING gin (to_tsvector('simple', body))",
+]
+
+for _stmt in SQLITE_FTS_DDL:
+    event.listen(SearchDocument.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in POSTGRES_FTS_DDL:
+    event.listen(SearchDocument.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+event.listen(
+    SearchDocument.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS search_document_fts").execute_if(dialect="sqlite"),
+)
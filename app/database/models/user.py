@@ -7,6 +7,8 @@ follows = db.Table(
     "follows",
     db.Column("volunteer_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
     db.Column("association_id", db.Integer, db.ForeignKey("user.id"), primary_key=True),
+    # Follower counts (GROUP BY association_id) without scanning the whole table
+    db.Index("ix_follows_association_id", "association_id"),
 )
 
 
@@ -24,12 +26,14 @@ class User(db.Model, UserMixin):
     # Identity
     name = db.Column(db.String(150), nullable=False)   # Full name or organization name
     user_type = db.Column(db.String(20), nullable=False, index=True)  # "volunteer" | "association"
+    name_key = db.Column(db.String(150), nullable=True)  # Lowercase name without accents, for A-Z listing
 
     # Volunteer profile fields
     date_of_birth = db.Column(db.Date, nullable=True)
     phone = db.Column(db.String(30), nullable=True)
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True, index=True)  # Geohash cell, for radius queries
     bio = db.Column(db.Text, nullable=True)
     photo_filename = db.Column(db.String(255), nullable=True)
     disponibilita = db.Column(db.Text, nullable=True)  # Availability (days/times)
@@ -69,3 +73,7 @@ class User(db.Model, UserMixin):
 
     def __repr__(self) -> str:
         return f"<User {self.name} ({self.user_type})>"
+
+
+# Alphabetical association listing: WHERE user_type = ? ORDER BY name_key, id (keyset, letter prefix)
+db.Index("ix_user_type_name_key_id", User.user_type, User.name_key, User.id)
@@ -0,0 +1,62 @@
+# app/utils/applause.py
+"""
+Applausi dei post: contatore denormalizzato (Post.applause_count) e lookup
+in blocco degli applausi dell'utente corrente per le card di una pagina.
+"""
+from typing import Iterable, Set
+
+import click
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import func, select
+
+from app import db
+from app.database.models.applause import Applause
+from app.database.models.post import Post
+
+
+def applauded_post_ids(user_id, post_ids: Iterable[int]) -> Set[int]:
+    """Id (tra ``post_ids``) dei post già applauditi da ``user_id``: una sola query per pagina."""
+    post_ids = {pid for pid in post_ids if pid is not None}
+    if not user_id or not post_ids:
+        return set()
+    rows = db.session.execute(
+        select(Applause.post_id).where(
+            Applause.user_id == user_id,
+            Applause.post_id.in_(post_ids),
+        )
+    )
+    return set(rows.scalars())
+
+
+def applauded_by_current_user(posts) -> Set[int]:
+    """Shortcut per le view: applausi dell'utente loggato sui post passati."""
+    if not getattr(current_user, "is_authenticated", False):
+        return set()
+    return applauded_post_ids(current_user.id, (p.id for p in posts))
+
+
+def reconcile_applause_counts() -> int:
+    """Ricalcola Post.applause_count da applause. Ritorna quante righe sono state corrette."""
+    actual = (
+        select(func.count(Applause.id))
+        .where(Applause.post_id == Post.id)
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        Post.__table__.update()
+        .where(Post.__table__.c.applause_count != actual)
+        .values(applause_count=actual)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+applause_cli = AppGroup("applause", help="Manutenzione dei contatori di applausi.")
+
+
+@applause_cli.command("reconcile")
+def reconcile_command() -> None:
+    """Ricalcola i contatori applause_count di tutti i post."""
+    fixed = reconcile_applause_counts()
+    click.echo(f"Contatori corretti: {fixed}")
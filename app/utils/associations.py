@@ -0,0 +1,107 @@
+# app/utils/associations.py
+"""
+Elenco delle associazioni: ordine alfabetico, pagine con cursore keyset su
+(name_key, id) servito da ix_user_type_name_key_id e filtro per lettera iniziale.
+
+``User.name_key`` è il nome in minuscolo e senza accenti, tenuto allineato a
+``name`` da un hook ORM: "àncora", "Ancora" e "ANCORA" stanno tutte sotto la A,
+in un unico ordine che non dipende da maiuscole o collation del DB.
+
+I follower della pagina arrivano con un solo GROUP BY su ``follows``
+(ix_follows_association_id): il costo di una pagina dipende dalla sua
+dimensione, non dal numero di associazioni iscritte.
+"""
+from __future__ import annotations
+
+import string
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, event, func, or_, select
+
+from app import db
+from app.database.models.user import User, follows
+
+ASSOCIATIONS_PAGE_SIZE = 24
+ALPHABET = tuple(string.ascii_uppercase)
+
+_hooks_registered = False
+
+
+def name_sort_key(name: Optional[str]) -> str:
+    """Chiave di ordinamento del nome: minuscolo, senza accenti né spazi ai bordi."""
+    s = unicodedata.normalize("NFKD", (name or "").strip().casefold())
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+def _set_name_key(mapper, connection, target) -> None:
+    target.name_key = name_sort_key(target.name)
+
+
+def register_name_key_hooks() -> None:
+    """Mantiene ``User.name_key`` allineato a ``name`` a ogni insert/update ORM."""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    event.listen(User, "before_insert", _set_name_key)
+    event.listen(User, "before_update", _set_name_key)
+    _hooks_registered = True
+
+
+def follower_counts(association_ids: Iterable[int]) -> Dict[int, int]:
+    """{association_id: numero di follower} con una query (0 per chi non ne ha)."""
+    ids = list(dict.fromkeys(association_ids))
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        select(follows.c.association_id, func.count())
+        .where(follows.c.association_id.in_(ids))
+        .group_by(follows.c.association_id)
+    )
+    counts = dict.fromkeys(ids, 0)
+    counts.update(dict(rows.all()))
+    return counts
+
+
+def encode_association_cursor(name_key: str, association_id: int) -> str:
+    return f"{name_key}~{association_id}"
+
+
+def decode_association_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Decodifica il cursore. Ritorna None se assente o non valido."""
+    if not cursor:
+        return None
+    try:
+        name, association_id = cursor.rsplit("~", 1)
+        return name, int(association_id)
+    except ValueError:
+        return None
+
+
+def associations_page(
+    cursor: Optional[str] = None,
+    letter: Optional[str] = None,
+    limit: int = ASSOCIATIONS_PAGE_SIZE,
+) -> Tuple[List[User], Dict[int, int], Optional[str]]:
+    """
+    Pagina di associazioni in ordine alfabetico (senza distinzione di
+    maiuscole e accenti), dal cursore; con ``letter`` solo quelle il cui nome
+    inizia con quella lettera. Il cursore va ripassato insieme alla stessa ``letter``.
+    Ritorna (associazioni, follower per id, cursore successivo o None).
+    """
+    query = User.query.filter(User.user_type == "association")
+    if letter:
+        # Range [a, b) invece di LIKE 'a%': servito dall'indice su qualsiasi DB
+        prefix = name_sort_key(letter)
+        query = query.filter(User.name_key >= prefix, User.name_key < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    key = decode_association_cursor(cursor)
+    if key is not None:
+        name_key, association_id = key
+        query = query.filter(or_(User.name_key > name_key, and_(User.name_key == name_key, User.id > association_id)))
+    rows = query.order_by(User.name_key, User.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_association_cursor(rows[-1].name_key, rows[-1].id)
+    return rows, follower_counts(a.id for a in rows), next_cursor
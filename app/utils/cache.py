@@ -0,0 +1,337 @@
+# app/utils/cache.py
+"""
+Cache delle pagine pubbliche (visitatori non autenticati).
+
+``@cached_page("user", "event")`` memorizza la risposta renderizzata con
+chiave endpoint + argomenti + query string + lingua. Le tabelle indicate
+sono le dipendenze della pagina: ognuna ha un numero di generazione che
+entra nella chiave e viene incrementato al commit di ogni transazione che
+la modifica (flush ORM o UPDATE/DELETE in blocco). Le pagine non vanno
+quindi cancellate una per una: le voci vecchie non vengono più lette e
+scadono per TTL/LRU.
+
+Ogni risposta servita da qui ha ETag e Last-Modified: browser e proxy
+rivalidano con If-None-Match / If-Modified-Since e ricevono un 304.
+
+Backend scelto con ``PAGE_CACHE_URL``:
+
+- ``memory://`` (default): LRU con TTL nel processo. Ogni processo vede solo
+  le proprie invalidazioni: con più worker gunicorn.conf.py usa file://.
+- ``file:///percorso``: directory condivisa tra i worker (generazioni comprese);
+  ``file://`` senza percorso usa la directory temporanea del sistema.
+- ``null://``: cache disattivata (restano ETag/304).
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Dict, Iterable, Optional, Set
+from urllib.parse import urlparse
+
+from flask import make_response, request, session
+from flask_babel import get_locale
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.wrappers import Response
+
+PAGE_CACHE_URL = os.getenv("PAGE_CACHE_URL", "memory://")
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "300"))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "2000"))
+
+# session.info: tabelle modificate nella transazione in corso
+_DIRTY_KEY = "page_cache_dirty_tables"
+_hooks_registered = False
+
+
+# ----------------- Backend -----------------
+class NullCache:
+    """Nessuna memorizzazione: ogni lettura è un miss."""
+
+    def get(self, key: str) -> Any:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        pass
+
+    def generation(self, name: str) -> int:
+        return 0
+
+    def bump(self, name: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(NullCache):
+    """LRU con scadenza, nel processo."""
+
+    def __init__(self, max_entries: int = PAGE_CACHE_MAX_ENTRIES, default_ttl: int = PAGE_CACHE_TTL) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str) -> None:
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class FileSystemCache(NullCache):
+    """
+    Una directory condivisa dai worker: un file per voce (scrittura atomica
+    con rename) e un file per generazione, fuori dalla potatura LRU.
+    """
+
+    PRUNE_EVERY = 100  # scritture tra una potatura e l'altra
+
+    def __init__(self, directory: str, max_entries: int = PAGE_CACHE_MAX_ENTRIES,
+                 default_ttl: int = PAGE_CACHE_TTL) -> None:
+        self.directory = directory
+        self.gen_directory = os.path.join(directory, "generations")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._writes = 0
+        os.makedirs(self.gen_directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".cache")
+
+    def _write(self, path: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expires_at = time.time() + (ttl or self.default_ttl)
+        self._write(self._path(key), pickle.dumps((expires_at, value), pickle.HIGHEST_PROTOCOL))
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        # Oltre max_entries si eliminano i file letti/scritti meno di recente
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".cache"):
+                    entries.append((entry.stat().st_mtime, entry.path))
+        for _, path in sorted(entries)[: max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def generation(self, name: str) -> int:
+        try:
+            with open(os.path.join(self.gen_directory, name), "rb") as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, name: str) -> None:
+        # Due bump concorrenti possono scrivere lo stesso valore: basta che cambi rispetto a prima
+        self._write(os.path.join(self.gen_directory, name), str(self.generation(name) + 1).encode())
+
+    def clear(self) -> None:
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".cache"):
+                    os.remove(entry.path)
+
+
+def create_cache(url: str) -> NullCache:
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryCache()
+    if parsed.scheme == "file":
+        return FileSystemCache(parsed.path or os.path.join(tempfile.gettempdir(), "volo-page-cache"))
+    if parsed.scheme == "null":
+        return NullCache()
+    raise ValueError(f"PAGE_CACHE_URL non supportato: {url}")
+
+
+_cache: Optional[NullCache] = None
+
+
+def get_cache() -> NullCache:
+    global _cache
+    if _cache is None:
+        _cache = create_cache(PAGE_CACHE_URL)
+    return _cache
+
+
+# ----------------- Invalidazione dagli eventi dei modelli -----------------
+def invalidate(*tables: str) -> None:
+    """Rende obsolete le pagine che dipendono dalle tabelle indicate."""
+    cache = get_cache()
+    for table in tables:
+        cache.bump(table)
+
+
+def _mark_dirty(session, tables: Iterable[str]) -> None:
+    session.info.setdefault(_DIRTY_KEY, set()).update(tables)
+
+
+def _after_flush(session, flush_context) -> None:
+    tables: Set[str] = set()
+    for obj in list(session.new) + list(session.deleted):
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tables.add(obj.__table__.name)
+    _mark_dirty(session, tables)
+
+
+def _do_orm_execute(state) -> None:
+    # UPDATE/DELETE/INSERT in blocco (contatori, reconcile...) non passano dal flush
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None and getattr(table, "name", None):
+            _mark_dirty(state.session, [table.name])
+
+
+def _after_commit(session) -> None:
+    tables = session.info.pop(_DIRTY_KEY, None)
+    if tables:
+        invalidate(*tables)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def register_cache_hooks() -> None:
+    """Collega gli hook di sessione che incrementano le generazioni al commit."""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    _hooks_registered = True
+
+
+def init_cache(app) -> None:
+    """Backend dalla configurazione e hook di invalidazione."""
+    global _cache
+    _cache = create_cache(app.config.get("PAGE_CACHE_URL", PAGE_CACHE_URL))
+    register_cache_hooks()
+
+
+# ----------------- Decoratore per le view -----------------
+def _cacheable_request() -> bool:
+    # Solo GET anonime senza messaggi flash in sospeso: la pagina è uguale per tutti
+    return (
+        request.method == "GET"
+        and not getattr(current_user, "is_authenticated", False)
+        and "_flashes" not in session
+    )
+
+
+def _page_key(tables) -> str:
+    cache = get_cache()
+    generations = ",".join(f"{t}={cache.generation(t)}" for t in tables)
+    view_args = sorted((request.view_args or {}).items())
+    query = sorted(request.args.items(multi=True))
+    return f"page:{request.endpoint}:{view_args}:{query}:{get_locale()}:{generations}"
+
+
+def _conditional(entry: Dict[str, Any]) -> Response:
+    resp = Response(entry["body"], status=200, mimetype=entry["mimetype"])
+    resp.set_etag(entry["etag"])
+    resp.last_modified = entry["last_modified"]
+    # Il proxy può tenerla ma deve rivalidare; la stessa URL da loggati è un'altra pagina
+    resp.cache_control.public = True
+    resp.cache_control.no_cache = True
+    resp.vary.update(("Cookie", "Accept-Language"))
+    return resp.make_conditional(request)
+
+
+def cached_page(*tables: str, ttl: Optional[int] = None):
+    """
+    Memorizza la pagina per i visitatori anonimi finché nessuna delle
+    ``tables`` cambia (o per ``ttl`` secondi) e risponde 304 alle rivalidazioni.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable_request():
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = _page_key(tables)
+            entry = cache.get(key)
+            if entry is not None:
+                return _conditional(entry)
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed or session.modified:
+                return resp
+
+            body = resp.get_data()
+            entry = {
+                "body": body,
+                "mimetype": resp.mimetype,
+                "etag": hashlib.sha1(body).hexdigest(),
+                "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+            }
+            cache.set(key, entry, ttl)
+            return _conditional(entry)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,196 @@
+# app/utils/chats.py
+"""
+Conversazioni e messaggi.
+
+Elenco: una sola query per le chat dell'utente (OR servito da
+ix_chats_user1_id e ix_chats_user2_id) in join con l'altro partecipante,
+ordinate per ultima attività e paginate con cursore keyset su
+(last_activity_at, id); l'anteprima dell'ultimo messaggio arriva con una
+seconda query su ix_chat_messages_chat_id_id.
+
+Messaggi: salvati in ``chat_messages``, la cronologia si legge a ritroso
+con cursore sull'id; dopo il commit ``publish_message`` li spinge sul canale
+``user:<id>`` di entrambi i partecipanti (stream SSE, vedi app.utils.pubsub).
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import url_for
+from sqlalchemy import and_, case, func, or_, select
+
+from app import db
+from app.database.models.chat import Chat, ChatMessage
+from app.database.models.user import User
+from app.utils.pubsub import publish, user_channel
+
+CONVERSATIONS_PAGE_SIZE = 30
+CONVERSATIONS_MAX_PAGE_SIZE = 100
+
+MESSAGES_PAGE_SIZE = 50
+MESSAGE_MAX_LENGTH = 2000
+
+# Messaggi rispediti a uno stream che si riconnette (Last-Event-ID); oltre, il client ricarica la cronologia
+STREAM_BACKLOG_LIMIT = 200
+
+
+def encode_conversation_cursor(ts: datetime, chat_id: int) -> str:
+    return f"{ts.isoformat()}~{chat_id}"
+
+
+def decode_conversation_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Decodifica il cursore. Ritorna None se assente o non valido."""
+    if not cursor:
+        return None
+    try:
+        ts, chat_id = cursor.rsplit("~", 1)
+        return datetime.fromisoformat(ts), int(chat_id)
+    except ValueError:
+        return None
+
+
+def _photo_url(photo_filename: Optional[str]) -> str:
+    if photo_filename:
+        return url_for("dashboard.static", filename="uploads/profile-photo/" + photo_filename)
+    return url_for("static", filename="img/avatar-placeholder.png")
+
+
+def conversations_page(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = CONVERSATIONS_PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Conversazioni dalla più recente: [{id, name, photo, chat_id, last_activity}]
+    dove ``id`` è l'altro utente. Ritorna (items, cursore successivo o None).
+    """
+    other_id = case((Chat.user1_id == user_id, Chat.user2_id), else_=Chat.user1_id)
+    stmt = (
+        select(Chat.id, Chat.last_activity_at, User.id, User.name, User.photo_filename)
+        .join(User, User.id == other_id)
+        .where(or_(Chat.user1_id == user_id, Chat.user2_id == user_id))
+    )
+    key = decode_conversation_cursor(cursor)
+    if key is not None:
+        ts, chat_id = key
+        stmt = stmt.where(or_(
+            Chat.last_activity_at < ts,
+            and_(Chat.last_activity_at == ts, Chat.id < chat_id),
+        ))
+    rows = db.session.execute(
+        stmt.order_by(Chat.last_activity_at.desc(), Chat.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_conversation_cursor(rows[-1][1], rows[-1][0])
+
+    last_messages = _last_messages([r[0] for r in rows])
+    items = [
+        {
+            "id": uid,
+            "name": name,
+            "photo": _photo_url(photo),
+            "chat_id": chat_id,
+            "last_activity": last_activity.isoformat(),
+            "last_message": last_messages.get(chat_id),
+        }
+        for chat_id, last_activity, uid, name, photo in rows
+    ]
+    return items, next_cursor
+
+
+def _last_messages(chat_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """{chat_id: ultimo messaggio} per le chat indicate, con una query."""
+    if not chat_ids:
+        return {}
+    last_ids = (
+        select(func.max(ChatMessage.id))
+        .where(ChatMessage.chat_id.in_(chat_ids))
+        .group_by(ChatMessage.chat_id)
+    )
+    rows = db.session.execute(select(ChatMessage).where(ChatMessage.id.in_(last_ids))).scalars()
+    return {m.chat_id: m.to_dict() for m in rows}
+
+
+# ----------------- Messaggi -----------------
+def chat_between(user_id: int, other_id: int) -> Optional[Chat]:
+    """Chat tra i due utenti (la coppia può essere salvata in entrambi gli ordini)."""
+    return Chat.query.filter(or_(
+        and_(Chat.user1_id == user_id, Chat.user2_id == other_id),
+        and_(Chat.user1_id == other_id, Chat.user2_id == user_id),
+    )).first()
+
+
+def get_or_create_chat(user_id: int, other_id: int) -> Chat:
+    """Chat tra i due utenti, creata se manca (commit al chiamante)."""
+    chat = chat_between(user_id, other_id)
+    if chat is None:
+        u1, u2 = sorted([user_id, other_id])
+        chat = Chat(user1_id=u1, user2_id=u2)
+        db.session.add(chat)
+        db.session.flush()
+    return chat
+
+
+def send_message(chat: Chat, sender_id: int, content: str) -> ChatMessage:
+    """Salva il messaggio e aggiorna l'ultima attività della chat (commit e publish_message al chiamante)."""
+    msg = ChatMessage(chat_id=chat.id, sender_id=sender_id, content=content[:MESSAGE_MAX_LENGTH],
+                      created_at=datetime.utcnow())
+    db.session.add(msg)
+    chat.last_activity_at = msg.created_at
+    db.session.flush()
+    return msg
+
+
+def _message_event(msg: ChatMessage, other_id: int) -> Dict[str, Any]:
+    data = msg.to_dict()
+    data["other_id"] = other_id  # l'interlocutore, dal punto di vista di chi riceve
+    return {"event": "message", "id": msg.id, "data": data}
+
+
+def publish_message(chat: Chat, msg: ChatMessage) -> None:
+    """Spinge il messaggio (già committato) agli stream di entrambi i partecipanti."""
+    for user_id in (chat.user1_id, chat.user2_id):
+        publish(user_channel(user_id), _message_event(msg, chat.other_user_id(user_id)))
+
+
+def messages_page(
+    chat_id: int,
+    before_id: Optional[int] = None,
+    limit: int = MESSAGES_PAGE_SIZE,
+) -> Tuple[List[ChatMessage], Optional[int]]:
+    """
+    Cronologia a ritroso (keyset su ix_chat_messages_chat_id_id).
+    Ritorna (messaggi in ordine cronologico, cursore per i più vecchi o None).
+    """
+    query = ChatMessage.query.filter(ChatMessage.chat_id == chat_id)
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return list(reversed(rows[:limit])), next_cursor
+
+
+def last_message_id(user_id: int) -> int:
+    """Id dell'ultimo messaggio nelle chat dell'utente (0 se nessuno): punto di partenza dello stream."""
+    return db.session.execute(
+        select(func.max(ChatMessage.id))
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(or_(Chat.user1_id == user_id, Chat.user2_id == user_id))
+    ).scalar() or 0
+
+
+def messages_since(user_id: int, after_id: int, limit: int = STREAM_BACKLOG_LIMIT) -> List[Dict[str, Any]]:
+    """Eventi SSE dei messaggi con id > ``after_id`` nelle chat dell'utente (riconnessione dello stream)."""
+    rows = db.session.execute(
+        select(ChatMessage, Chat)
+        .join(Chat, Chat.id == ChatMessage.chat_id)
+        .where(ChatMessage.id > after_id, or_(Chat.user1_id == user_id, Chat.user2_id == user_id))
+        .order_by(ChatMessage.id)
+        .limit(limit)
+    ).all()
+    return [_message_event(msg, chat.other_user_id(user_id)) for msg, chat in rows]
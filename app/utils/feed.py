@@ -1,90 +1,297 @@
 # app/utils/feed.py
 
+import base64
+import heapq
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+
 from app.database.models.event import Event
 from app.database.models.post import Post
 from app.database.models.campaign import Campaign
-from app.database.models.event import Event
-from app.database.models.post import Post
+from app.database.loaders import loader_options
+from app.utils.geo import haversine_km, radius_prefilter
+from app import db
 import unicodedata
 
 
-def get_feed_items(query=None):
-    events = Event.query
-    posts = Post.query
-    campaigns = Campaign.query
+# Dimensione pagina di default per il feed paginato (home + scroll infinito)
+FEED_PAGE_SIZE = 20
 
-    if query:
-        events = events.filter(Event.title.ilike(f'%{query}%'))
-        posts = posts.filter(Post.title.ilike(f'%{query}%') | Post.content.ilike(f'%{query}%'))
-        campaigns = campaigns.filter(Campaign.title.ilike(f'%{query}%') | Campaign.description.ilike(f'%{query}%'))
+# Sorgenti del feed: tipo -> (modello, colonna timestamp usata per l'ordinamento)
+FEED_SOURCES = {
+    "event": (Event, Event.date),
+    "post": (Post, Post.created_at),
+    "campaign": (Campaign, Campaign.created_at),
+}
 
-    events = events.order_by(Event.date.desc()).all()
-    posts = posts.order_by(Post.created_at.desc()).all()
-    campaigns = campaigns.order_by(Campaign.created_at.desc()).all()
 
-    feed = []
-
-    feed += [{
-        "type": "event",
-        "item": e,
-        "timestamp": e.date,
-        "title": e.title,
-        "description": e.description[:160] + "..." if e.description else "",
-        "image": None,
-        "url": f"/events/{e.id}"
-    } for e in events]
-
-    feed += [{
-        "type": "post",
-        "item": p,
-        "timestamp": p.created_at,
-        "title": p.title,
-        "description": p.content[:160] + "..." if p.content else "",
-        "image": None,
-        "url": f"/dashboard/post/{p.id}/edit"
-    } for p in posts]
-
-    feed += [{
+def _feed_entry(kind: str, obj) -> Dict[str, Any]:
+    """Costruisce il dict di un item del feed (formato usato da home.html)."""
+    if kind == "event":
+        return {
+            "type": "event",
+            "item": obj,
+            "timestamp": obj.date,
+            "title": obj.title,
+            "description": obj.description[:160] + "..." if obj.description else "",
+            "image": None,
+            "url": f"/events/{obj.id}"
+        }
+    if kind == "post":
+        return {
+            "type": "post",
+            "item": obj,
+            "timestamp": obj.created_at,
+            "title": obj.title,
+            "description": obj.content[:160] + "..." if obj.content else "",
+            "image": None,
+            "url": f"/dashboard/post/{obj.id}/edit"
+        }
+    return {
         "type": "campaign",
-        "item": c,
-        "timestamp": c.created_at,
-        "title": c.title,
-        "description": c.description[:160] + "..." if c.description else "",
+        "item": obj,
+        "timestamp": obj.created_at,
+        "title": obj.title,
+        "description": obj.description[:160] + "..." if obj.description else "",
         "image": None,
-        "url": f"/campaigns/{c.id}"
-    } for c in campaigns]
+        "url": f"/campaigns/{obj.id}"
+    }
+
+
+# ----------------- Feed paginato (keyset) -----------------
+FeedCursor = Tuple[datetime, str, int]
+
+
+class InvalidCursor(ValueError):
+    """Cursore non valido o emesso da un altro ordinamento del feed."""
+
+
+def encode_cursor(key: FeedCursor) -> str:
+    """Serializza la chiave (timestamp, type, id) in un cursore opaco per URL."""
+    ts, kind, item_id = key
+    raw = json.dumps([ts.isoformat(), kind, item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[FeedCursor]:
+    """Decodifica un cursore opaco. Ritorna None se assente o non valido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, kind, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if kind not in FEED_SOURCES:
+            return None
+        return datetime.fromisoformat(ts), kind, int(item_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _after_cursor(kind: str, ts_col, id_col, cursor: FeedCursor):
+    """
+    Predicato keyset per una singola sorgente: (ts, kind, id) < cursore,
+    in ordine lessicografico. Il tipo è costante per sorgente, quindi si
+    riduce a un confronto su (ts, id) che l'indice sul timestamp può servire.
+    """
+    c_ts, c_kind, c_id = cursor
+    if kind < c_kind:
+        return ts_col <= c_ts
+    if kind > c_kind:
+        return ts_col < c_ts
+    return or_(ts_col < c_ts, and_(ts_col == c_ts, id_col < c_id))
+
+
+# ----------------- Filtri del feed (WHERE lato DB) -----------------
+def feed_filters_from_args(args) -> Dict[str, Any]:
+    """Estrae i filtri del feed (type, association_id, q) dai parametri della richiesta."""
+    assoc_ids = []
+    for raw in args.getlist("association_id"):
+        try:
+            assoc_ids.append(int(raw))
+        except (TypeError, ValueError):
+            continue
+    return {
+        "types": [t for t in args.getlist("type") if t in FEED_SOURCES],
+        "association_ids": assoc_ids,
+        "q": (args.get("q") or "").strip(),
+    }
+
+
+def feed_filter_clauses(kind: str, association_ids=None, q: str = "") -> list:
+    """
+    Traduce i filtri del feed in clausole WHERE per la sorgente ``kind``.
+    Ogni token di ``q`` deve comparire nel testo indicizzato dell'item
+    (che include il nome dell'associazione), con accenti normalizzati.
+    """
+    model, _ = FEED_SOURCES[kind]
+    clauses = []
+
+    if association_ids:
+        clauses.append(model.association_id.in_(association_ids))
+
+    if q:
+        # Ricerca servita dall'indice full-text (FTS5 / tsvector), vedi app.utils.search
+        from app.utils.search import matching_ids
+        clauses.append(model.id.in_(matching_ids(kind, q)))
+
+    return clauses
+
+
+def get_feed_page(
+    cursor: Optional[str] = None,
+    limit: int = FEED_PAGE_SIZE,
+    types: Optional[List[str]] = None,
+    association_ids: Optional[List[int]] = None,
+    q: str = "",
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Ritorna una pagina del feed ordinata per (timestamp, type, id) decrescente
+    e il cursore della pagina successiva (None se non ci sono altri item).
+
+    Ogni sorgente applica i filtri nel DB e legge al massimo ``limit + 1``
+    righe già ordinate; le liste vengono poi unite con un k-way merge, quindi
+    solo la pagina richiesta esce dal database.
+    """
+    key = decode_cursor(cursor)
+    if cursor and key is None:
+        raise InvalidCursor(cursor)
+    kinds = [k for k in FEED_SOURCES if not types or k in types]
+
+    streams = []
+    for kind in kinds:
+        model, ts_col = FEED_SOURCES[kind]
+        q_rows = model.query.options(*loader_options(f"feed.{kind}")).filter(
+            *feed_filter_clauses(kind, association_ids, q)
+        )
+        if key is not None:
+            q_rows = q_rows.filter(_after_cursor(kind, ts_col, model.id, key))
+        rows = q_rows.order_by(ts_col.desc(), model.id.desc()).limit(limit + 1).all()
+        streams.append([_feed_entry(kind, obj) for obj in rows])
+
+    merged = list(heapq.merge(*streams, key=_entry_key, reverse=True))[: limit + 1]
+
+    next_cursor = None
+    if len(merged) > limit:
+        merged = merged[:limit]
+        next_cursor = encode_cursor(_entry_key(merged[-1]))
+    return merged, next_cursor
+
+
+# ----------------- Feed "vicino a me" -----------------
+# Raggio massimo considerato e tetto di candidati per sorgente: il ranking
+# avviene in memoria solo su questa finestra, qualunque sia la dimensione delle tabelle
+NEAR_RADIUS_KM = 50.0
+NEAR_CANDIDATES = 500
+# Punteggio = exp(-distanza / scala) * 0.5 ** (giorni da/a oggi / emivita)
+NEAR_DISTANCE_SCALE_KM = 10.0
+NEAR_HALF_LIFE_DAYS = 14.0
+NEAR_SOURCES = ("event", "campaign")  # i post non hanno coordinate
+NEAR_CURSOR_PREFIX = "near:"
+
+
+def encode_near_cursor(offset: int, now: datetime) -> str:
+    """Cursore del feed "vicino a me": offset nel ranking e istante del ranking."""
+    raw = json.dumps([offset, now.isoformat()], separators=(",", ":"))
+    return NEAR_CURSOR_PREFIX + base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_near_cursor(cursor: str) -> Tuple[int, datetime]:
+    """Inverso di encode_near_cursor. Solleva InvalidCursor per cursori estranei o malformati."""
+    if not cursor.startswith(NEAR_CURSOR_PREFIX):
+        raise InvalidCursor(cursor)
+    payload = cursor[len(NEAR_CURSOR_PREFIX):]
+    try:
+        padded = payload + "=" * (-len(payload) % 4)
+        offset, now = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return max(int(offset), 0), datetime.fromisoformat(now)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def near_score(distance_km: float, ts: Optional[datetime], now: datetime) -> float:
+    """Combina vicinanza e attualità in un punteggio in (0, 1]."""
+    days = abs((now - ts).total_seconds()) / 86400 if ts else NEAR_HALF_LIFE_DAYS * 4
+    return math.exp(-distance_km / NEAR_DISTANCE_SCALE_KM) * 0.5 ** (days / NEAR_HALF_LIFE_DAYS)
+
+
+def _near_candidates(kind: str, lat: float, lng: float, radius_km: float, now: datetime, association_ids, q):
+    """
+    Finestra limitata di candidati per una sorgente: prefiltro geohash + filtri
+    del feed nel DB, poi distanza esatta. Gli eventi passati sono esclusi e si
+    prendono i più imminenti; per le campagne le più recenti.
+    """
+    model, ts_col = FEED_SOURCES[kind]
+    stmt = select(model.id, model.latitude, model.longitude, ts_col.label("ts")).where(
+        radius_prefilter(model, lat, lng, radius_km), *feed_filter_clauses(kind, association_ids, q)
+    )
+    if kind == "event":
+        stmt = stmt.where(ts_col >= now).order_by(ts_col.asc())
+    else:
+        stmt = stmt.order_by(ts_col.desc())
+
+    for row in db.session.execute(stmt.limit(NEAR_CANDIDATES)):
+        d = haversine_km(lat, lng, row.latitude, row.longitude)
+        if d <= radius_km:
+            yield near_score(d, row.ts, now), kind, row.id, d
+
+
+def get_near_feed_page(
+    lat: float,
+    lng: float,
+    cursor: Optional[str] = None,
+    limit: int = FEED_PAGE_SIZE,
+    types: Optional[List[str]] = None,
+    association_ids: Optional[List[int]] = None,
+    q: str = "",
+    radius_km: float = NEAR_RADIUS_KM,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Pagina del feed ordinata per vicinanza a (lat, lng) e attualità.
+    Il cursore porta l'offset nel ranking e l'istante della prima pagina, così
+    le pagine successive ricalcolano lo stesso ordinamento; solo gli oggetti
+    della pagina vengono caricati come ORM. Ogni item ha in più ``distance_km``.
+    """
+    if cursor:
+        offset, now = decode_near_cursor(cursor)
+    else:
+        offset, now = 0, datetime.utcnow()
+    kinds = [k for k in NEAR_SOURCES if not types or k in types]
+
+    ranked = []
+    for kind in kinds:
+        ranked.extend(_near_candidates(kind, lat, lng, radius_km, now, association_ids, q))
+    ranked.sort(key=lambda r: (-r[0], r[1], r[2]))
+    page = ranked[offset: offset + limit]
+
+    objs = {}
+    for kind in kinds:
+        ids = [item_id for _, k, item_id, _ in page if k == kind]
+        if ids:
+            model, _ = FEED_SOURCES[kind]
+            rows = model.query.options(*loader_options(f"feed.{kind}")).filter(model.id.in_(ids))
+            objs.update({(kind, o.id): o for o in rows})
+
+    entries = []
+    for _, kind, item_id, distance in page:
+        obj = objs.get((kind, item_id))
+        if obj is not None:
+            entry = _feed_entry(kind, obj)
+            entry["distance_km"] = distance
+            entries.append(entry)
+
+    next_cursor = encode_near_cursor(offset + limit, now) if len(ranked) > offset + limit else None
+    return entries, next_cursor
+
+
+def _entry_key(entry: Dict[str, Any]) -> FeedCursor:
+    return entry["timestamp"], entry["type"], entry["item"].id
 
-    feed.sort(key=lambda x: x["timestamp"], reverse=True)
-    return feed
 
 def _normalize(s: str) -> str:
     s = (s or "").strip().lower()
     s = unicodedata.normalize("NFKD", s)
     return "".join(ch for ch in s if not unicodedata.combining(ch))
-
-def collect_search_text(obj) -> str:
-    """Crea un testo unico per la ricerca full-text su item del feed."""
-    parts = []
-    for attr in ("title", "name", "description", "content", "location", "address", "city", "category"):
-        val = getattr(obj, attr, None)
-        if val:
-            parts.append(str(val).strip().lower())
-
-    skills = getattr(obj, "skills", None)
-    if skills:
-        if isinstance(skills, (list, tuple, set)):
-            parts.extend(str(s).lower() for s in skills)
-        else:
-            parts.append(str(skills).lower())
-
-    assoc = getattr(obj, "association", None)
-    if assoc and getattr(assoc, "name", None):
-        parts.append(assoc.name.strip().lower())
-
-    return _normalize(" ".join(parts))
-
-def matches_query(text: str, q: str) -> bool:
-    """Verifica se tutti i token della query compaiono nel testo normalizzato."""
-    norm_text = _normalize(text)
-    tokens = [_normalize(t) for t in q.split() if t.strip()]
-    return all(tok in norm_text for tok in tokens)
\ No newline at end of file
@@ -0,0 +1,445 @@
+# app/utils/geo.py
+"""
+Feature geografiche per la mappa: interrogazioni per bounding box.
+
+Le query usano predicati di range su (latitude, longitude), serviti dagli
+indici ``ix_<tabella>_geo``, e leggono solo le colonne che servono al marker;
+il dettaglio (descrizione, immagine, ...) si carica al click. A zoom bassi
+i punti vengono aggregati in celle di griglia direttamente nel DB.
+
+Le query per raggio ("vicino a me") usano invece la colonna ``geohash``,
+mantenuta dagli hook dei modelli: prefiltro per prefisso di cella (indice)
+e distanza esatta (haversine) solo sui candidati.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import click
+from flask import url_for
+from flask.cli import AppGroup
+from sqlalchemy import Integer, and_, bindparam, cast, event, func, or_, select
+
+from app import db
+from app.database.models.campaign import Campaign
+from app.database.models.event import Event
+from app.database.models.petition import Petition
+from app.database.models.report import Report
+from app.database.models.user import User
+
+# Tetto di feature per risposta: oltre, la risposta è marcata "truncated"
+MAX_FEATURES = 2000
+
+# tipo -> (modello, colonna data mostrata sul marker)
+GEO_SOURCES = {
+    "event": (Event, Event.date),
+    "campaign": (Campaign, Campaign.created_at),
+    "report": (Report, Report.created_at),
+    "petition": (Petition, Petition.created_at),
+}
+
+BBox = Tuple[float, float, float, float]  # (ovest, sud, est, nord)
+
+
+def parse_bbox(raw: Optional[str]) -> Optional[BBox]:
+    """
+    "ovest,sud,est,nord" in gradi -> tupla, None se assente.
+    Solleva ValueError se malformato o fuori range.
+    """
+    if not raw:
+        return None
+    parts = [float(p) for p in raw.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox deve avere 4 valori: ovest,sud,est,nord")
+    west, south, east, north = parts
+    if not (-90 <= south <= north <= 90) or not (-180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("bbox fuori range")
+    return west, south, east, north
+
+
+def bbox_condition(model, bbox: Optional[BBox]):
+    """Predicato di range sulle coordinate (gestisce il box a cavallo dell'antimeridiano)."""
+    conds = [model.latitude.isnot(None), model.longitude.isnot(None)]
+    if bbox is None:
+        return and_(*conds)
+    west, south, east, north = bbox
+    conds.append(model.latitude.between(south, north))
+    if west <= east:
+        conds.append(model.longitude.between(west, east))
+    else:
+        conds.append(or_(model.longitude >= west, model.longitude <= east))
+    return and_(*conds)
+
+
+def detail_url(kind: str, item_id: int) -> str:
+    """URL della pagina di dettaglio per tipo/id."""
+    if kind == "event":
+        return url_for("events.event_detail", event_id=item_id)
+    if kind == "campaign":
+        return url_for("campaigns.campaign_detail", campaign_id=item_id)
+    if kind == "report":
+        return url_for("public.detail", content_type="report", item_id=item_id)
+    return url_for("petitions.petition_detail", petition_id=item_id)
+
+
+def _feature(kind: str, row) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "id": f"{kind}:{row.id}",
+        "geometry": {"type": "Point", "coordinates": [row.longitude, row.latitude]},
+        "properties": {
+            "type": kind,
+            "id": row.id,
+            "title": row.title,
+            "date": row.date.isoformat() if row.date else None,
+        },
+    }
+
+
+def _filtered(kind: str, columns, bbox, date_from, date_to, q, extra=()):
+    """SELECT di ``columns`` per il tipo ``kind`` con bbox, filtri comuni e clausole ``extra`` applicati."""
+    model, date_col = GEO_SOURCES[kind]
+    stmt = select(*columns).where(bbox_condition(model, bbox), *extra)
+    if date_from is not None:
+        stmt = stmt.where(date_col >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(date_col <= date_to)
+    if q:
+        from app.utils.search import matching_ids
+        stmt = stmt.where(model.id.in_(matching_ids(kind, q)))
+    return stmt
+
+
+def _point_columns(kind: str):
+    model, date_col = GEO_SOURCES[kind]
+    return (model.id, model.title, model.latitude, model.longitude, date_col.label("date"))
+
+
+def features_in_bbox(
+    bbox: Optional[BBox],
+    types: Iterable[str],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    q: str = "",
+    limit: int = MAX_FEATURES,
+    criteria: Optional[Dict[str, list]] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Feature GeoJSON dei tipi richiesti dentro ``bbox``.
+    ``criteria`` aggiunge clausole WHERE per tipo ({"event": [...]}).
+    Ritorna (feature, truncated) con al massimo ``limit`` feature in totale.
+    """
+    features: List[Dict[str, Any]] = []
+    truncated = False
+    for kind in types:
+        date_col = GEO_SOURCES[kind][1]
+        extra = (criteria or {}).get(kind, ())
+        stmt = _filtered(kind, _point_columns(kind), bbox, date_from, date_to, q, extra)
+
+        remaining = limit - len(features)
+        rows = db.session.execute(stmt.order_by(date_col.desc()).limit(remaining + 1)).all()
+        if len(rows) > remaining:
+            rows, truncated = rows[:remaining], True
+        features.extend(_feature(kind, r) for r in rows)
+        if truncated:
+            break
+    return features, truncated
+
+
+# ----------------- Clustering a griglia -----------------
+# Sotto questo zoom i punti vengono aggregati in celle; da qui in su si inviano i singoli punti
+CLUSTER_MAX_ZOOM = 14
+# Celle per lato di una tile web-mercator da 256px (4 -> celle di ~64px)
+CELLS_PER_TILE = 4
+
+
+def grid_cell_size(zoom: int) -> float:
+    """Lato della cella di griglia in gradi allo zoom indicato."""
+    return 360.0 / (2 ** max(0, zoom)) / CELLS_PER_TILE
+
+
+def _cell_index(column, offset: float, cell: float):
+    # floor((col + offset) / cell): il valore è sempre >= 0, quindi su SQLite basta il CAST;
+    # PostgreSQL arrotonda nei CAST a intero e vuole floor() esplicito
+    expr = (column + offset) / cell
+    if db.engine.dialect.name == "postgresql":
+        return func.floor(expr)
+    return cast(expr, Integer)
+
+
+def clusters_in_bbox(
+    bbox: Optional[BBox],
+    zoom: int,
+    types: Iterable[str],
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    q: str = "",
+) -> List[Dict[str, Any]]:
+    """
+    Aggregazione a griglia nel DB: una riga per (cella, tipo) con conteggio e
+    baricentro. Le celle con un solo elemento tornano come punti normali, le
+    altre come cluster con i conteggi per tipo e lo zoom a cui si espandono.
+    """
+    cell = grid_cell_size(zoom)
+    cells: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    singles: Dict[str, List[int]] = {}
+
+    for kind in types:
+        model = GEO_SOURCES[kind][0]
+        gx = _cell_index(model.longitude, 180.0, cell).label("gx")
+        gy = _cell_index(model.latitude, 90.0, cell).label("gy")
+        stmt = _filtered(
+            kind,
+            (gx, gy, func.count(model.id).label("n"), func.avg(model.latitude).label("lat"),
+             func.avg(model.longitude).label("lng"), func.min(model.id).label("first_id")),
+            bbox, date_from, date_to, q,
+        ).group_by(gx, gy)
+
+        for row in db.session.execute(stmt):
+            c = cells.setdefault((int(row.gx), int(row.gy)), {"count": 0, "lat": 0.0, "lng": 0.0, "counts": {}})
+            c["count"] += row.n
+            c["lat"] += row.lat * row.n
+            c["lng"] += row.lng * row.n
+            c["counts"][kind] = row.n
+            c["single"] = (kind, row.first_id)
+
+    features: List[Dict[str, Any]] = []
+    expansion_zoom = min(zoom + 2, CLUSTER_MAX_ZOOM)
+    for (gx, gy), c in cells.items():
+        if c["count"] == 1:
+            kind, item_id = c["single"]
+            singles.setdefault(kind, []).append(item_id)
+            continue
+        features.append({
+            "type": "Feature",
+            "id": f"cluster:{zoom}:{gx}:{gy}",
+            "geometry": {"type": "Point", "coordinates": [c["lng"] / c["count"], c["lat"] / c["count"]]},
+            "properties": {
+                "cluster": True,
+                "count": c["count"],
+                "counts": c["counts"],
+                "expansion_zoom": expansion_zoom,
+            },
+        })
+
+    # I punti isolati vengono letti in blocco, una query per tipo
+    for kind, ids in singles.items():
+        model = GEO_SOURCES[kind][0]
+        rows = db.session.execute(select(*_point_columns(kind)).where(model.id.in_(ids)))
+        features.extend(_feature(kind, r) for r in rows)
+    return features
+
+
+def feature_detail(kind: str, item_id: int) -> Optional[Dict[str, Any]]:
+    """Dettaglio completo di una feature (per la info window al click)."""
+    model, date_col = GEO_SOURCES[kind]
+    obj = db.session.get(model, item_id)
+    if obj is None:
+        return None
+    date = getattr(obj, date_col.key, None)
+    association = getattr(obj, "association", None)
+    return {
+        "id": obj.id,
+        "type": kind,
+        "title": obj.title,
+        "description": obj.description,
+        "date": date.isoformat() if date else None,
+        "latitude": obj.latitude,
+        "longitude": obj.longitude,
+        "location": getattr(obj, "location", None) or getattr(obj, "address", None),
+        "image_filename": getattr(obj, "image_filename", None),
+        "duration": getattr(obj, "duration", None),
+        "activity": getattr(obj, "activity", None),
+        "association_id": association.id if association else None,
+        "association_name": association.name if association else None,
+        "association_photo_filename": getattr(association, "photo_filename", None) if association else None,
+        "url": detail_url(kind, obj.id),
+    }
+
+
+# ----------------- Geohash e query per raggio -----------------
+# 9 caratteri = celle di ~5m: abbastanza per qualsiasi raggio sensato
+GEOHASH_PRECISION = 9
+GEOHASH_MODELS = (Event, Campaign, Report, Petition, User)
+EARTH_RADIUS_KM = 6371.0088
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_KM_PER_DEG_LAT = 111.2
+_hooks_registered = False
+
+
+def encode_geohash(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash (base32) del punto alla precisione indicata."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars: List[str] = []
+    bits = nbits = 0
+    even = True  # i bit si alternano: longitudine, latitudine, ...
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = bits * 2 + 1, mid
+            else:
+                bits, lng_hi = bits * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = bits * 2 + 1, mid
+            else:
+                bits, lat_hi = bits * 2, mid
+        even = not even
+        nbits += 1
+        if nbits == 5:
+            chars.append(_BASE32[bits])
+            bits = nbits = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """(altezza, larghezza) in gradi di una cella geohash."""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distanza ortodromica in km."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _search_precision(lat: float, radius_km: float) -> int:
+    # Precisione più fine le cui celle sono ancora larghe almeno quanto il raggio:
+    # così il cerchio sta sempre nella cella del centro più le 8 vicine.
+    # Per la larghezza si usa il parallelo più vicino al polo toccato dal cerchio.
+    edge_lat = min(90.0, abs(lat) + radius_km / _KM_PER_DEG_LAT)
+    km_per_deg_lng = _KM_PER_DEG_LAT * math.cos(math.radians(edge_lat))
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        dlat, dlng = geohash_cell_size(precision)
+        if min(dlat * _KM_PER_DEG_LAT, dlng * km_per_deg_lng) >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> List[str]:
+    """Prefissi geohash (cella del centro + vicine) che coprono il cerchio; [] = nessun prefiltro."""
+    precision = _search_precision(lat, radius_km)
+    if precision == 0:
+        return []
+    dlat, dlng = geohash_cell_size(precision)
+    cells = set()
+    for i in (-1, 0, 1):
+        cell_lat = lat + i * dlat
+        if not -90.0 <= cell_lat <= 90.0:
+            continue
+        for j in (-1, 0, 1):
+            cell_lng = (lng + j * dlng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(cell_lat, cell_lng, precision))
+    return sorted(cells)
+
+
+def _prefix_condition(column, prefix: str):
+    # Range [prefix, successore) invece di LIKE 'prefix%': usa l'indice su
+    # qualsiasi DB senza dipendere da collation o case_sensitive_like
+    stem = prefix.rstrip(_BASE32[-1])
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + _BASE32[_BASE32.index(stem[-1]) + 1]
+    return and_(column >= prefix, column < upper)
+
+
+def radius_prefilter(model, lat: float, lng: float, radius_km: float):
+    """
+    Predicato indicizzato (celle geohash) che contiene tutti i punti entro
+    ``radius_km``, più qualche falso positivo da scartare con ``haversine_km``.
+    """
+    conds = [model.latitude.isnot(None), model.longitude.isnot(None)]
+    cells = covering_cells(lat, lng, radius_km)
+    if cells:
+        conds.append(or_(*[_prefix_condition(model.geohash, c) for c in cells]))
+    return and_(*conds)
+
+
+def nearby_ids(model, lat: float, lng: float, radius_km: float, *criteria) -> List[Tuple[int, float]]:
+    """
+    [(id, distanza_km)] degli elementi di ``model`` entro ``radius_km``,
+    dal più vicino. ``criteria`` sono filtri aggiuntivi sulla stessa query.
+    """
+    stmt = select(model.id, model.latitude, model.longitude).where(
+        radius_prefilter(model, lat, lng, radius_km), *criteria
+    )
+
+    hits = []
+    for row in db.session.execute(stmt):
+        d = haversine_km(lat, lng, row.latitude, row.longitude)
+        if d <= radius_km:
+            hits.append((row.id, d))
+    hits.sort(key=lambda h: h[1])
+    return hits
+
+
+def nearby(model, lat: float, lng: float, radius_km: float, *criteria, limit: Optional[int] = None) -> List[Tuple[Any, float]]:
+    """Come ``nearby_ids`` ma con gli oggetti: [(oggetto, distanza_km)], al più ``limit``."""
+    hits = nearby_ids(model, lat, lng, radius_km, *criteria)
+    if limit is not None:
+        hits = hits[:limit]
+    if not hits:
+        return []
+    objs = {o.id: o for o in model.query.filter(model.id.in_([i for i, _ in hits]))}
+    return [(objs[i], d) for i, d in hits if i in objs]
+
+
+def _set_geohash(mapper, connection, target) -> None:
+    lat, lng = target.latitude, target.longitude
+    target.geohash = encode_geohash(lat, lng) if lat is not None and lng is not None else None
+
+
+def register_geohash_hooks() -> None:
+    """Mantiene ``geohash`` allineato alle coordinate a ogni insert/update ORM."""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    for model in GEOHASH_MODELS:
+        event.listen(model, "before_insert", _set_geohash)
+        event.listen(model, "before_update", _set_geohash)
+    _hooks_registered = True
+
+
+def backfill_geohash(batch_size: int = 1000) -> int:
+    """Ricalcola ``geohash`` dove manca (righe inserite fuori dall'ORM). Ritorna le righe aggiornate."""
+    updated = 0
+    for model in GEOHASH_MODELS:
+        while True:
+            rows = db.session.execute(
+                select(model.id, model.latitude, model.longitude)
+                .where(model.geohash.is_(None), model.latitude.isnot(None), model.longitude.isnot(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            db.session.execute(
+                model.__table__.update().where(model.__table__.c.id == bindparam("_id")),
+                [{"_id": r.id, "geohash": encode_geohash(r.latitude, r.longitude)} for r in rows],
+            )
+            db.session.commit()
+            updated += len(rows)
+    return updated
+
+
+geo_cli = AppGroup("geo", help="Indici geografici.")
+
+
+@geo_cli.command("backfill")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+def backfill_command(batch_size: int) -> None:
+    """Calcola il geohash delle righe che ne sono prive."""
+    click.echo(f"Geohash aggiornati: {backfill_geohash(batch_size)}")
+
+
+def init_geo(app) -> None:
+    """Registra gli hook geohash dei modelli e i comandi CLI."""
+    register_geohash_hooks()
+    app.cli.add_command(geo_cli)
@@ -0,0 +1,69 @@
+# app/utils/jobs.py
+"""
+Coda di job locale: esegue lavoro lento (PDF, notifiche in blocco) fuori
+dal ciclo richiesta/risposta, in un pool di thread del processo web.
+
+Ogni job gira in un app context con la propria sessione DB; le eccezioni
+vengono loggate e non arrivano mai alla richiesta che lo ha accodato.
+I job non sopravvivono a un riavvio: chi li accoda deve poterli
+ripetere (es. la ricevuta viene riaccodata dal polling se manca).
+
+Con i worker gevent (gunicorn.conf.py) ``threading`` è patchato e un
+ThreadPoolExecutor normale gira su greenlet: un PDF di ReportLab (CPU pura)
+bloccherebbe l'intero worker, stream SSE compresi. In quel caso i job vanno
+nel pool di thread veri di gevent.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from flask import current_app
+
+from app import db
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def _gevent_patched() -> bool:
+    return "gevent.monkey" in sys.modules and sys.modules["gevent.monkey"].is_module_patched("threading")
+
+
+def _create_executor() -> Executor:
+    if _gevent_patched():
+        # Thread del sistema operativo anche con threading patchato
+        from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+        return NativeThreadPoolExecutor(max_workers=JOB_WORKERS)
+    return ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="jobs")
+
+
+def get_executor() -> Executor:
+    """Pool dei job (creato al primo uso: dopo il fork e il monkey-patching del worker)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = _create_executor()
+    return _executor
+
+
+def enqueue(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Accoda ``func(*args, **kwargs)``: verrà eseguita in background dentro l'app context corrente."""
+    app = current_app._get_current_object()
+    return get_executor().submit(_run, app, func, args, kwargs)
+
+
+def _run(app, func, args, kwargs) -> Any:
+    with app.app_context():
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Job %s fallito", getattr(func, "__name__", func))
+            raise
+        finally:
+            db.session.remove()
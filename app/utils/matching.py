@@ -0,0 +1,287 @@
+# app/utils/matching.py
+"""
+Matching volontari <-> eventi su skills, disponibilità e distanza.
+
+Ogni lato è ridotto a un ``MatchProfile`` compatto: le skills e i giorni
+disponibili sono bitset (int Python, intersezione con ``&`` e conteggio con
+``int.bit_count``), le coordinate restano float. Il punteggio di tutti i
+candidati si calcola in un unico passaggio sul batch caricato con una sola
+query, poi si tengono i migliori con ``heapq.nlargest``.
+
+Le skills del volontario non sono un campo del profilo: si ricavano dalle
+skills degli eventi a cui è stato accettato e da parole chiave nella bio.
+Contano solo le skills del form evento (``SKILL_KEYWORDS``): ognuna ha un bit
+fisso, le altre (testo libero storico) sono ignorate.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_, select, true
+
+from app import db
+from app.database.models.event import Event, event_skill
+from app.database.models.participation import Participation
+from app.database.models.user import User
+from app.utils.geo import EARTH_RADIUS_KM, radius_prefilter
+from app.utils.skills import skills_by_event
+
+# Pesi delle componenti del punteggio (somma 1)
+SKILL_WEIGHT = 0.5
+DISTANCE_WEIGHT = 0.3
+AVAILABILITY_WEIGHT = 0.2
+# Oltre questa distanza il candidato è escluso; la componente distanza decade come exp(-d/scala)
+MATCH_MAX_KM = 60.0
+MATCH_DISTANCE_SCALE_KM = 15.0
+# Valori neutri quando un dato manca (evento senza skills, utente senza posizione/disponibilità)
+NEUTRAL_SKILL = 0.5
+NEUTRAL_DISTANCE = 0.3
+NEUTRAL_AVAILABILITY = 0.5
+SUGGESTION_LIMIT = 6
+# Id per ogni IN (...) sui volontari candidati (limite dei parametri SQLite)
+IN_CHUNK_SIZE = 500
+# Volontari senza posizione valutati per evento: i più attivi di recente
+UNLOCATED_CANDIDATES_LIMIT = 500
+
+# Skills del form evento, con le parole che le richiamano in una bio
+SKILL_KEYWORDS = {
+    "fisica": ("fisica", "forza", "manuale"),
+    "informatica": ("informatica", "digitale", "digitali", "computer", "social"),
+    "logistica": ("logistica", "magazzino", "trasporti", "patente"),
+    "relazione": ("relazione", "pubblico", "accoglienza", "ascolto"),
+    "organizzazione": ("organizzazione", "coordinamento", "eventi"),
+}
+
+# Giorni (lunedì = bit 0, come datetime.weekday()) riconosciuti nella disponibilità
+_WEEKDAYS = 0b0011111
+_WEEKEND = 0b1100000
+_DAY_WORDS = {
+    "lunedi": 1 << 0, "lun": 1 << 0, "monday": 1 << 0,
+    "martedi": 1 << 1, "mar": 1 << 1, "tuesday": 1 << 1,
+    "mercoledi": 1 << 2, "mer": 1 << 2, "wednesday": 1 << 2,
+    "giovedi": 1 << 3, "gio": 1 << 3, "thursday": 1 << 3,
+    "venerdi": 1 << 4, "ven": 1 << 4, "friday": 1 << 4,
+    "sabato": 1 << 5, "sab": 1 << 5, "saturday": 1 << 5,
+    "domenica": 1 << 6, "dom": 1 << 6, "sunday": 1 << 6,
+    "weekend": _WEEKEND, "festivi": _WEEKEND,
+    "feriali": _WEEKDAYS, "infrasettimanali": _WEEKDAYS, "weekdays": _WEEKDAYS,
+    "sempre": _WEEKDAYS | _WEEKEND,
+}
+_PHRASES = {"fine settimana": _WEEKEND, "tutti i giorni": _WEEKDAYS | _WEEKEND}
+_WORD_RE = re.compile(r"\w+")
+
+# Bit assegnati alle skills del vocabolario, in ordine fisso
+_SKILL_BITS: Dict[str, int] = {name: 1 << i for i, name in enumerate(SKILL_KEYWORDS)}
+
+
+class MatchProfile(NamedTuple):
+    id: int
+    lat: Optional[float]
+    lng: Optional[float]
+    skills: int  # bitset delle skills
+    days: int  # bitset dei giorni (0 = non indicato)
+
+
+def _normalize(s: str) -> str:
+    s = unicodedata.normalize("NFKD", (s or "").lower())
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+
+def skill_mask(skills: Iterable[str]) -> int:
+    """Bitset delle skills (quelle fuori dal vocabolario non hanno bit)."""
+    mask = 0
+    for name in skills:
+        mask |= _SKILL_BITS.get(name, 0)
+    return mask
+
+
+def keyword_skill_mask(text: Optional[str]) -> int:
+    """Skills note richiamate da parole chiave in un testo libero (bio)."""
+    words = set(_WORD_RE.findall(_normalize(text or "")))
+    mask = 0
+    for name, keywords in SKILL_KEYWORDS.items():
+        if words.intersection(keywords):
+            mask |= _SKILL_BITS[name]
+    return mask
+
+
+def availability_mask(text: Optional[str]) -> int:
+    """Giorni disponibili da un testo libero ("sabato e domenica", "weekend", ...); 0 = non indicato."""
+    norm = _normalize(text or "")
+    mask = 0
+    for word in _WORD_RE.findall(norm):
+        mask |= _DAY_WORDS.get(word, 0)
+    for phrase, days in _PHRASES.items():
+        if phrase in norm:
+            mask |= days
+    return mask
+
+
+def _rank(anchor: MatchProfile, candidates: Sequence[MatchProfile], anchor_is_event: bool, limit: int):
+    """
+    Punteggio di tutti i candidati rispetto ad ``anchor`` in un solo passaggio.
+    La copertura delle skills è sempre calcolata sulle skills richieste dall'evento.
+    Ritorna [(id, punteggio, distanza_km | None)] dei migliori ``limit``.
+    """
+    has_pos = anchor.lat is not None and anchor.lng is not None
+    if has_pos:
+        a_lat, a_lng = math.radians(anchor.lat), math.radians(anchor.lng)
+        cos_lat = math.cos(a_lat)
+    max_rad = MATCH_MAX_KM / EARTH_RADIUS_KM
+    scale_rad = MATCH_DISTANCE_SCALE_KM / EARTH_RADIUS_KM
+    radians, exp, hypot = math.radians, math.exp, math.hypot
+
+    scored = []
+    for c in candidates:
+        # Distanza equirettangolare: sotto i ~100 km l'errore rispetto a haversine è trascurabile
+        if has_pos and c.lat is not None and c.lng is not None:
+            d = hypot((radians(c.lng) - a_lng) * cos_lat, radians(c.lat) - a_lat)
+            if d > max_rad:
+                continue
+            dist_score, dist_km = exp(-d / scale_rad), d * EARTH_RADIUS_KM
+        else:
+            dist_score, dist_km = NEUTRAL_DISTANCE, None
+
+        required, offered = (anchor.skills, c.skills) if anchor_is_event else (c.skills, anchor.skills)
+        skill_score = (required & offered).bit_count() / required.bit_count() if required else NEUTRAL_SKILL
+
+        days = anchor.days & c.days if anchor.days and c.days else -1
+        avail_score = NEUTRAL_AVAILABILITY if days == -1 else (1.0 if days else 0.0)
+
+        score = SKILL_WEIGHT * skill_score + DISTANCE_WEIGHT * dist_score + AVAILABILITY_WEIGHT * avail_score
+        scored.append((score, c.id, dist_km))
+
+    best = heapq.nlargest(limit, scored, key=lambda s: (s[0], -s[1]))
+    return [(item_id, score, dist_km) for score, item_id, dist_km in best]
+
+
+def rank_events(volunteer: MatchProfile, events: Sequence[MatchProfile], limit: int = SUGGESTION_LIMIT):
+    """Migliori eventi per un volontario: [(event_id, punteggio, distanza_km)]."""
+    return _rank(volunteer, events, anchor_is_event=False, limit=limit)
+
+
+def rank_volunteers(event: MatchProfile, volunteers: Sequence[MatchProfile], limit: int = SUGGESTION_LIMIT):
+    """Migliori volontari per un evento: [(user_id, punteggio, distanza_km)]."""
+    return _rank(event, volunteers, anchor_is_event=True, limit=limit)
+
+
+# ----------------- Caricamento profili dal DB -----------------
+def _event_profile(row, skills: Iterable[str]) -> MatchProfile:
+    days = 1 << row.date.weekday() if row.date else 0
+    return MatchProfile(row.id, row.latitude, row.longitude, skill_mask(skills), days)
+
+
+def _history_skills(volunteer_ids: Sequence[int]) -> Dict[int, int]:
+    """
+    Bitset delle skills degli eventi a cui ogni volontario indicato è stato
+    accettato: una query su event_skill per blocco di ``IN_CHUNK_SIZE`` id.
+    """
+    stmt = (
+        select(Participation.volunteer_id, event_skill.c.skill)
+        .join(event_skill, event_skill.c.event_id == Participation.event_id)
+        .where(Participation.status == "accepted")
+    )
+    masks: Dict[int, int] = {}
+    for start in range(0, len(volunteer_ids), IN_CHUNK_SIZE):
+        chunk = volunteer_ids[start:start + IN_CHUNK_SIZE]
+        for volunteer_id, skill in db.session.execute(stmt.where(Participation.volunteer_id.in_(chunk))):
+            masks[volunteer_id] = masks.get(volunteer_id, 0) | _SKILL_BITS.get(skill, 0)
+    return masks
+
+
+def volunteer_profile(user: User) -> MatchProfile:
+    """Profilo di matching di un volontario."""
+    skills = _history_skills([user.id]).get(user.id, 0) | keyword_skill_mask(user.bio)
+    return MatchProfile(user.id, user.latitude, user.longitude, skills, availability_mask(user.disponibilita))
+
+
+def _near_or_unlocated(model, lat, lng):
+    # Candidati entro il raggio (prefiltro geohash) più quelli senza coordinate
+    if lat is None or lng is None:
+        return true()
+    return or_(radius_prefilter(model, lat, lng, MATCH_MAX_KM), model.latitude.is_(None), model.longitude.is_(None))
+
+
+def open_event_profiles(near: Optional[MatchProfile] = None, exclude_ids: Iterable[int] = ()) -> List[MatchProfile]:
+    """Profili degli eventi futuri, vicini a ``near`` se indicato."""
+    stmt = select(Event.id, Event.latitude, Event.longitude, Event.date).where(Event.date >= datetime.utcnow())
+    if near is not None:
+        stmt = stmt.where(_near_or_unlocated(Event, near.lat, near.lng))
+    exclude = set(exclude_ids)
+    skills = skills_by_event(stmt.with_only_columns(Event.id))
+    return [_event_profile(r, skills.get(r.id, ())) for r in db.session.execute(stmt) if r.id not in exclude]
+
+
+def _recently_active_first(stmt, limit: int):
+    """Ordina per ultima candidatura (poi i più recenti iscritti) e tiene i primi ``limit``."""
+    last_applied = (
+        select(Participation.volunteer_id, func.max(Participation.applied_at).label("applied_at"))
+        .group_by(Participation.volunteer_id)
+        .subquery()
+    )
+    return (
+        stmt.outerjoin(last_applied, last_applied.c.volunteer_id == User.id)
+        .order_by(last_applied.c.applied_at.desc().nulls_last(), User.id.desc())
+        .limit(limit)
+    )
+
+
+def volunteer_profiles(near: Optional[MatchProfile] = None, exclude_ids: Iterable[int] = ()) -> List[MatchProfile]:
+    """
+    Profili dei volontari, vicini a ``near`` se indicato. Quelli di cui non si
+    può calcolare la distanza (senza posizione, o ``near`` senza posizione) non
+    sono limitati dal raggio: se ne prendono al massimo
+    ``UNLOCATED_CANDIDATES_LIMIT``, i più attivi di recente.
+    """
+    stmt = select(User.id, User.latitude, User.longitude, User.bio, User.disponibilita).where(
+        User.user_type == "volunteer"
+    )
+    exclude = set(exclude_ids)
+    # Gli esclusi non devono consumare posti del tetto
+    unlocated_limit = UNLOCATED_CANDIDATES_LIMIT + len(exclude)
+    if near is None or near.lat is None or near.lng is None:
+        stmts = [_recently_active_first(stmt, unlocated_limit)]
+    else:
+        stmts = [
+            stmt.where(radius_prefilter(User, near.lat, near.lng, MATCH_MAX_KM)),
+            _recently_active_first(
+                stmt.where(or_(User.latitude.is_(None), User.longitude.is_(None))), unlocated_limit
+            ),
+        ]
+    rows = [r for q in stmts for r in db.session.execute(q) if r.id not in exclude]
+    history = _history_skills([r.id for r in rows])
+    return [
+        MatchProfile(
+            r.id, r.latitude, r.longitude,
+            history.get(r.id, 0) | keyword_skill_mask(r.bio),
+            availability_mask(r.disponibilita),
+        )
+        for r in rows
+    ]
+
+
+def suggested_events(user: User, limit: int = SUGGESTION_LIMIT) -> List[Tuple[Event, float, Optional[float]]]:
+    """Eventi futuri consigliati al volontario (esclusi quelli a cui si è già candidato)."""
+    profile = volunteer_profile(user)
+    applied = db.session.execute(
+        select(Participation.event_id).where(Participation.volunteer_id == user.id)
+    ).scalars()
+    ranked = rank_events(profile, open_event_profiles(profile, applied), limit)
+    events = {e.id: e for e in Event.query.filter(Event.id.in_([i for i, _, _ in ranked]))}
+    return [(events[i], score, dist) for i, score, dist in ranked if i in events]
+
+
+def suggested_volunteers(event: Event, limit: int = SUGGESTION_LIMIT) -> List[Tuple[User, float, Optional[float]]]:
+    """Volontari consigliati per l'evento (esclusi quelli già candidati)."""
+    profile = _event_profile(event, skills_by_event([event.id]).get(event.id, ()))
+    applied = db.session.execute(
+        select(Participation.volunteer_id).where(Participation.event_id == event.id)
+    ).scalars()
+    ranked = rank_volunteers(profile, volunteer_profiles(profile, applied), limit)
+    users = {u.id: u for u in User.query.filter(User.id.in_([i for i, _, _ in ranked]))}
+    return [(users[i], score, dist) for i, score, dist in ranked if i in users]
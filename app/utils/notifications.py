@@ -0,0 +1,234 @@
+# app/utils/notifications.py
+"""
+Notifiche: creazione in blocco, conteggio dei non letti e paginazione.
+
+``notify_many`` inserisce tutte le righe con un solo INSERT executemany
+nella transazione del chiamante (o in background, su richiesta).
+Il badge usa un COUNT servito da ``ix_notification_user_read`` e memorizzato
+per qualche secondo in processo; la cache viene invalidata quando una
+notifica dell'utente viene creata o modificata.
+
+Push: le notifiche create in una transazione vengono pubblicate sul canale
+``notifications:<user_id>`` (app.utils.pubsub) solo dopo il commit e
+arrivano al client sullo stream SSE dell'utente (app.utils.streams, insieme
+ai messaggi della chat), che legge dal broker del processo, non dal DB: una
+sola query al collegamento per rispedire quanto perso (``Last-Event-ID``).
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import g
+from flask_login import current_user
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.database.models.notification import Notification
+from app.utils.jobs import enqueue
+from app.utils.pubsub import publish
+
+NOTIFICATIONS_PAGE_SIZE = 20
+
+# Notifiche rispedite a uno stream che si riconnette; oltre, il pannello ricarica la lista
+STREAM_BACKLOG_LIMIT = 100
+
+# session.info: notifiche da pubblicare al commit della transazione
+_PENDING_KEY = "notifications_to_publish"
+
+# Durata massima di un conteggio in cache (gli altri worker gunicorn non vedono le invalidazioni)
+UNREAD_CACHE_TTL = 30.0
+
+_unread_cache: Dict[int, Tuple[float, int]] = {}
+
+
+def invalidate_unread(user_id: Optional[int]) -> None:
+    """Scarta il conteggio in cache per l'utente."""
+    if user_id is not None:
+        _unread_cache.pop(user_id, None)
+
+
+def notify_many(
+    user_ids: Iterable[int],
+    type: str,
+    message: str,
+    url: Optional[str] = None,
+    post_id: Optional[int] = None,
+    background: bool = False,
+) -> int:
+    """
+    Crea la stessa notifica per più utenti con un solo INSERT executemany.
+
+    In modalità sincrona le righe entrano nella transazione corrente (il
+    commit resta al chiamante). Con ``background=True`` l'inserimento passa
+    dalla coda di job (app.utils.jobs), con la propria sessione e commit.
+    Ritorna il numero di destinatari.
+    """
+    recipients = sorted({uid for uid in user_ids if uid is not None})
+    if not recipients:
+        return 0
+
+    if background:
+        enqueue(_notify_in_background, recipients, type, message, url, post_id)
+        return len(recipients)
+
+    _insert_notifications(recipients, type, message, url, post_id)
+    return len(recipients)
+
+
+def notify(user_id: int, type: str, message: str, url: Optional[str] = None, **kwargs) -> int:
+    """Shortcut di notify_many per un solo destinatario."""
+    return notify_many([user_id], type, message, url, **kwargs)
+
+
+def _insert_notifications(recipients: List[int], type: str, message: str,
+                          url: Optional[str], post_id: Optional[int]) -> None:
+    now = datetime.utcnow()
+    rows = db.session.execute(
+        insert(Notification).returning(Notification.id, Notification.user_id, sort_by_parameter_order=True),
+        [
+            {"user_id": uid, "type": type, "message": message, "url": url,
+             "post_id": post_id, "is_read": False, "created_at": now}
+            for uid in recipients
+        ],
+    ).all()
+    # Gli INSERT in blocco non passano dai mapper event: invalida e accoda a mano
+    pending = db.session.info.setdefault(_PENDING_KEY, [])
+    for notification_id, uid in rows:
+        invalidate_unread(uid)
+        pending.append({
+            "id": notification_id, "user_id": uid, "type": type, "message": message, "url": url,
+            "is_read": False, "created_at": now.isoformat(),
+        })
+
+
+def _notify_in_background(recipients, type, message, url, post_id) -> None:
+    _insert_notifications(recipients, type, message, url, post_id)
+    db.session.commit()
+
+
+def unread_count(user_id: int) -> int:
+    """Numero di notifiche non lette (COUNT indicizzato, in cache per UNREAD_CACHE_TTL secondi)."""
+    now = time.monotonic()
+    cached = _unread_cache.get(user_id)
+    if cached and now - cached[0] < UNREAD_CACHE_TTL:
+        return cached[1]
+
+    count = db.session.execute(
+        select(func.count(Notification.id)).where(
+            Notification.user_id == user_id,
+            Notification.is_read.is_(False),
+        )
+    ).scalar() or 0
+    _unread_cache[user_id] = (now, count)
+    return count
+
+
+def notifications_page(
+    user_id: int,
+    before_id: Optional[int] = None,
+    limit: int = NOTIFICATIONS_PAGE_SIZE,
+) -> Tuple[List[Notification], Optional[int]]:
+    """
+    Pagina di notifiche dalla più recente, con cursore sull'id (keyset).
+    Ritorna (notifiche, cursore successivo o None).
+    """
+    query = Notification.query.filter(Notification.user_id == user_id)
+    if before_id is not None:
+        query = query.filter(Notification.id < before_id)
+    rows = query.order_by(Notification.id.desc()).limit(limit + 1).all()
+
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _current_unread_count() -> int:
+    """Conteggio per la navbar, calcolato al massimo una volta per richiesta."""
+    if not getattr(current_user, "is_authenticated", False):
+        return 0
+    if "unread_notifications" not in g:
+        g.unread_notifications = unread_count(current_user.id)
+    return g.unread_notifications
+
+
+def notifications_context() -> Dict[str, Any]:
+    """Context processor: espone ``unread_notifications_count()`` ai template."""
+    return {"unread_notifications_count": _current_unread_count}
+
+
+@event.listens_for(Notification, "after_insert")
+@event.listens_for(Notification, "after_update")
+@event.listens_for(Notification, "after_delete")
+def _invalidate_on_change(mapper, connection, target) -> None:
+    invalidate_unread(target.user_id)
+
+
+# ----------------- Push (SSE) -----------------
+def notification_channel(user_id: int) -> str:
+    return f"notifications:{user_id}"
+
+
+def notification_event(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload per lo stream: ``id`` è l'id della notifica (Last-Event-ID alla riconnessione)."""
+    return {"event": "notification", "id": data["id"], "data": data}
+
+
+@event.listens_for(Notification, "after_insert")
+def _queue_on_insert(mapper, connection, target) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, []).append(target.to_dict())
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session) -> None:
+    for data in session.info.pop(_PENDING_KEY, ()):
+        publish(notification_channel(data["user_id"]), notification_event(data))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def last_notification_id(user_id: int) -> int:
+    """Id dell'ultima notifica dell'utente (0 se nessuna): punto di partenza dello stream."""
+    return db.session.execute(
+        select(func.max(Notification.id)).where(Notification.user_id == user_id)
+    ).scalar() or 0
+
+
+def notifications_since(user_id: int, after_id: int, limit: int = STREAM_BACKLOG_LIMIT) -> List[Dict[str, Any]]:
+    """Eventi delle notifiche con id > ``after_id`` (riconnessione dello stream)."""
+    rows = (
+        Notification.query
+        .filter(Notification.user_id == user_id, Notification.id > after_id)
+        .order_by(Notification.id)
+        .limit(limit)
+        .all()
+    )
+    return [notification_event(n.to_dict()) for n in rows]
+
+
+def mark_read(user_id: int, up_to_id: Optional[int] = None, before: Optional[datetime] = None) -> int:
+    """
+    Segna come lette le notifiche dell'utente con un solo UPDATE.
+    ``up_to_id``/``before`` limitano l'operazione a quanto il client ha già
+    visto, così le notifiche arrivate dopo restano non lette.
+    Ritorna il numero di righe aggiornate.
+    """
+    stmt = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read.is_(False))
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    if up_to_id is not None:
+        stmt = stmt.where(Notification.id <= up_to_id)
+    if before is not None:
+        stmt = stmt.where(Notification.created_at <= before)
+
+    result = db.session.execute(stmt)
+    # Gli UPDATE in blocco non passano dai mapper event: invalida a mano
+    invalidate_unread(user_id)
+    return result.rowcount
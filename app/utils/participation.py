@@ -0,0 +1,168 @@
+# app/utils/participation.py
+"""
+Capienza degli eventi: contatore denormalizzato ``Event.accepted_count``.
+
+Il posto si prenota con un UPDATE condizionale
+(``... SET accepted_count = accepted_count + 1 WHERE accepted_count < capacity_max``):
+il DB serializza le scritture sulla riga dell'evento, quindi accettazioni
+concorrenti non superano mai la capienza e non servono lock applicativi.
+Ogni cambio di stato passa da qui, nella stessa transazione della Participation.
+
+Lista d'attesa: a evento pieno la candidatura entra come ``waitlisted``.
+Quando un posto si libera (annullamento, rifiuto, aumento della capienza)
+``promote_waitlist`` accetta i primi in coda in ordine di ``applied_at``:
+ogni "prossimo" è la prima riga di ix_participation_event_status_applied,
+una discesa nell'indice (O(log n)) anche con migliaia di candidati.
+"""
+from typing import List, Optional
+
+import click
+from flask import has_request_context, url_for
+from flask.cli import AppGroup
+from sqlalchemy import func, or_, select, update
+
+from app import db
+from app.database.models.event import Event
+from app.database.models.participation import Participation
+from app.utils.notifications import notify_many
+
+WAITLIST_STATUS = "waitlisted"
+
+
+def _expire_count(event_id: int) -> None:
+    # L'UPDATE non sincronizza la sessione: l'evento eventualmente caricato rilegge il contatore
+    obj = db.session.identity_map.get(db.session.identity_key(Event, event_id))
+    if obj is not None:
+        db.session.expire(obj, ["accepted_count"])
+
+
+def reserve_seat(event_id: int) -> bool:
+    """Occupa un posto se disponibile (o se l'evento è illimitato). False se l'evento è pieno."""
+    result = db.session.execute(
+        update(Event)
+        .where(
+            Event.id == event_id,
+            or_(Event.capacity_max.is_(None), Event.accepted_count < Event.capacity_max),
+        )
+        .values(accepted_count=Event.accepted_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    _expire_count(event_id)
+    return result.rowcount == 1
+
+
+def release_seat(event_id: int) -> None:
+    """Libera un posto occupato."""
+    db.session.execute(
+        update(Event)
+        .where(Event.id == event_id, Event.accepted_count > 0)
+        .values(accepted_count=Event.accepted_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    _expire_count(event_id)
+
+
+def set_participation_status(part: Participation, status: str) -> bool:
+    """
+    Cambia lo stato della partecipazione tenendo allineato il contatore.
+    Ritorna False (stato invariato) se per accettarla non ci sono più posti.
+    """
+    if part.status == status:
+        return True
+    if status == "accepted":
+        if not reserve_seat(part.event_id):
+            return False
+        part.status = status
+    elif part.status == "accepted":
+        release_seat(part.event_id)
+        part.status = status
+        promote_waitlist(part.event_id)
+    else:
+        part.status = status
+    return True
+
+
+def remove_participation(part: Participation) -> None:
+    """Elimina la partecipazione; se era accettata libera il posto e promuove il primo in lista d'attesa."""
+    was_accepted = part.status == "accepted"
+    if was_accepted:
+        release_seat(part.event_id)
+    db.session.delete(part)
+    if was_accepted:
+        promote_waitlist(part.event_id)
+
+
+def join_waitlist(event_id: int, volunteer_id: int) -> Participation:
+    """Crea la candidatura in lista d'attesa (commit al chiamante)."""
+    part = Participation(volunteer_id=volunteer_id, event_id=event_id, status=WAITLIST_STATUS)
+    db.session.add(part)
+    return part
+
+
+def promote_waitlist(event_id: int, url: Optional[str] = None) -> List[int]:
+    """
+    Accetta i primi volontari in lista d'attesa finché ci sono posti liberi,
+    nella transazione del chiamante, e li avvisa con una sola notify_many.
+    Ritorna gli id dei volontari promossi.
+
+    Ogni posto passa comunque da reserve_seat; con ``SKIP LOCKED`` (dove il
+    DB lo supporta) due promozioni concorrenti non si contendono le stesse righe.
+    """
+    capacity, accepted = db.session.execute(
+        select(Event.capacity_max, Event.accepted_count).where(Event.id == event_id)
+    ).one()
+    free = None if capacity is None else capacity - accepted
+    if free is not None and free <= 0:
+        return []
+
+    stmt = (
+        select(Participation)
+        .where(Participation.event_id == event_id, Participation.status == WAITLIST_STATUS)
+        .order_by(Participation.applied_at, Participation.id)
+        .with_for_update(skip_locked=True)
+    )
+    if free is not None:
+        stmt = stmt.limit(free)
+
+    promoted: List[int] = []
+    for part in db.session.execute(stmt).scalars():
+        if not reserve_seat(event_id):
+            break
+        part.status = "accepted"
+        promoted.append(part.volunteer_id)
+
+    if promoted:
+        title = db.session.execute(select(Event.title).where(Event.id == event_id)).scalar()
+        notify_many(
+            promoted,
+            type="participation_update",
+            message=f"Si è liberato un posto: sei stato ACCETTATO all’evento '{title}'",
+            url=url or (url_for("events.event_detail", event_id=event_id) if has_request_context() else None),
+        )
+    return promoted
+
+
+def reconcile_accepted_counts() -> int:
+    """Ricalcola Event.accepted_count da participation. Ritorna quante righe sono state corrette."""
+    actual = (
+        select(func.count(Participation.id))
+        .where(Participation.event_id == Event.id, Participation.status == "accepted")
+        .scalar_subquery()
+    )
+    result = db.session.execute(
+        Event.__table__.update()
+        .where(Event.__table__.c.accepted_count != actual)
+        .values(accepted_count=actual)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+participation_cli = AppGroup("participation", help="Manutenzione dei contatori di partecipazione.")
+
+
+@participation_cli.command("reconcile")
+def reconcile_command() -> None:
+    """Ricalcola i contatori accepted_count di tutti gli eventi."""
+    fixed = reconcile_accepted_counts()
+    click.echo(f"Contatori corretti: {fixed}")
@@ -1,10 +1,15 @@
 # app/utils/pdf_generator.py
 from __future__ import annotations
 
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
 from pathlib import Path
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from typing import Optional, Any
+from typing import Optional, Any, BinaryIO, Union
 
 from jinja2 import Environment, FileSystemLoader
 
@@ -17,14 +22,16 @@ from reportlab.platypus import (
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
+from reportlab import rl_config
 
 
 # === Percorsi base ===
 APP_DIR = Path(__file__).resolve().parents[1]  # .../app
 TEMPLATES_PDF_DIR = APP_DIR / "templates" / "pdf"
 
-# Cartella target: app/blueprints/static/download/receipts
-RECEIPTS_DIR = APP_DIR / "blueprints" / "static" / "download" / "receipts"
+# Cartella target: instance/receipts, fuori da ogni cartella statica servita
+# (i PDF contengono dati dei donatori e passano solo da payments.download_receipt)
+RECEIPTS_DIR = Path(os.getenv("RECEIPTS_DIR", APP_DIR.parent / "instance" / "receipts"))
 RECEIPTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # Logo opzionale (prima esistente vince)
@@ -34,6 +41,10 @@ POSSIBLE_LOGOS = [
 ]
 LOGO_PATH: Optional[Path] = next((p for p in POSSIBLE_LOGOS if p.exists()), None)
 
+# Ingombro massimo del logo e risoluzione a cui viene ridimensionato una volta sola
+LOGO_MAX_SIZE = (42*mm, 22*mm)
+LOGO_DPI = 300
+
 
 # ----------------- Helpers -----------------
 def _format_eur(value: Any) -> str:
@@ -50,10 +61,14 @@ def _format_date_it(dt: Optional[datetime]) -> str:
     dt = dt or datetime.utcnow()
     return dt.strftime("%d/%m/%Y")
 
+@lru_cache(maxsize=1)
+def _jinja_env() -> Environment:
+    """Environment Jinja dei template PDF (uno per processo, con la cache dei template compilati)."""
+    return Environment(loader=FileSystemLoader(str(TEMPLATES_PDF_DIR)))
+
 def _load_text_from_template(donation, campaign, extra: dict) -> str:
     """Renderizza il testo base (se vuoi un .txt ‘plain’ nel PDF)."""
-    env = Environment(loader=FileSystemLoader(str(TEMPLATES_PDF_DIR)))
-    template = env.get_template("receipt_template.txt")
+    template = _jinja_env().get_template("receipt_template.txt")
     return template.render(
         full_name=donation.full_name or "Anonimo",
         email=donation.email,
@@ -65,46 +80,7 @@ def _load_text_from_template(donation, campaign, extra: dict) -> str:
     )
 
 
-# ----------------- API principale -----------------
-def generate_receipt(donation, campaign) -> str:
-    """
-    Genera un PDF in app/blueprints/static/download/receipts
-    e ritorna il solo filename (es. 'donation_12.pdf').
-    Layout: Certificazione / Dichiarazione di erogazione liberale.
-    """
-    # Nome file stabile
-    filename = f"donation_{donation.id}.pdf"
-    pdf_path = RECEIPTS_DIR / filename
-
-    # Metadati
-    receipt_number = f"{donation.id:06d}"
-    created_at = getattr(donation, "created_at", None)
-
-    # === Dati Associazione (fallback intelligenti) ===
-    assoc = getattr(campaign, "association", None) or getattr(campaign, "owner", None)
-
-    association_name = (
-        getattr(assoc, "name", None)
-        or getattr(campaign, "organization_name", None)
-        or "Associazione beneficiaria"
-    )
-    association_tax_id = (
-        getattr(assoc, "tax_id", None)
-        or getattr(assoc, "vat_number", None)
-        or getattr(campaign, "tax_id", None)
-        or "—"
-    )
-    association_address = (
-        getattr(assoc, "address", None)
-        or getattr(campaign, "address", None)
-        or "—"
-    )
-
-    # Eventuali info extra (opzionali)
-    donor_fiscal_code = getattr(donation, "fiscal_code", None)  # se nel modello esiste
-    payment_ref = getattr(donation, "payment_reference", None)  # es. id stripe o CRO
-
-    # Stili
+def _build_styles():
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name="TitleCenter", parent=styles["Heading1"], alignment=TA_CENTER, spaceAfter=8))
     styles.add(ParagraphStyle(name="Subtle", parent=styles["Normal"], fontSize=9, textColor=colors.grey, alignment=TA_CENTER))
@@ -112,143 +88,323 @@ def generate_receipt(donation, campaign) -> str:
     styles.add(ParagraphStyle(name="Small", parent=styles["Normal"], fontSize=9, textColor=colors.grey))
     styles.add(ParagraphStyle(name="Label", parent=styles["Normal"], fontName="Helvetica-Bold"))
     styles.add(ParagraphStyle(name="Right", parent=styles["Normal"], alignment=TA_RIGHT))
+    return styles
 
-    doc = SimpleDocTemplate(
-        str(pdf_path),
-        pagesize=A4,
-        leftMargin=20*mm,
-        rightMargin=20*mm,
-        topMargin=16*mm,
-        bottomMargin=16*mm,
-        title=f"Certificazione donazione {receipt_number}",
-        author=association_name,
-        subject="Dichiarazione di erogazione liberale",
-    )
-
-    story = []
 
-    # Header/logo
-    if LOGO_PATH:
+def _prepare_logo(path: Optional[Path]):
+    """
+    Carica il logo e lo riduce una volta all'ingombro di stampa (LOGO_DPI):
+    ritorna (png_bytes, larghezza, altezza) in punti, o None se assente/illeggibile.
+    """
+    if not path:
+        return None
+    try:
+        from PIL import Image as PILImage
+
+        with PILImage.open(path) as im:
+            # come Image._restrictSize: riduce soltanto, mai ingrandisce
+            scale = min(1.0, LOGO_MAX_SIZE[0] / im.width, LOGO_MAX_SIZE[1] / im.height)
+            draw_w, draw_h = im.width * scale, im.height * scale
+            px = (max(1, round(draw_w * LOGO_DPI / 72)), max(1, round(draw_h * LOGO_DPI / 72)))
+            if px[0] < im.width:
+                im = im.resize(px, PILImage.LANCZOS)
+            buf = BytesIO()
+            im.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), draw_w, draw_h
+    except Exception:
+        return None
+
+
+# ----------------- Renderer -----------------
+# ReportLab legge useA85 dal modulo rl_config durante il build: lo si cambia
+# solo per i nostri documenti, un build alla volta, e poi si ripristina.
+_rl_config_lock = threading.Lock()
+
+
+@contextmanager
+def _stream_encoding(use_a85: bool):
+    with _rl_config_lock:
+        previous = rl_config.useA85
+        rl_config.useA85 = int(use_a85)
         try:
-            img = Image(str(LOGO_PATH))
-            img._restrictSize(42*mm, 22*mm)
-            story.append(img)
+            yield
+        finally:
+            rl_config.useA85 = previous
+
+
+class ReceiptRenderer:
+    """
+    Layout della certificazione di erogazione liberale.
+
+    Stili, TableStyle e logo (già ridimensionato) vengono costruiti una volta
+    nel costruttore e riusati per ogni ricevuta: sono oggetti in sola lettura
+    durante ``doc.build``, quindi un'istanza può servire più thread.
+
+    Gli stream delle immagini sono binari (``use_a85 = False``): senza
+    rl_accel l'encoder ASCII85 è in puro Python e da solo costava più di
+    metà del tempo di ogni ricevuta.
+    """
+
+    use_a85 = False
+
+    def __init__(self, logo_path: Optional[Path] = LOGO_PATH) -> None:
+        self.styles = _build_styles()
+        self.grid_style = TableStyle([
+            ("BOX", (0,0), (-1,-1), 0.5, colors.lightgrey),
+            ("INNERGRID", (0,0), (-1,-1), 0.25, colors.lightgrey),
+            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+            ("LEFTPADDING", (0,0), (-1,-1), 6),
+            ("RIGHTPADDING", (0,0), (-1,-1), 6),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 4),
+            ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
+        ])
+        self.signature_style = TableStyle([
+            ("LINEABOVE", (0,1), (0,1), 0.3, colors.grey),
+            ("LINEABOVE", (1,1), (1,1), 0.3, colors.grey),
+            ("TEXTCOLOR", (0,0), (-1,0), colors.grey),
+            ("BOTTOMPADDING", (0,0), (-1,-1), 6),
+        ])
+        self._logo = _prepare_logo(logo_path)
+
+    def _logo_flowable(self) -> Optional[Image]:
+        # Il flowable ha stato per-documento: se ne crea uno nuovo dai byte già pronti
+        if not self._logo:
+            return None
+        data, width, height = self._logo
+        return Image(BytesIO(data), width=width, height=height)
+
+    def render(self, donation, campaign, target: Union[str, Path, BinaryIO]) -> None:
+        """Scrive il PDF della ricevuta su ``target`` (percorso o file binario aperto)."""
+        styles = self.styles
+
+        # Metadati
+        receipt_number = f"{donation.id:06d}"
+        created_at = getattr(donation, "created_at", None)
+
+        # === Dati Associazione (fallback intelligenti) ===
+        assoc = getattr(campaign, "association", None) or getattr(campaign, "owner", None)
+
+        association_name = (
+            getattr(assoc, "name", None)
+            or getattr(campaign, "organization_name", None)
+            or "Associazione beneficiaria"
+        )
+        association_tax_id = (
+            getattr(assoc, "tax_id", None)
+            or getattr(assoc, "vat_number", None)
+            or getattr(campaign, "tax_id", None)
+            or "—"
+        )
+        association_address = (
+            getattr(assoc, "address", None)
+            or getattr(campaign, "address", None)
+            or "—"
+        )
+
+        # Eventuali info extra (opzionali)
+        donor_fiscal_code = getattr(donation, "fiscal_code", None)  # se nel modello esiste
+        payment_ref = getattr(donation, "payment_reference", None)  # es. id stripe o CRO
+
+        doc = SimpleDocTemplate(
+            str(target) if isinstance(target, Path) else target,
+            pagesize=A4,
+            leftMargin=20*mm,
+            rightMargin=20*mm,
+            topMargin=16*mm,
+            bottomMargin=16*mm,
+            title=f"Certificazione donazione {receipt_number}",
+            author=association_name,
+            subject="Dichiarazione di erogazione liberale",
+        )
+
+        story = []
+
+        # Header/logo
+        logo = self._logo_flowable()
+        if logo is not None:
+            story.append(logo)
             story.append(Spacer(1, 6))
-        except Exception:
-            pass
-
-    # Titolo documento
-    story.append(Paragraph("Certificazione di Erogazione Liberale", styles["TitleCenter"]))
-    story.append(Paragraph(f"Ricevuta n. {receipt_number} – {campaign.title}", styles["Subtle"]))
-    story.append(Spacer(1, 8))
-
-    # Blocco Ente Beneficiario
-    story.append(Paragraph("Ente beneficiario", styles["H2"]))
-    ente_table = Table(
-        [
-            ["Denominazione", association_name],
-            ["C.F./P.IVA", association_tax_id],
-            ["Indirizzo", association_address],
-        ],
-        colWidths=[35*mm, None],
-        hAlign="LEFT",
-    )
-    ente_table.setStyle(TableStyle([
-        ("BOX", (0,0), (-1,-1), 0.5, colors.lightgrey),
-        ("INNERGRID", (0,0), (-1,-1), 0.25, colors.lightgrey),
-        ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-        ("LEFTPADDING", (0,0), (-1,-1), 6),
-        ("RIGHTPADDING", (0,0), (-1,-1), 6),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 4),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ]))
-    story.append(ente_table)
-    story.append(Spacer(1, 8))
-
-    # Blocco Donatore
-    story.append(Paragraph("Dati del donatore", styles["H2"]))
-    donor_rows = [
-        ["Nome/Cognome o Rag. Sociale", donation.full_name or "Anonimo"],
-        ["Email", donation.email or "—"],
-    ]
-    if donor_fiscal_code:
-        donor_rows.append(["Codice Fiscale/Partita IVA", donor_fiscal_code])
-
-    donor_table = Table(donor_rows, colWidths=[55*mm, None], hAlign="LEFT")
-    donor_table.setStyle(TableStyle([
-        ("BOX", (0,0), (-1,-1), 0.5, colors.lightgrey),
-        ("INNERGRID", (0,0), (-1,-1), 0.25, colors.lightgrey),
-        ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-        ("LEFTPADDING", (0,0), (-1,-1), 6),
-        ("RIGHTPADDING", (0,0), (-1,-1), 6),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 4),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ]))
-    story.append(donor_table)
-    story.append(Spacer(1, 8))
-
-    # Dati della donazione
-    story.append(Paragraph("Dettaglio della donazione", styles["H2"]))
-    donation_rows = [
-        ["Data", _format_date_it(created_at)],
-        ["Importo", f"€ {_format_eur(donation.amount)}"],
-        ["Metodo di pagamento", donation.method or "—"],
-        ["Campagna/Progetto", campaign.title],
-        ["Numero ricevuta", receipt_number],
-    ]
-    if payment_ref:
-        donation_rows.append(["Riferimento pagamento", payment_ref])
-
-    donation_table = Table(donation_rows, colWidths=[50*mm, None], hAlign="LEFT")
-    donation_table.setStyle(TableStyle([
-        ("BOX", (0,0), (-1,-1), 0.5, colors.lightgrey),
-        ("INNERGRID", (0,0), (-1,-1), 0.25, colors.lightgrey),
-        ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-        ("LEFTPADDING", (0,0), (-1,-1), 6),
-        ("RIGHTPADDING", (0,0), (-1,-1), 6),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 4),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ]))
-    story.append(donation_table)
-    story.append(Spacer(1, 8))
-
-    # Dichiarazione
-    dichiarazione = (
-        "La presente donazione è effettuata a titolo di <b>erogazione liberale</b> "
-        "e sarà utilizzata esclusivamente per le <b>finalità istituzionali</b> dell’ente beneficiario. "
-        "Il presente documento è rilasciato ai fini delle agevolazioni fiscali previste dalla normativa vigente."
-    )
-    story.append(Paragraph("Dichiarazione", styles["H2"]))
-    story.append(Paragraph(dichiarazione, styles["Normal"]))
-    story.append(Spacer(1, 10))
-
-    # Firma & Timbro
-    firma_table = Table(
-        [
-            ["Luogo e data", "Firma e timbro dell’associazione"],
-            [association_address if association_address != "—" else "__________________", "_____________________________"],
-        ],
-        colWidths=[90*mm, None],
-        hAlign="LEFT",
-    )
-    firma_table.setStyle(TableStyle([
-        ("LINEABOVE", (0,1), (0,1), 0.3, colors.grey),
-        ("LINEABOVE", (1,1), (1,1), 0.3, colors.grey),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.grey),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 6),
-    ]))
-    story.append(firma_table)
-    story.append(Spacer(1, 8))
-
-    # Footer note legali (facoltative)
-    note = (
-        "Documento generato automaticamente. In caso di pagamento elettronico (es. carta/Stripe), "
-        "fa fede la transazione registrata. Conservare il presente documento per la dichiarazione dei redditi."
-    )
-    story.append(Paragraph(note, styles["Small"]))
 
-    # Costruisci PDF
-    doc.build(story)
+        # Titolo documento
+        story.append(Paragraph("Certificazione di Erogazione Liberale", styles["TitleCenter"]))
+        story.append(Paragraph(f"Ricevuta n. {receipt_number} – {campaign.title}", styles["Subtle"]))
+        story.append(Spacer(1, 8))
+
+        # Blocco Ente Beneficiario
+        story.append(Paragraph("Ente beneficiario", styles["H2"]))
+        ente_table = Table(
+            [
+                ["Denominazione", association_name],
+                ["C.F./P.IVA", association_tax_id],
+                ["Indirizzo", association_address],
+            ],
+            colWidths=[35*mm, None],
+            hAlign="LEFT",
+        )
+        ente_table.setStyle(self.grid_style)
+        story.append(ente_table)
+        story.append(Spacer(1, 8))
+
+        # Blocco Donatore
+        story.append(Paragraph("Dati del donatore", styles["H2"]))
+        donor_rows = [
+            ["Nome/Cognome o Rag. Sociale", donation.full_name or "Anonimo"],
+            ["Email", donation.email or "—"],
+        ]
+        if donor_fiscal_code:
+            donor_rows.append(["Codice Fiscale/Partita IVA", donor_fiscal_code])
+
+        donor_table = Table(donor_rows, colWidths=[55*mm, None], hAlign="LEFT")
+        donor_table.setStyle(self.grid_style)
+        story.append(donor_table)
+        story.append(Spacer(1, 8))
+
+        # Dati della donazione
+        story.append(Paragraph("Dettaglio della donazione", styles["H2"]))
+        donation_rows = [
+            ["Data", _format_date_it(created_at)],
+            ["Importo", f"€ {_format_eur(donation.amount)}"],
+            ["Metodo di pagamento", donation.method or "—"],
+            ["Campagna/Progetto", campaign.title],
+            ["Numero ricevuta", receipt_number],
+        ]
+        if payment_ref:
+            donation_rows.append(["Riferimento pagamento", payment_ref])
+
+        donation_table = Table(donation_rows, colWidths=[50*mm, None], hAlign="LEFT")
+        donation_table.setStyle(self.grid_style)
+        story.append(donation_table)
+        story.append(Spacer(1, 8))
+
+        # Dichiarazione
+        dichiarazione = (
+            "La presente donazione è effettuata a titolo di <b>erogazione liberale</b> "
+            "e sarà utilizzata esclusivamente per le <b>finalità istituzionali</b> dell’ente beneficiario. "
+            "Il presente documento è rilasciato ai fini delle agevolazioni fiscali previste dalla normativa vigente."
+        )
+        story.append(Paragraph("Dichiarazione", styles["H2"]))
+        story.append(Paragraph(dichiarazione, styles["Normal"]))
+        story.append(Spacer(1, 10))
+
+        # Firma & Timbro
+        firma_table = Table(
+            [
+                ["Luogo e data", "Firma e timbro dell’associazione"],
+                [association_address if association_address != "—" else "__________________", "_____________________________"],
+            ],
+            colWidths=[90*mm, None],
+            hAlign="LEFT",
+        )
+        firma_table.setStyle(self.signature_style)
+        story.append(firma_table)
+        story.append(Spacer(1, 8))
+
+        # Footer note legali (facoltative)
+        note = (
+            "Documento generato automaticamente. In caso di pagamento elettronico (es. carta/Stripe), "
+            "fa fede la transazione registrata. Conservare il presente documento per la dichiarazione dei redditi."
+        )
+        story.append(Paragraph(note, styles["Small"]))
+
+        # Costruisci PDF
+        with _stream_encoding(self.use_a85):
+            doc.build(story)
+
+    def render_statement(self, donor, donations, association, year: int,
+                         target: Union[str, Path, BinaryIO]) -> None:
+        """
+        Riepilogo annuale di un donatore: una riga per donazione e il totale.
+        ``donor`` ha full_name/email, ogni donazione id/created_at/amount/campaign_title.
+        """
+        styles = self.styles
+        association_name = getattr(association, "name", None) or "Associazione beneficiaria"
+        association_address = getattr(association, "address", None) or "—"
+
+        doc = SimpleDocTemplate(
+            str(target) if isinstance(target, Path) else target,
+            pagesize=A4,
+            leftMargin=20*mm,
+            rightMargin=20*mm,
+            topMargin=16*mm,
+            bottomMargin=16*mm,
+            title=f"Riepilogo donazioni {year}",
+            author=association_name,
+            subject="Riepilogo annuale delle erogazioni liberali",
+        )
+
+        story = []
+        logo = self._logo_flowable()
+        if logo is not None:
+            story.append(logo)
+            story.append(Spacer(1, 6))
+
+        story.append(Paragraph(f"Riepilogo annuale delle erogazioni liberali – {year}", styles["TitleCenter"]))
+        story.append(Paragraph(association_name, styles["Subtle"]))
+        story.append(Spacer(1, 8))
+
+        story.append(Paragraph("Ente beneficiario", styles["H2"]))
+        ente_table = Table(
+            [["Denominazione", association_name], ["Indirizzo", association_address]],
+            colWidths=[35*mm, None],
+            hAlign="LEFT",
+        )
+        ente_table.setStyle(self.grid_style)
+        story.append(ente_table)
+
+        story.append(Paragraph("Dati del donatore", styles["H2"]))
+        donor_table = Table(
+            [
+                ["Nome/Cognome o Rag. Sociale", getattr(donor, "full_name", None) or "Anonimo"],
+                ["Email", getattr(donor, "email", None) or "—"],
+            ],
+            colWidths=[55*mm, None],
+            hAlign="LEFT",
+        )
+        donor_table.setStyle(self.grid_style)
+        story.append(donor_table)
+
+        story.append(Paragraph("Donazioni dell'anno", styles["H2"]))
+        rows = [["Data", "Campagna/Progetto", "Ricevuta n.", "Importo"]]
+        total = Decimal("0")
+        for d in donations:
+            total += Decimal(str(d.amount or 0))
+            rows.append([
+                _format_date_it(d.created_at),
+                Paragraph(d.campaign_title or "—", styles["Normal"]),
+                f"{d.id:06d}",
+                f"€ {_format_eur(d.amount)}",
+            ])
+        rows.append(["", "", "Totale", f"€ {_format_eur(total)}"])
+
+        detail_table = Table(rows, colWidths=[25*mm, None, 25*mm, 30*mm], hAlign="LEFT", repeatRows=1)
+        detail_table.setStyle(self.grid_style)
+        story.append(detail_table)
+        story.append(Spacer(1, 10))
+
+        note = (
+            "Riepilogo generato automaticamente a partire dalle singole ricevute. "
+            "Conservare il presente documento per la dichiarazione dei redditi."
+        )
+        story.append(Paragraph(note, styles["Small"]))
+
+        with _stream_encoding(self.use_a85):
+            doc.build(story)
+
+
+@lru_cache(maxsize=1)
+def get_renderer() -> ReceiptRenderer:
+    """Renderer condiviso del processo (costruito al primo uso)."""
+    return ReceiptRenderer()
 
-    return filename
 
+# ----------------- API principale -----------------
+def generate_receipt(donation, campaign) -> str:
+    """
+    Genera un PDF in RECEIPTS_DIR (instance/receipts)
+    e ritorna il solo filename (es. 'donation_12.pdf').
+    Layout: Certificazione / Dichiarazione di erogazione liberale.
+    """
+    # Nome file stabile
+    filename = f"donation_{donation.id}.pdf"
+    get_renderer().render(donation, campaign, RECEIPTS_DIR / filename)
+    return filename
@@ -0,0 +1,329 @@
+# app/utils/pubsub.py
+"""
+Pub/sub per le notifiche push (SSE): chi scrive pubblica su un canale
+(es. ``user:42``), gli stream aperti su quel canale ricevono il messaggio.
+
+Due implementazioni, scelte con ``PUBSUB_URL``:
+
+- ``memory://`` (default): code in processo. Basta in sviluppo, nei test e
+  con un solo worker gunicorn (con più worker gunicorn.conf.py usa tcp://).
+- ``tcp://127.0.0.1:6390``: relay locale al posto di un broker vero (Redis).
+  Il primo worker che parte apre il relay in un thread, gli altri vi si
+  collegano; ogni messaggio pubblicato viene rigirato a tutti i worker, che
+  lo consegnano ai propri iscritti. Se il worker che ospita il relay muore,
+  un altro lo riapre al primo riavvio della connessione.
+
+La consegna è "at most once": i client recuperano quanto perso rileggendo
+dal DB a partire dall'ultimo id ricevuto (``Last-Event-ID``). Uno stream
+porta più tipi di evento (messaggi, notifiche), ognuno con i propri id: il
+Last-Event-ID è quindi un cursore per tipo, es. ``message:12,notification:40``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+from urllib.parse import urlparse
+
+PUBSUB_URL = os.getenv("PUBSUB_URL", "memory://")
+
+# Messaggi in coda per iscritto prima di scartare i più vecchi (client lento)
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Ogni quanto lo stream SSE manda un commento di keep-alive (proxy e load balancer chiudono le connessioni mute)
+SSE_KEEPALIVE_SECONDS = 15.0
+
+log = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Iscrizione a uno o più canali: una coda letta dallo stream SSE."""
+
+    def __init__(self, broker: "InProcessBroker", channels: Iterable[str]) -> None:
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, channel: str, payload: Any) -> None:
+        try:
+            self._queue.put_nowait((channel, payload))
+        except queue.Full:
+            # Iscritto che non legge: si perde il più vecchio, lo recupererà dal DB
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._queue.put_nowait((channel, payload))
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Any]]:
+        """(canale, payload) del prossimo messaggio, o None allo scadere del timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class InProcessBroker:
+    """Broker in memoria: consegna agli iscritti dello stesso processo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        sub = Subscription(self, channels)
+        with self._lock:
+            for channel in sub.channels:
+                self._subscribers[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            for channel in sub.channels:
+                subs = self._subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[channel]
+
+    def publish(self, channel: str, payload: Any) -> None:
+        self._deliver(channel, payload)
+
+    def _deliver(self, channel: str, payload: Any) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(channel, ()))
+        for sub in subs:
+            sub.put(channel, payload)
+
+
+class SocketBroker(InProcessBroker):
+    """
+    Broker tra processi tramite un relay TCP locale (righe JSON).
+    Pubblicare = inviare al relay; la consegna locale avviene quando il relay
+    rimanda il messaggio, così ogni worker (compreso chi pubblica) lo riceve una volta.
+    """
+
+    RECONNECT_DELAY = 0.5
+
+    def __init__(self, host: str, port: int) -> None:
+        super().__init__()
+        self.address = (host, port)
+        self._conn: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._connected = threading.Event()
+        threading.Thread(target=self._reader, name="pubsub-reader", daemon=True).start()
+
+    def publish(self, channel: str, payload: Any) -> None:
+        line = (json.dumps({"c": channel, "d": payload}, separators=(",", ":")) + "\n").encode()
+        if not self._connected.wait(timeout=2.0):
+            log.warning("pubsub: relay non raggiungibile, consegna solo locale su %s", channel)
+            self._deliver(channel, payload)
+            return
+        try:
+            with self._send_lock:
+                self._conn.sendall(line)
+        except OSError:
+            log.warning("pubsub: invio al relay fallito, consegna solo locale su %s", channel)
+            self._deliver(channel, payload)
+
+    # ---- connessione al relay (o apertura del relay) ----
+    def _connect(self) -> socket.socket:
+        while True:
+            try:
+                return socket.create_connection(self.address, timeout=2.0)
+            except OSError:
+                pass
+            try:
+                _Relay(self.address).start()
+            except OSError:
+                pass  # un altro worker l'ha aperto per primo
+            time.sleep(self.RECONNECT_DELAY)
+
+    def _reader(self) -> None:
+        while True:
+            conn = self._connect()
+            conn.settimeout(None)
+            self._conn = conn
+            self._connected.set()
+            try:
+                for line in conn.makefile("rb"):
+                    try:
+                        msg = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._deliver(msg["c"], msg["d"])
+            except OSError:
+                pass
+            finally:
+                self._connected.clear()
+                conn.close()
+            time.sleep(self.RECONNECT_DELAY)
+
+
+class _Relay:
+    """Relay TCP minimale: rigira ogni riga ricevuta a tutte le connessioni aperte."""
+
+    def __init__(self, address: Tuple[str, int]) -> None:
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.server.bind(address)
+        except OSError:
+            self.server.close()
+            raise
+        self.server.listen(64)
+        self._clients: Set[socket.socket] = set()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    def start(self) -> None:
+        threading.Thread(target=self._accept, name="pubsub-relay", daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            conn, _ = self.server.accept()
+            with self._lock:
+                self._clients.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        try:
+            for line in conn.makefile("rb"):
+                with self._lock:
+                    clients = list(self._clients)
+                with self._send_lock:  # righe intere: niente invii intercalati da più connessioni
+                    for client in clients:
+                        try:
+                            client.sendall(line)
+                        except OSError:
+                            self._drop(client)
+        except OSError:
+            pass
+        finally:
+            self._drop(conn)
+
+    def _drop(self, conn: socket.socket) -> None:
+        with self._lock:
+            self._clients.discard(conn)
+        conn.close()
+
+
+_broker: Optional[InProcessBroker] = None
+_broker_lock = threading.Lock()
+
+
+def create_broker(url: str) -> InProcessBroker:
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return InProcessBroker()
+    if parsed.scheme == "tcp":
+        return SocketBroker(parsed.hostname or "127.0.0.1", parsed.port or 6390)
+    raise ValueError(f"PUBSUB_URL non supportato: {url}")
+
+
+def get_broker() -> InProcessBroker:
+    """Broker del processo (creato al primo uso: dopo il fork dei worker gunicorn)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = create_broker(PUBSUB_URL)
+    return _broker
+
+
+def publish(channel: str, payload: Any) -> None:
+    get_broker().publish(channel, payload)
+
+
+def subscribe(channels: Iterable[str]) -> Subscription:
+    return get_broker().subscribe(channels)
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# ----------------- Server-Sent Events -----------------
+def encode_stream_cursor(cursor: Dict[str, int]) -> str:
+    """Last-Event-ID con l'ultimo id ricevuto per tipo di evento: ``message:12,notification:40``."""
+    return ",".join(f"{event}:{event_id}" for event, event_id in sorted(cursor.items()))
+
+
+def decode_stream_cursor(raw: Optional[str]) -> Dict[str, int]:
+    """Inverso di encode_stream_cursor; le parti non valide vengono ignorate."""
+    cursor: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        event, _, event_id = part.strip().partition(":")
+        if event and event_id.isdigit():
+            cursor[event] = int(event_id)
+    return cursor
+
+
+def sse_event(data: Any, event: Optional[str] = None, id: Optional[Union[int, str]] = None) -> str:
+    """Un evento SSE già serializzato."""
+    out = []
+    if id is not None:
+        out.append(f"id: {id}")
+    if event:
+        out.append(f"event: {event}")
+    out.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(out) + "\n\n"
+
+
+def sse_stream(sub: Subscription, backlog: Iterable[Dict[str, Any]] = (),
+               keepalive: float = SSE_KEEPALIVE_SECONDS,
+               cursor: Optional[Dict[str, int]] = None) -> Iterator[str]:
+    """
+    Corpo di una risposta ``text/event-stream``. I payload sono dict
+    ``{"event", "id", "data"}``: prima ``backlog`` (recuperato dal DB dopo
+    l'iscrizione), poi ciò che arriva su ``sub``, saltando gli id già inviati
+    col backlog. ``cursor`` è il punto di partenza per tipo di evento; l'id
+    SSE di ogni evento è il cursore aggiornato (vedi encode_stream_cursor).
+    L'iscrizione viene chiusa quando il client si disconnette.
+    """
+    sent = dict(cursor or {})
+
+    def emit(payload: Dict[str, Any]) -> str:
+        event, event_id = payload.get("event"), payload.get("id")
+        if event_id is None:
+            return sse_event(payload.get("data"), event=event)
+        sent[event] = max(sent.get(event, 0), event_id)
+        return sse_event(payload.get("data"), event=event, id=encode_stream_cursor(sent))
+
+    try:
+        yield "retry: 3000\n\n"
+        if sent:
+            # Evento senza dati: non arriva ai listener ma fissa il Last-Event-ID del client
+            yield f"id: {encode_stream_cursor(sent)}\n\n"
+        delivered: Dict[str, int] = {}  # per tipo, l'ultimo id arrivato col backlog
+        for payload in backlog:
+            if payload.get("id") is not None:
+                delivered[payload.get("event")] = max(delivered.get(payload.get("event"), 0), payload["id"])
+            yield emit(payload)
+        while True:
+            item = sub.get(timeout=keepalive)
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            _, payload = item
+            event_id = payload.get("id")
+            if event_id is not None and event_id <= delivered.get(payload.get("event"), 0):
+                continue  # già arrivato col backlog
+            yield emit(payload)
+    finally:
+        sub.close()
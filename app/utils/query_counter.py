@@ -0,0 +1,52 @@
+# app/utils/query_counter.py
+"""
+Conteggio delle istruzioni SQL eseguite, per fissare un tetto di query per
+richiesta nei test (una regressione N+1 fa fallire l'asserzione).
+
+    with assert_max_queries(8):
+        client.get("/")
+"""
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app import db
+
+
+class QueryCounter:
+    """Raccoglie le istruzioni SQL eseguite su un engine mentre è attivo."""
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None) -> Iterator[QueryCounter]:
+    """Context manager che conta le query eseguite sull'engine (default: db.engine)."""
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._on_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine=None, label: Optional[str] = None) -> Iterator[QueryCounter]:
+    """Come count_queries, ma solleva AssertionError se le query superano ``limit``."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(counter.statements))
+        raise AssertionError(
+            f"{label or 'Blocco'}: {counter.count} query SQL eseguite (massimo {limit}):\n{listing}"
+        )
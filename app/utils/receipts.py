@@ -0,0 +1,296 @@
+# app/utils/receipts.py
+"""
+Ricevute PDF delle donazioni.
+
+- Checkout: la pagina di successo accoda la ricevuta e fa polling sullo
+  stato; ``Donation.pdf_filename`` valorizzato significa "pronta".
+- Fine anno: ``flask receipts build`` rigenera in parallelo (process pool)
+  tutte le ricevute di un'associazione, con riepiloghi per donatore e zip.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import String, cast, func, literal, select, update
+
+from app import db
+from app.database.models.campaign import Campaign
+from app.database.models.donation import Donation
+from app.database.models.user import User
+from app.utils.jobs import enqueue
+from app.utils.pdf_generator import RECEIPTS_DIR, generate_receipt, get_renderer
+
+_pending: Set[int] = set()
+_pending_lock = threading.Lock()
+
+
+def receipt_ready(donation: Donation) -> bool:
+    """True se il PDF della donazione è stato generato ed è su disco."""
+    return bool(donation.pdf_filename) and (RECEIPTS_DIR / donation.pdf_filename).exists()
+
+
+def queue_receipt(donation_id: int) -> bool:
+    """
+    Accoda la generazione della ricevuta (no-op se è già in coda in questo processo).
+    Ritorna True se è stato accodato un nuovo job.
+    """
+    with _pending_lock:
+        if donation_id in _pending:
+            return False
+        _pending.add(donation_id)
+
+    future = enqueue(build_receipt, donation_id)
+    future.add_done_callback(lambda _f: _discard_pending(donation_id))
+    return True
+
+
+def build_receipt(donation_id: int) -> str:
+    """Genera il PDF e salva il filename sulla donazione. Ritorna il filename."""
+    donation = db.session.get(Donation, donation_id)
+    if donation is None:
+        raise LookupError(f"Donazione {donation_id} inesistente")
+
+    filename = generate_receipt(donation, donation.campaign)
+    donation.pdf_filename = filename
+    db.session.commit()
+    return filename
+
+
+def _discard_pending(donation_id: int) -> None:
+    with _pending_lock:
+        _pending.discard(donation_id)
+
+
+# -----------------------------------------------------------------------------
+# Rigenerazione annuale: `flask receipts build --year 2026 --association N`
+# -----------------------------------------------------------------------------
+# Sotto instance/: lo zip contiene nomi, email e importi di tutti i donatori e
+# si scarica solo da payments.annual_receipts (associazione proprietaria).
+ANNUAL_DIR = RECEIPTS_DIR / "annual"
+
+
+def annual_zip_path(association_id: int, year: int) -> Path:
+    return ANNUAL_DIR / f"ricevute_{year}_assoc{association_id}.zip"
+
+
+def annual_archive_years(association_id: int) -> List[int]:
+    """Anni per cui esiste l'archivio annuale dell'associazione, dal più recente."""
+    years = []
+    for path in ANNUAL_DIR.glob(f"ricevute_*_assoc{association_id}.zip"):
+        year = path.name.split("_")[1]
+        if year.isdigit():
+            years.append(int(year))
+    return sorted(years, reverse=True)
+
+
+def _annual_donations(association_id: int, year: int):
+    """SELECT delle sole colonne che servono al PDF (niente oggetti ORM da serializzare)."""
+    return (
+        select(
+            Donation.id, Donation.full_name, Donation.email, Donation.amount,
+            Donation.method, Donation.created_at, Campaign.title.label("campaign_title"),
+        )
+        .join(Campaign, Campaign.id == Donation.campaign_id)
+        .where(
+            Campaign.association_id == association_id,
+            Donation.created_at >= datetime(year, 1, 1),
+            Donation.created_at < datetime(year + 1, 1, 1),
+        )
+    )
+
+
+def iter_donation_chunks(association_id: int, year: int, donation_ids: List[int], chunk_size: int = 500):
+    """Righe delle donazioni indicate, a blocchi di ``chunk_size`` id (IN limitato)."""
+    for start in range(0, len(donation_ids), chunk_size):
+        chunk = donation_ids[start:start + chunk_size]
+        rows = db.session.execute(
+            _annual_donations(association_id, year).where(Donation.id.in_(chunk)).order_by(Donation.id)
+        ).all()
+        yield chunk, [dict(r._mapping) for r in rows]
+
+
+def _render_receipt_worker(row: dict, association: dict) -> int:
+    # Gira nei processi del pool: solo dati semplici, nessuna sessione DB
+    donation = SimpleNamespace(**row)
+    campaign = SimpleNamespace(title=row["campaign_title"], association=SimpleNamespace(**association))
+    generate_receipt(donation, campaign)
+    return row["id"]
+
+
+def _render_statement_worker(donor: dict, donations: List[dict], association: dict, year: int, path: str) -> str:
+    # File temporaneo + rename: un riepilogo presente su disco è completo (checkpoint per donatore)
+    tmp = path + ".tmp"
+    get_renderer().render_statement(
+        SimpleNamespace(**donor),
+        [SimpleNamespace(**d) for d in donations],
+        SimpleNamespace(**association),
+        year,
+        tmp,
+    )
+    os.replace(tmp, path)
+    return path
+
+
+def _statement_filename(email: str) -> str:
+    # Nome stabile ma senza l'indirizzo email in chiaro
+    return f"riepilogo_{hashlib.sha1(email.encode()).hexdigest()[:12]}.pdf"
+
+
+def _load_state(path: Path, restart: bool) -> Optional[Dict[str, Any]]:
+    if restart or not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _new_state(association_id: int, year: int) -> Dict[str, Any]:
+    # L'insieme delle donazioni è fissato all'avvio: le donazioni arrivate
+    # dopo non entrano in questo archivio, anche se l'esecuzione riprende
+    donation_ids = db.session.execute(
+        _annual_donations(association_id, year).with_only_columns(Donation.id).order_by(Donation.id)
+    ).scalars().all()
+    return {"donation_ids": donation_ids, "receipts": 0, "receipts_done": False, "statements_done": False}
+
+
+def _save_state(path: Path, state: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def build_annual_receipts(
+    association_id: int,
+    year: int,
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    restart: bool = False,
+    echo: Callable[[str], None] = print,
+) -> Path:
+    """
+    Rigenera le ricevute dell'anno per un'associazione, i riepiloghi per
+    donatore e uno zip con tutto. Le donazioni incluse sono quelle presenti
+    all'avvio (salvate in ``state.json``); il progresso è salvato dopo ogni
+    blocco di ricevute e dopo ogni riepilogo: rilanciando il comando si
+    riparte da lì. Ritorna il percorso dello zip.
+    """
+    association = db.session.get(User, association_id)
+    if association is None or association.user_type != "association":
+        raise LookupError(f"Associazione {association_id} inesistente")
+    assoc_data = {"name": association.name, "address": association.address}
+
+    out_dir = ANNUAL_DIR / f"{year}_assoc{association_id}"
+    statements_dir = out_dir / "riepiloghi"
+    statements_dir.mkdir(parents=True, exist_ok=True)
+    state_path = out_dir / "state.json"
+    state = _load_state(state_path, restart)
+    if state is None:
+        for stale in statements_dir.glob("*.pdf*"):
+            stale.unlink()
+        state = _new_state(association_id, year)
+        _save_state(state_path, state)
+
+    donation_ids: List[int] = state["donation_ids"]
+    total = len(donation_ids)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1) ricevute, a blocchi (checkpoint dopo ogni blocco)
+        if not state["receipts_done"]:
+            if state["receipts"]:
+                echo(f"Ripresa dalla ricevuta {state['receipts']}/{total}")
+            started, done_now = time.perf_counter(), 0
+            for chunk, rows in iter_donation_chunks(association_id, year, donation_ids[state["receipts"]:], chunk_size):
+                ids = list(pool.map(_render_receipt_worker, rows, [assoc_data] * len(rows), chunksize=16))
+
+                if ids:
+                    db.session.execute(
+                        update(Donation)
+                        .where(Donation.id.in_(ids), Donation.pdf_filename.is_(None))
+                        .values(pdf_filename=literal("donation_") + cast(Donation.id, String) + ".pdf")
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+
+                # Si avanza sugli id fissati: una donazione cancellata nel frattempo viene saltata
+                done_now += len(chunk)
+                state["receipts"] += len(chunk)
+                _save_state(state_path, state)
+                rate = done_now / (time.perf_counter() - started)
+                echo(f"Ricevute {state['receipts']}/{total} ({rate:.1f}/s)")
+
+            state["receipts_done"] = True
+            _save_state(state_path, state)
+
+        # 2) riepiloghi per donatore (email), in streaming ordinato per donatore;
+        #    si salta chi ha già il riepilogo su disco da un'esecuzione precedente
+        if not state["statements_done"]:
+            started = time.perf_counter()
+            frozen = set(donation_ids)
+            donor_key = func.lower(Donation.email)
+            rows = db.session.execute(
+                _annual_donations(association_id, year)
+                .where(Donation.id <= (donation_ids[-1] if donation_ids else 0))
+                .add_columns(donor_key.label("donor_key"))
+                .order_by(donor_key, Donation.created_at)
+                .execution_options(yield_per=chunk_size)
+            )
+            futures, skipped = [], 0
+            donations_in_run = (dict(r._mapping) for r in rows if r.id in frozen)
+            for key, group in groupby(donations_in_run, key=itemgetter("donor_key")):
+                donations = list(group)
+                path = statements_dir / _statement_filename(key)
+                if path.exists():
+                    skipped += 1
+                    continue
+                donor = {"full_name": donations[-1]["full_name"], "email": donations[-1]["email"]}
+                futures.append(pool.submit(_render_statement_worker, donor, donations, assoc_data, year, str(path)))
+            for f in futures:
+                f.result()
+
+            state["statements_done"] = True
+            _save_state(state_path, state)
+            elapsed = time.perf_counter() - started
+            resumed = f", {skipped} già pronti" if skipped else ""
+            echo(f"Riepiloghi {len(futures)} ({len(futures) / elapsed if elapsed else 0:.1f}/s{resumed})")
+
+    # 3) archivio zip (riscritto ogni volta) con le sole donazioni fissate all'avvio
+    zip_path = annual_zip_path(association_id, year)
+    tmp_zip = zip_path.with_suffix(".zip.tmp")
+    with zipfile.ZipFile(tmp_zip, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for donation_id in donation_ids:
+            receipt = RECEIPTS_DIR / f"donation_{donation_id}.pdf"
+            if receipt.exists():  # assente solo se la donazione è stata cancellata prima del rendering
+                zf.write(receipt, f"ricevute/{receipt.name}")
+        for statement in sorted(statements_dir.glob("*.pdf")):
+            zf.write(statement, f"riepiloghi/{statement.name}")
+    os.replace(tmp_zip, zip_path)
+    return zip_path
+
+
+receipts_cli = AppGroup("receipts", help="Ricevute delle donazioni.")
+
+
+@receipts_cli.command("build")
+@click.option("--year", type=int, required=True, help="Anno fiscale.")
+@click.option("--association", "association_id", type=int, required=True, help="Id dell'associazione.")
+@click.option("--workers", type=int, default=None, help="Processi di rendering (default: numero di CPU).")
+@click.option("--chunk-size", type=int, default=500, show_default=True)
+@click.option("--restart", is_flag=True, help="Ignora il progresso salvato e riparte da zero.")
+def build_command(year: int, association_id: int, workers: Optional[int], chunk_size: int, restart: bool) -> None:
+    """Rigenera ricevute e riepiloghi annuali di un'associazione in uno zip."""
+    started = time.perf_counter()
+    try:
+        zip_path = build_annual_receipts(association_id, year, workers, chunk_size, restart, echo=click.echo)
+    except LookupError as e:
+        raise click.UsageError(str(e))
+    click.echo(f"Archivio: {zip_path} ({time.perf_counter() - started:.1f}s)")
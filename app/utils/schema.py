@@ -0,0 +1,77 @@
+# app/utils/schema.py
+"""
+Registro delle capacità dello schema: quali colonne (opzionali) ha ogni
+modello, quali sono JSON, con che nomi sono salvate le coordinate.
+
+Viene costruito una volta in ``create_app`` dai mapper SQLAlchemy; i
+blueprint lo leggono invece di interrogare ``__table__`` o usare ``hasattr``
+a ogni richiesta.
+"""
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, NamedTuple
+
+import sqlalchemy as sa
+
+from app import db
+
+
+class ModelCapabilities(NamedTuple):
+    columns: FrozenSet[str]
+    json_columns: FrozenSet[str]
+    geo: str  # "latitude_longitude" | "latlng" | ""
+
+    def has(self, name: str) -> bool:
+        return name in self.columns
+
+    def is_json(self, name: str) -> bool:
+        return name in self.json_columns
+
+
+_registry: Dict[type, ModelCapabilities] = {}
+
+
+def _inspect_model(mapper) -> ModelCapabilities:
+    columns = {attr.key: attr.columns[0] for attr in mapper.column_attrs}
+    names = frozenset(columns)
+    json_columns = frozenset(k for k, col in columns.items() if isinstance(col.type, sa.JSON))
+    if {"lat", "lng"} <= names:
+        geo = "latlng"
+    elif {"latitude", "longitude"} <= names:
+        geo = "latitude_longitude"
+    else:
+        geo = ""
+    return ModelCapabilities(names, json_columns, geo)
+
+
+def build_schema_registry() -> None:
+    """(Ri)costruisce il registro da tutti i modelli mappati."""
+    _registry.clear()
+    for mapper in db.Model.registry.mappers:
+        _registry[mapper.class_] = _inspect_model(mapper)
+
+
+def capabilities(model) -> ModelCapabilities:
+    """Capacità di ``model`` (calcolate al volo e memorizzate se il modello non era nel registro)."""
+    caps = _registry.get(model)
+    if caps is None:
+        caps = _registry[model] = _inspect_model(sa.inspect(model))
+    return caps
+
+
+def has_column(model, name: str) -> bool:
+    return capabilities(model).has(name)
+
+
+def is_json_column(model, name: str) -> bool:
+    return capabilities(model).is_json(name)
+
+
+def geo_fields(model) -> str:
+    """"latitude_longitude", "latlng" o "" a seconda delle colonne di coordinate del modello."""
+    return capabilities(model).geo
+
+
+def init_schema(app) -> None:
+    """Costruisce il registro all'avvio (dopo l'import di modelli e blueprint)."""
+    build_schema_registry()
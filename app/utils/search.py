@@ -0,0 +1,287 @@
+# app/utils/search.py
+"""
+Indice di ricerca full-text per gli item della piattaforma.
+
+Ogni evento, post, campagna, petizione, segnalazione e associazione ha una
+riga in ``search_document`` con il testo già normalizzato da ``_normalize``
+(minuscole, senza accenti). L'indice viene aggiornato dagli hook
+after_insert/after_update/after_delete dei modelli e interrogato con FTS5
+(SQLite) o tsvector + GIN (PostgreSQL); sugli altri DB si ripiega su LIKE.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, literal_column, select
+
+from app import db
+from app.database.models.campaign import Campaign
+from app.database.models.event import Event
+from app.database.models.petition import Petition
+from app.database.models.post import Post
+from app.database.models.report import Report
+from app.database.models.search import SearchDocument
+from app.database.models.user import User
+from app.utils.feed import _normalize
+
+SEARCH_PAGE_SIZE = 20
+
+# tipo -> (modello, campi testuali indicizzati)
+SEARCH_SOURCES = {
+    "event": (Event, ("title", "description", "location", "skills", "activity")),
+    "post": (Post, ("title", "content")),
+    "campaign": (Campaign, ("title", "description", "location")),
+    "petition": (Petition, ("title", "description", "location")),
+    "report": (Report, ("title", "description", "address")),
+    "association": (User, ("name", "address", "bio")),
+}
+
+# Tipi il cui testo include il nome dell'associazione proprietaria
+_OWNED_BY_ASSOCIATION = ("event", "post", "campaign")
+
+_FTS_TABLE = sa.table("search_document_fts", sa.column("rowid"))
+
+
+# ----------------- Costruzione documenti -----------------
+def query_tokens(q: str) -> List[str]:
+    """Token della query con la stessa normalizzazione del testo indicizzato."""
+    return re.findall(r"\w+", _normalize(q))
+
+
+def _document_values(kind: str, obj, assoc_name: Optional[str]) -> Dict[str, Any]:
+    _, fields = SEARCH_SOURCES[kind]
+    parts = [str(getattr(obj, f, None) or "") for f in fields]
+    if assoc_name:
+        parts.append(assoc_name)
+    if kind == "association":
+        association_id, title = obj.id, obj.name
+    else:
+        association_id, title = getattr(obj, "association_id", None), obj.title
+    return {
+        "doc_type": kind,
+        "doc_id": obj.id,
+        "association_id": association_id,
+        "title": (title or "")[:255],
+        "body": _normalize(" ".join(p for p in parts if p)),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def _association_name(connection, association_id: Optional[int]) -> Optional[str]:
+    if association_id is None:
+        return None
+    return connection.execute(
+        select(User.name).where(User.id == association_id)
+    ).scalar()
+
+
+def _delete_document(connection, kind: str, doc_id: int) -> None:
+    table = SearchDocument.__table__
+    connection.execute(
+        table.delete().where(table.c.doc_type == kind, table.c.doc_id == doc_id)
+    )
+
+
+def _upsert_document(connection, kind: str, obj, assoc_name: Optional[str] = None) -> None:
+    if kind in _OWNED_BY_ASSOCIATION and assoc_name is None:
+        assoc_name = _association_name(connection, obj.association_id)
+    _delete_document(connection, kind, obj.id)
+    connection.execute(
+        SearchDocument.__table__.insert().values(**_document_values(kind, obj, assoc_name))
+    )
+
+
+def _reindex_association_items(connection, association_id: int, assoc_name: str) -> None:
+    """Aggiorna i documenti degli item di un'associazione dopo un cambio di nome."""
+    for kind in _OWNED_BY_ASSOCIATION:
+        model, _ = SEARCH_SOURCES[kind]
+        rows = connection.execute(
+            select(model.__table__).where(model.__table__.c.association_id == association_id)
+        )
+        for row in rows:
+            _upsert_document(connection, kind, row, assoc_name)
+
+
+# ----------------- Hook SQLAlchemy -----------------
+def _make_hooks(kind: str):
+    def after_save(mapper, connection, target):
+        if kind == "association":
+            if target.user_type != "association":
+                _delete_document(connection, kind, target.id)
+                return
+            _upsert_document(connection, kind, target)
+            if inspect(target).attrs.name.history.deleted:
+                _reindex_association_items(connection, target.id, target.name)
+            return
+        _upsert_document(connection, kind, target)
+
+    def after_delete(mapper, connection, target):
+        _delete_document(connection, kind, target.id)
+
+    return after_save, after_delete
+
+
+_hooks_registered = False
+
+
+def register_search_hooks() -> None:
+    """Collega gli hook after_insert/after_update/after_delete ai modelli indicizzati."""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    for kind, (model, _) in SEARCH_SOURCES.items():
+        after_save, after_delete = _make_hooks(kind)
+        event.listen(model, "after_insert", after_save)
+        event.listen(model, "after_update", after_save)
+        event.listen(model, "after_delete", after_delete)
+    _hooks_registered = True
+
+
+# ----------------- Interrogazione -----------------
+_fts_cache: Dict[str, bool] = {}
+
+
+def _backend() -> str:
+    """'sqlite' se c'è la tabella FTS5, 'postgresql', altrimenti 'like'."""
+    engine = db.engine
+    name = engine.dialect.name
+    if name == "postgresql":
+        return "postgresql"
+    if name == "sqlite":
+        key = str(engine.url)
+        if key not in _fts_cache:
+            _fts_cache[key] = sa.inspect(engine).has_table("search_document_fts")
+        if _fts_cache[key]:
+            return "sqlite"
+    return "like"
+
+
+def _match_condition(backend: str, tokens: List[str]):
+    if backend == "sqlite":
+        expr = " ".join(f'"{t}"*' for t in tokens)
+        return SearchDocument.id.in_(
+            select(_FTS_TABLE.c.rowid).where(literal_column("search_document_fts").op("MATCH")(expr))
+        )
+    if backend == "postgresql":
+        expr = " & ".join(f"{t}:*" for t in tokens)
+        return func.to_tsvector("simple", SearchDocument.body).op("@@")(func.to_tsquery("simple", expr))
+    return sa.and_(*(SearchDocument.body.like(f"%{t}%") for t in tokens))
+
+
+def matching_ids(kind: str, q: str):
+    """Sottoquery con gli id degli item di tipo ``kind`` che contengono tutti i token di ``q``."""
+    tokens = query_tokens(q)
+    stmt = select(SearchDocument.doc_id).where(SearchDocument.doc_type == kind)
+    if not tokens:
+        return stmt
+    return stmt.where(_match_condition(_backend(), tokens))
+
+
+def search(
+    q: str,
+    types: Optional[Iterable[str]] = None,
+    page: int = 1,
+    per_page: int = SEARCH_PAGE_SIZE,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Ricerca ordinata per rilevanza. Ritorna (risultati, has_more) per la pagina
+    richiesta; ogni risultato è {"type", "id", "title", "association_id", "rank"}.
+    """
+    tokens = query_tokens(q)
+    if not tokens:
+        return [], False
+
+    backend = _backend()
+    if backend == "sqlite":
+        rank = func.bm25(literal_column("search_document_fts"))
+        stmt = (
+            select(SearchDocument, rank.label("rank"))
+            .join(_FTS_TABLE, _FTS_TABLE.c.rowid == SearchDocument.id)
+            .where(literal_column("search_document_fts").op("MATCH")(" ".join(f'"{t}"*' for t in tokens)))
+            .order_by(rank.asc(), SearchDocument.id.desc())
+        )
+    elif backend == "postgresql":
+        tsq = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in tokens))
+        tsv = func.to_tsvector("simple", SearchDocument.body)
+        rank = func.ts_rank(tsv, tsq)
+        stmt = (
+            select(SearchDocument, rank.label("rank"))
+            .where(tsv.op("@@")(tsq))
+            .order_by(rank.desc(), SearchDocument.id.desc())
+        )
+    else:
+        stmt = (
+            select(SearchDocument, sa.literal(0.0).label("rank"))
+            .where(_match_condition(backend, tokens))
+            .order_by(SearchDocument.updated_at.desc(), SearchDocument.id.desc())
+        )
+
+    types = [t for t in (types or []) if t in SEARCH_SOURCES]
+    if types:
+        stmt = stmt.where(SearchDocument.doc_type.in_(types))
+
+    page = max(page, 1)
+    rows = db.session.execute(stmt.offset((page - 1) * per_page).limit(per_page + 1)).all()
+
+    results = [
+        {
+            "type": doc.doc_type,
+            "id": doc.doc_id,
+            "title": doc.title,
+            "association_id": doc.association_id,
+            "rank": float(rank_value or 0),
+        }
+        for doc, rank_value in rows[:per_page]
+    ]
+    return results, len(rows) > per_page
+
+
+# ----------------- Reindicizzazione completa -----------------
+def reindex_all(chunk_size: int = 1000) -> int:
+    """Ricostruisce da zero search_document (necessario dopo la migrazione o import massivi)."""
+    connection = db.session.connection()
+    connection.execute(SearchDocument.__table__.delete())
+
+    assoc_names = dict(
+        connection.execute(select(User.id, User.name).where(User.user_type == "association")).all()
+    )
+    total = 0
+    for kind, (model, _) in SEARCH_SOURCES.items():
+        stmt = select(model.__table__)
+        if kind == "association":
+            stmt = stmt.where(model.__table__.c.user_type == "association")
+        batch = []
+        for row in connection.execute(stmt.execution_options(yield_per=chunk_size)):
+            assoc_name = assoc_names.get(row.association_id) if kind in _OWNED_BY_ASSOCIATION else None
+            batch.append(_document_values(kind, row, assoc_name))
+            if len(batch) >= chunk_size:
+                db.session.execute(SearchDocument.__table__.insert(), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(SearchDocument.__table__.insert(), batch)
+            total += len(batch)
+    db.session.commit()
+    return total
+
+
+search_cli = AppGroup("search", help="Gestione dell'indice di ricerca full-text.")
+
+
+@search_cli.command("reindex")
+@click.option("--chunk-size", default=1000, show_default=True, help="Righe per batch di insert.")
+def reindex_command(chunk_size: int) -> None:
+    """Ricostruisce l'indice di ricerca da tutte le tabelle sorgente."""
+    total = reindex_all(chunk_size=chunk_size)
+    click.echo(f"Indicizzati {total} documenti.")
+
+
+def init_search(app) -> None:
+    """Registra hook dei modelli e comandi CLI della ricerca."""
+    register_search_hooks()
+    app.cli.add_command(search_cli)
@@ -0,0 +1,111 @@
+# app/utils/skills.py
+"""
+Skills degli eventi in forma normalizzata.
+
+``Event.skills`` resta il valore del form (lista JSON o CSV); la tabella
+``event_skill`` (una riga per skill, indicizzata per skill) è allineata dagli
+hook del modello ed è quella da usare per filtrare: "eventi che richiedono
+una/tutte queste skills" diventa una join indicizzata, senza leggere e
+decodificare il testo di ogni evento.
+"""
+from __future__ import annotations
+
+import json
+import unicodedata
+from typing import Dict, Iterable, List
+
+from sqlalchemy import Select, delete, event, func, inspect, insert, select
+
+from app import db
+from app.database.models.event import Event, event_skill
+
+SKILL_MAX_LEN = 50
+_hooks_registered = False
+
+
+def normalize_skill(name) -> str:
+    """Skill in forma canonica: minuscolo, senza accenti né spazi/virgolette ai bordi."""
+    s = unicodedata.normalize("NFKD", str(name).lower())
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return s.strip().strip('"').strip()[:SKILL_MAX_LEN]
+
+
+def parse_skills(raw) -> List[str]:
+    """Skills dal valore di ``Event.skills`` (lista JSON, CSV o lista già decodificata), senza duplicati."""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if raw.startswith("["):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                raw = raw.strip("[]")
+        if isinstance(raw, str):
+            raw = raw.split(",")
+    return list(dict.fromkeys(s for s in (normalize_skill(x) for x in raw) if s))
+
+
+def set_event_skills(connection, event_id: int, skills: Iterable[str]) -> None:
+    """Sostituisce le righe ``event_skill`` dell'evento."""
+    connection.execute(delete(event_skill).where(event_skill.c.event_id == event_id))
+    rows = [{"event_id": event_id, "skill": s} for s in skills]
+    if rows:
+        connection.execute(insert(event_skill), rows)
+
+
+def skills_clause(skills: Iterable[str], match_all: bool = False):
+    """
+    Predicato su ``Event.id``: eventi che richiedono almeno una (o tutte, con
+    ``match_all``) delle skills. Il sottoselect è servito da ix_event_skill_skill_event.
+    """
+    wanted = list(dict.fromkeys(normalize_skill(s) for s in skills if normalize_skill(s)))
+    ids = select(event_skill.c.event_id).where(event_skill.c.skill.in_(wanted))
+    if match_all and len(wanted) > 1:
+        ids = ids.group_by(event_skill.c.event_id).having(func.count() == len(wanted))
+    return Event.id.in_(ids)
+
+
+def events_requiring(skills: Iterable[str], match_all: bool = False):
+    """Query degli eventi che richiedono una/tutte le skills indicate."""
+    return Event.query.filter(skills_clause(skills, match_all))
+
+
+def skills_by_event(event_ids=None) -> Dict[int, List[str]]:
+    """
+    {event_id: [skill, ...]} con una sola query. ``event_ids`` può essere una
+    lista di id o un SELECT di id (tutti gli eventi se None).
+    """
+    stmt = select(event_skill.c.event_id, event_skill.c.skill)
+    if event_ids is not None:
+        stmt = stmt.where(event_skill.c.event_id.in_(event_ids if isinstance(event_ids, Select) else list(event_ids)))
+    out: Dict[int, List[str]] = {}
+    for event_id, skill in db.session.execute(stmt):
+        out.setdefault(event_id, []).append(skill)
+    return out
+
+
+# ----------------- Hook del modello -----------------
+def _after_insert(mapper, connection, target) -> None:
+    set_event_skills(connection, target.id, parse_skills(target.skills))
+
+
+def _after_update(mapper, connection, target) -> None:
+    if inspect(target).attrs.skills.history.has_changes():
+        set_event_skills(connection, target.id, parse_skills(target.skills))
+
+
+def _after_delete(mapper, connection, target) -> None:
+    # Non tutti i DB applicano ON DELETE CASCADE (SQLite senza PRAGMA foreign_keys)
+    connection.execute(delete(event_skill).where(event_skill.c.event_id == target.id))
+
+
+def register_skill_hooks() -> None:
+    """Collega gli hook che tengono ``event_skill`` allineata a ``Event.skills``."""
+    global _hooks_registered
+    if _hooks_registered:
+        return
+    event.listen(Event, "after_insert", _after_insert)
+    event.listen(Event, "after_update", _after_update)
+    event.listen(Event, "after_delete", _after_delete)
+    _hooks_registered = True
@@ -0,0 +1,36 @@
+# app/utils/streams.py
+"""
+Stream SSE dell'utente: una sola connessione per pagina porta i messaggi di
+tutte le sue chat (canale ``user:<id>``) e le notifiche (``notifications:<id>``).
+
+Il trasporto è app.utils.pubsub; qui si sceglie a quali canali iscriversi e
+come recuperare dal DB quanto perso, per tipo di evento. Le route sono sottili
+(``notifications.notifications_stream``, con l'alias ``chat.stream``).
+"""
+from typing import Iterator, Optional
+
+from app.utils.chats import last_message_id, messages_since
+from app.utils.notifications import last_notification_id, notification_channel, notifications_since
+from app.utils.pubsub import decode_stream_cursor, sse_stream, subscribe, user_channel
+
+# Header delle risposte SSE (niente cache, niente buffering del proxy)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def user_stream(user_id: int, last_event_id: Optional[str] = None) -> Iterator[str]:
+    """Eventi SSE per l'utente, ripartendo dal cursore per tipo ``last_event_id`` se indicato."""
+    # Prima l'iscrizione, poi il recupero dal DB: nessun evento cade nel mezzo
+    sub = subscribe([user_channel(user_id), notification_channel(user_id)])
+    # Per ogni tipo: si riparte dal cursore del client, o dall'ultimo id esistente se non ne ha
+    # (lo stream lo manda subito come Last-Event-ID, così una riconnessione non perde nulla)
+    cursor = decode_stream_cursor(last_event_id)
+    backlog = []
+    if "message" in cursor:
+        backlog += messages_since(user_id, cursor["message"])
+    else:
+        cursor["message"] = last_message_id(user_id)
+    if "notification" in cursor:
+        backlog += notifications_since(user_id, cursor["notification"])
+    else:
+        cursor["notification"] = last_notification_id(user_id)
+    return sse_stream(sub, backlog, cursor=cursor)
@@ -0,0 +1,45 @@
+# gunicorn.conf.py
+"""
+Worker gevent: ogni pagina di un utente loggato tiene aperto lo stream SSE
+(chat + notifiche), e con worker a thread ogni connessione occuperebbe un
+thread finché la scheda resta aperta. Con gevent una connessione aperta è
+un greenlet in attesa, e il worker continua a servire le altre richieste.
+
+Con più worker pub/sub e cache delle pagine in processo (``memory://``)
+non sono condivisi: se non impostati, ``PUBSUB_URL`` usa il relay locale
+tcp:// (aperto all'avvio dal primo worker) e ``PAGE_CACHE_URL`` la cache su
+file; ``memory://`` esplicito viene rifiutato.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Connessioni contemporanee per worker (stream SSE compresi)
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "1000"))
+
+# Letto dall'app all'import, nei worker: va impostato qui, prima del fork
+if workers > 1:
+    os.environ.setdefault("PUBSUB_URL", "tcp://127.0.0.1:6390")
+    if os.environ["PUBSUB_URL"].startswith("memory://"):
+        raise RuntimeError(
+            f"PUBSUB_URL=memory:// non consegna tra {workers} worker: usare tcp://host:porta o WEB_CONCURRENCY=1"
+        )
+    # file:// senza percorso: directory temporanea condivisa (vedi app.utils.cache)
+    os.environ.setdefault("PAGE_CACHE_URL", "file://")
+    if os.environ["PAGE_CACHE_URL"].startswith("memory://"):
+        raise RuntimeError(
+            f"PAGE_CACHE_URL=memory:// non è condivisa tra {workers} worker: usare file:///percorso o null://"
+        )
+
+
+def post_fork(server, worker):
+    # psycopg2 è un'estensione C: senza questa patch una query blocca tutti i greenlet del worker
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Dopo il monkey-patching di gevent: il primo worker apre subito il relay, gli altri vi si collegano
+    from app.utils.pubsub import get_broker
+    get_broker()
@@ -45,6 +45,22 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Oggetti creati con SQL esplicito nelle migrazioni (indice di ricerca full-text:
+# tabella virtuale FTS5 con le sue tabelle ombra, indice GIN su PostgreSQL) e
+# assenti dai modelli: l'autogenerate non deve proporne il DROP. I trigger non
+# vengono riflessi da alembic, quindi non serve escluderli.
+EXCLUDED_TABLE_PREFIXES = ('search_document_fts',)
+EXCLUDED_INDEXES = ('ix_search_document_tsv',)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name.startswith(EXCLUDED_TABLE_PREFIXES):
+        return False
+    if type_ == 'index' and name in EXCLUDED_INDEXES:
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +81,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +110,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
@@ -0,0 +1,84 @@
+"""add geohash columns to geolocated models
+
+Revision ID: a7c2e4f9b310
+Revises: f1b6c8d2e907
+Create Date: 2026-10-18 15:22:47.106315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e4f9b310'
+down_revision = 'f1b6c8d2e907'
+branch_labels = None
+depends_on = None
+
+TABLES = ('event', 'campaign', 'report', 'petitions', 'user')
+
+# Copia di app.utils.geo.encode_geohash al momento della migrazione:
+# il backfill non deve cambiare se il codice dell'app cambia in seguito.
+GEOHASH_PRECISION = 9
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars = []
+    bits = nbits = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = bits * 2 + 1, mid
+            else:
+                bits, lng_hi = bits * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = bits * 2 + 1, mid
+            else:
+                bits, lat_hi = bits * 2, mid
+        even = not even
+        nbits += 1
+        if nbits == 5:
+            chars.append(_BASE32[bits])
+            bits = nbits = 0
+    return ''.join(chars)
+
+
+def _backfill(table_name):
+    bind = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        sa.column('latitude', sa.Float),
+        sa.column('longitude', sa.Float),
+        sa.column('geohash', sa.String),
+    )
+    rows = bind.execute(
+        sa.select(table.c.id, table.c.latitude, table.c.longitude)
+        .where(table.c.latitude.isnot(None), table.c.longitude.isnot(None))
+    ).all()
+    if rows:
+        bind.execute(
+            table.update().where(table.c.id == sa.bindparam('_id')),
+            [{'_id': r.id, 'geohash': encode_geohash(r.latitude, r.longitude)} for r in rows],
+        )
+
+
+def upgrade():
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table_name}_geohash'), ['geohash'], unique=False)
+        _backfill(table_name)
+
+
+def downgrade():
+    for table_name in reversed(TABLES):
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table_name}_geohash'))
+            batch_op.drop_column('geohash')
@@ -0,0 +1,32 @@
+"""association listing indexes (follows.association_id, user type/name/id)
+
+Revision ID: a9c7e3b5d418
+Revises: f4b1d6a8c392
+Create Date: 2026-10-18 20:05:17.382904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c7e3b5d418'
+down_revision = 'f4b1d6a8c392'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.create_index('ix_follows_association_id', ['association_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_type_name_id', ['user_type', 'name', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_type_name_id')
+
+    with op.batch_alter_table('follows', schema=None) as batch_op:
+        batch_op.drop_index('ix_follows_association_id')
@@ -0,0 +1,73 @@
+"""add event_skill table
+
+Revision ID: b3d8f1a6c524
+Revises: a7c2e4f9b310
+Create Date: 2026-10-18 16:48:03.552190
+
+"""
+import json
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f1a6c524'
+down_revision = 'a7c2e4f9b310'
+branch_labels = None
+depends_on = None
+
+# Copia di app.utils.skills (normalize_skill / parse_skills) al momento della
+# migrazione: il backfill non deve cambiare se il codice dell'app cambia in seguito.
+SKILL_MAX_LEN = 50
+
+
+def normalize_skill(name):
+    s = unicodedata.normalize('NFKD', str(name).lower())
+    s = ''.join(ch for ch in s if not unicodedata.combining(ch))
+    return s.strip().strip('"').strip()[:SKILL_MAX_LEN]
+
+
+def parse_skills(raw):
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if raw.startswith('['):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                raw = raw.strip('[]')
+        if isinstance(raw, str):
+            raw = raw.split(',')
+    return list(dict.fromkeys(s for s in (normalize_skill(x) for x in raw) if s))
+
+
+def upgrade():
+    event_skill = op.create_table('event_skill',
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('skill', sa.String(length=50), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('event_id', 'skill')
+    )
+    with op.batch_alter_table('event_skill', schema=None) as batch_op:
+        batch_op.create_index('ix_event_skill_skill_event', ['skill', 'event_id'], unique=False)
+
+    # Backfill dal testo esistente (lista JSON o CSV)
+    bind = op.get_bind()
+    event = sa.table('event', sa.column('id', sa.Integer), sa.column('skills', sa.Text))
+    rows = [
+        {'event_id': event_id, 'skill': skill}
+        for event_id, raw in bind.execute(sa.select(event.c.id, event.c.skills))
+        for skill in parse_skills(raw)
+    ]
+    if rows:
+        op.bulk_insert(event_skill, rows)
+
+
+def downgrade():
+    with op.batch_alter_table('event_skill', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_skill_skill_event')
+
+    op.drop_table('event_skill')
@@ -0,0 +1,51 @@
+"""add user.name_key for case-insensitive A-Z association listing
+
+Revision ID: c5e8d2a1f903
+Revises: a9c7e3b5d418
+Create Date: 2026-10-18 23:41:09.512337
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8d2a1f903'
+down_revision = 'a9c7e3b5d418'
+branch_labels = None
+depends_on = None
+
+
+# Copia di app.utils.associations.name_sort_key al momento della migrazione:
+# il backfill non deve cambiare se il codice dell'app cambia in seguito.
+def name_sort_key(name):
+    s = unicodedata.normalize('NFKD', (name or '').strip().casefold())
+    return ''.join(ch for ch in s if not unicodedata.combining(ch))
+
+
+def _backfill():
+    bind = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('name_key', sa.String))
+    rows = bind.execute(sa.select(user.c.id, user.c.name)).all()
+    if rows:
+        bind.execute(
+            user.update().where(user.c.id == sa.bindparam('_id')),
+            [{'_id': r.id, 'name_key': name_sort_key(r.name)} for r in rows],
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_key', sa.String(length=150), nullable=True))
+        batch_op.drop_index('ix_user_type_name_id')
+        batch_op.create_index('ix_user_type_name_key_id', ['user_type', 'name_key', 'id'], unique=False)
+    _backfill()
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_type_name_key_id')
+        batch_op.create_index('ix_user_type_name_id', ['user_type', 'name', 'id'], unique=False)
+        batch_op.drop_column('name_key')
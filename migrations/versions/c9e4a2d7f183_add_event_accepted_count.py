@@ -0,0 +1,33 @@
+"""add denormalized accepted_count to event
+
+Revision ID: c9e4a2d7f183
+Revises: b3d8f1a6c524
+Create Date: 2026-10-18 17:31:56.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a2d7f183'
+down_revision = 'b3d8f1a6c524'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('accepted_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill dai dati esistenti
+    op.execute(
+        "UPDATE event SET accepted_count = "
+        "(SELECT COUNT(*) FROM participation "
+        "WHERE participation.event_id = event.id AND participation.status = 'accepted')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_column('accepted_count')
@@ -0,0 +1,26 @@
+"""add participation (event_id, status, applied_at) index for the waitlist
+
+Revision ID: d2f7b9e4a615
+Revises: c9e4a2d7f183
+Create Date: 2026-10-18 18:12:40.503917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f7b9e4a615'
+down_revision = 'c9e4a2d7f183'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('participation', schema=None) as batch_op:
+        batch_op.create_index('ix_participation_event_status_applied', ['event_id', 'status', 'applied_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('participation', schema=None) as batch_op:
+        batch_op.drop_index('ix_participation_event_status_applied')
@@ -0,0 +1,71 @@
+"""add search_document table with FTS5 / tsvector index
+
+Revision ID: d84e2b9f5a31
+Revises: c3d1a7e40b12
+Create Date: 2026-10-18 11:02:47.530912
+
+Dopo l'upgrade popolare l'indice con `flask search reindex`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd84e2b9f5a31'
+down_revision = 'c3d1a7e40b12'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_document_fts USING fts5("
+    "body, content='search_document', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN "
+    "INSERT INTO search_document_fts(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_document_au AFTER UPDATE ON search_document BEGIN "
+    "INSERT INTO search_document_fts(search_document_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_document_fts(rowid, body) VALUES (new.id, new.body); END",
+]
+
+
+def upgrade():
+    op.create_table(
+        'search_document',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doc_type', sa.String(length=20), nullable=False),
+        sa.Column('doc_id', sa.Integer(), nullable=False),
+        sa.Column('association_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('doc_type', 'doc_id', name='uq_search_document_item'),
+    )
+    with op.batch_alter_table('search_document', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_document_association_id'), ['association_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for stmt in SQLITE_FTS_DDL:
+            op.execute(stmt)
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_search_document_tsv "
+            "ON search_document USING gin (to_tsvector('simple', body))"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_document_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_search_document_tsv")
+
+    with op.batch_alter_table('search_document', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_search_document_association_id'))
+
+    op.drop_table('search_document')
@@ -0,0 +1,32 @@
+"""add denormalized applause_count to post
+
+Revision ID: e5a90c3b7d46
+Revises: d84e2b9f5a31
+Create Date: 2026-10-18 11:48:20.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a90c3b7d46'
+down_revision = 'd84e2b9f5a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('applause_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill dai dati esistenti
+    op.execute(
+        "UPDATE post SET applause_count = "
+        "(SELECT COUNT(*) FROM applause WHERE applause.post_id = post.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('applause_count')
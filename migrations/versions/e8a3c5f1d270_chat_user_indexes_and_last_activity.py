@@ -0,0 +1,33 @@
+"""chat user indexes and last_activity_at
+
+Revision ID: e8a3c5f1d270
+Revises: d2f7b9e4a615
+Create Date: 2026-10-18 18:47:09.115283
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c5f1d270'
+down_revision = 'd2f7b9e4a615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+        batch_op.create_index(batch_op.f('ix_chats_user1_id'), ['user1_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_chats_user2_id'), ['user2_id'], unique=False)
+
+    # Backfill: l'ultima attività nota è la creazione
+    op.execute("UPDATE chats SET last_activity_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_chats_user2_id'))
+        batch_op.drop_index(batch_op.f('ix_chats_user1_id'))
+        batch_op.drop_column('last_activity_at')
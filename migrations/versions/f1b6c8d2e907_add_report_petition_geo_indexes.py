@@ -0,0 +1,32 @@
+"""add geo indexes on report and petitions
+
+Revision ID: f1b6c8d2e907
+Revises: e5a90c3b7d46
+Create Date: 2026-10-18 14:05:12.381904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b6c8d2e907'
+down_revision = 'e5a90c3b7d46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('report', schema=None) as batch_op:
+        batch_op.create_index('ix_report_geo', ['latitude', 'longitude'], unique=False)
+
+    with op.batch_alter_table('petitions', schema=None) as batch_op:
+        batch_op.create_index('ix_petition_geo', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('petitions', schema=None) as batch_op:
+        batch_op.drop_index('ix_petition_geo')
+
+    with op.batch_alter_table('report', schema=None) as batch_op:
+        batch_op.drop_index('ix_report_geo')
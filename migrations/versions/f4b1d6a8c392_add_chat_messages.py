@@ -0,0 +1,38 @@
+"""add chat_messages
+
+Revision ID: f4b1d6a8c392
+Revises: e8a3c5f1d270
+Create Date: 2026-10-18 19:26:33.640158
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b1d6a8c392'
+down_revision = 'e8a3c5f1d270'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('chat_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['sender_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_chat_id_id', ['chat_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_chat_id_id')
+
+    op.drop_table('chat_messages')
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark del feed della home: percorso storico (tutto il feed in memoria +
+filtri in Python) contro get_feed_page con filtri nel DB.
+
+Crea un DB SQLite temporaneo con ~100k item (eventi, post, campagne) e misura
+la prima pagina per alcune combinazioni di filtri.
+
+    python scripts/bench_feed.py [--items 100000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _seed(db, n_items: int, n_assoc: int = 200) -> None:
+    from app.database.models.user import User
+    from app.database.models.event import Event
+    from app.database.models.post import Post
+    from app.database.models.campaign import Campaign
+
+    rnd = random.Random(42)
+    words = ["città", "perché", "ambiente", "scuola", "cibo", "sport", "anziani", "parco", "mare", "libri"]
+    base = datetime(2024, 1, 1)
+
+    db.session.execute(db.insert(User), [
+        {"email": f"assoc{i}@bench.local", "password": "x", "name": f"Associazione {i} {rnd.choice(words)}",
+         "user_type": "association", "consenso_dati": True, "accetta_termini": True}
+        for i in range(n_assoc)
+    ])
+    per_kind = n_items // 3
+
+    def text():
+        return " ".join(rnd.choice(words) for _ in range(12))
+
+    def ts():
+        return base + timedelta(minutes=rnd.randrange(60 * 24 * 700))
+
+    db.session.execute(db.insert(Event), [
+        {"title": f"Evento {i} {rnd.choice(words)}", "description": text(), "date": ts(), "location": "Milano",
+         "association_id": rnd.randrange(1, n_assoc + 1), "skills": "[]", "duration": "temporary", "type": "event",
+         "created_at": base, "updated_at": base}
+        for i in range(per_kind)
+    ])
+    db.session.execute(db.insert(Post), [
+        {"title": f"Post {i} {rnd.choice(words)}", "content": text(), "created_at": ts(),
+         "association_id": rnd.randrange(1, n_assoc + 1)}
+        for i in range(per_kind)
+    ])
+    db.session.execute(db.insert(Campaign), [
+        {"title": f"Campagna {i} {rnd.choice(words)}", "description": text(), "date": base, "created_at": ts(),
+         "updated_at": base, "duration": "temporary", "association_id": rnd.randrange(1, n_assoc + 1)}
+        for i in range(per_kind)
+    ])
+    db.session.commit()
+
+
+def _legacy_page(types, assoc_ids, q, page_size):
+    """Replica del vecchio home.home: carica tutto il feed e filtra in Python."""
+    from app.database.models.event import Event
+    from app.database.models.post import Post
+    from app.database.models.campaign import Campaign
+    from app.utils.feed import _feed_entry, _normalize
+
+    feed_items = [_feed_entry("event", e) for e in Event.query.order_by(Event.date.desc()).all()]
+    feed_items += [_feed_entry("post", p) for p in Post.query.order_by(Post.created_at.desc()).all()]
+    feed_items += [_feed_entry("campaign", c) for c in Campaign.query.order_by(Campaign.created_at.desc()).all()]
+    feed_items.sort(key=lambda x: x["timestamp"], reverse=True)
+
+    if types:
+        feed_items = [it for it in feed_items if it.get("type") in types]
+    if assoc_ids:
+        feed_items = [it for it in feed_items if str(it["item"].association.id) in assoc_ids]
+    if q:
+        tokens = [_normalize(t) for t in q.split() if t.strip()]
+        feed_items = [it for it in feed_items if all(tok in _search_text(it["item"]) for tok in tokens)]
+    return feed_items[:page_size]
+
+
+def _search_text(obj) -> str:
+    """Testo di ricerca come lo costruiva il vecchio collect_search_text."""
+    from app.utils.feed import _normalize
+
+    parts = [str(getattr(obj, a)).strip().lower()
+             for a in ("title", "name", "description", "content", "location", "address", "city", "category")
+             if getattr(obj, a, None)]
+    skills = getattr(obj, "skills", None)
+    if isinstance(skills, (list, tuple, set)):
+        parts.extend(str(s).lower() for s in skills)
+    elif skills:
+        parts.append(str(skills).lower())
+    assoc = getattr(obj, "association", None)
+    if assoc and getattr(assoc, "name", None):
+        parts.append(assoc.name.strip().lower())
+    return _normalize(" ".join(parts))
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="volo-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from app import create_app, db
+    from app.utils.feed import FEED_PAGE_SIZE, get_feed_page
+    from app.utils.search import reindex_all
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"Seeding {args.items} item in {tmpdir} ...")
+        _seed(db, args.items)
+        reindex_all()
+
+        scenarios = [
+            ("nessun filtro", [], [], ""),
+            ("type=post", ["post"], [], ""),
+            ("association_id=7", [], ["7"], ""),
+            ("q='parco'", [], [], "parco"),
+            ("q='scuola mare'", [], [], "scuola mare"),
+            ("q='4242' (raro)", [], [], "4242"),
+        ]
+        print(f"{'scenario':<22}{'storico (s)':>14}{'nuovo (s)':>12}{'speed-up':>11}")
+        for label, types, assoc_ids, q in scenarios:
+            legacy = _timeit(lambda: (_legacy_page(types, assoc_ids, q, FEED_PAGE_SIZE), db.session.expunge_all()),
+                             args.repeat)
+            new = _timeit(lambda: (get_feed_page(types=types, association_ids=[int(a) for a in assoc_ids], q=q),
+                                   db.session.expunge_all()), args.repeat)
+            print(f"{label:<22}{legacy:>14.3f}{new:>12.4f}{legacy / new:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark del matching volontari <-> eventi (app.utils.matching).
+
+Genera in memoria ~100k volontari e ~10k eventi nel nord Italia e misura:
+- tutti gli eventi contro un volontario (rank_events);
+- tutti i volontari contro un evento (rank_volunteers);
+- lo stesso calcolo "ingenuo" su set di stringhe e haversine, come riferimento.
+
+Poi, su un DB SQLite temporaneo (``--db-volunteers``, 0 per saltare), il
+percorso completo delle pagine: suggested_volunteers e suggested_events,
+query comprese.
+
+    python scripts/bench_matching.py [--volunteers 100000] [--events 10000] [--repeat 5]
+                                     [--db-volunteers 20000] [--db-events 2000]
+"""
+import argparse
+import heapq
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.geo import haversine_km  # noqa: E402
+from app.utils.matching import (  # noqa: E402
+    AVAILABILITY_WEIGHT, DISTANCE_WEIGHT, MATCH_DISTANCE_SCALE_KM, MATCH_MAX_KM, NEUTRAL_AVAILABILITY,
+    NEUTRAL_DISTANCE, NEUTRAL_SKILL, SKILL_KEYWORDS, SKILL_WEIGHT, MatchProfile, availability_mask,
+    rank_events, rank_volunteers, skill_mask,
+)
+
+SKILLS = list(SKILL_KEYWORDS)
+AVAILABILITY = ["", "weekend", "sabato", "lunedì e mercoledì sera", "tutti i giorni", "feriali", "domenica mattina"]
+
+
+def _raw_people(n: int, rnd: random.Random, max_skills: int):
+    people = []
+    for i in range(n):
+        located = rnd.random() < 0.9
+        people.append({
+            "id": i + 1,
+            "lat": rnd.uniform(44.0, 46.5) if located else None,
+            "lng": rnd.uniform(7.5, 12.5) if located else None,
+            "skills": rnd.sample(SKILLS, rnd.randint(0, max_skills)),
+            "availability": rnd.choice(AVAILABILITY),
+        })
+    return people
+
+
+def _profiles(raw):
+    return [
+        MatchProfile(p["id"], p["lat"], p["lng"], skill_mask(p["skills"]), availability_mask(p["availability"]))
+        for p in raw
+    ]
+
+
+def _naive_rank(anchor, candidates, anchor_is_event, limit=6):
+    """Riferimento: set di stringhe e haversine su ogni coppia."""
+    scored = []
+    for c in candidates:
+        if anchor["lat"] is not None and c["lat"] is not None:
+            d = haversine_km(anchor["lat"], anchor["lng"], c["lat"], c["lng"])
+            if d > MATCH_MAX_KM:
+                continue
+            dist_score = math.exp(-d / MATCH_DISTANCE_SCALE_KM)
+        else:
+            dist_score = NEUTRAL_DISTANCE
+        required, offered = (anchor, c) if anchor_is_event else (c, anchor)
+        req = set(required["skills"])
+        skill_score = len(req & set(offered["skills"])) / len(req) if req else NEUTRAL_SKILL
+        a_days, c_days = anchor["days"], c["days"]
+        avail_score = NEUTRAL_AVAILABILITY if not (a_days and c_days) else (1.0 if a_days & c_days else 0.0)
+        scored.append((SKILL_WEIGHT * skill_score + DISTANCE_WEIGHT * dist_score + AVAILABILITY_WEIGHT * avail_score,
+                       c["id"]))
+    return heapq.nlargest(limit, scored, key=lambda s: (s[0], -s[1]))
+
+
+def _timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _seed_db(db, n_volunteers: int, n_events: int, rnd: random.Random) -> None:
+    from app.database.models.event import Event, event_skill
+    from app.database.models.participation import Participation
+    from app.database.models.user import User
+    from app.utils.geo import encode_geohash
+
+    def point():
+        if rnd.random() < 0.9:
+            lat, lng = rnd.uniform(44.0, 46.5), rnd.uniform(7.5, 12.5)
+            return lat, lng, encode_geohash(lat, lng)
+        return None, None, None
+
+    n_assoc = 50
+    users = [{"email": f"assoc{i}@bench.local", "password": "x", "name": f"Associazione {i}",
+              "user_type": "association", "consenso_dati": True, "accetta_termini": True} for i in range(n_assoc)]
+    for i in range(n_volunteers):
+        lat, lng, gh = point()
+        users.append({"email": f"vol{i}@bench.local", "password": "x", "name": f"Volontario {i}",
+                      "user_type": "volunteer", "consenso_dati": True, "accetta_termini": True,
+                      "latitude": lat, "longitude": lng, "geohash": gh,
+                      "bio": rnd.choice(["", "amo il computer e i social", "patente B, magazzino", "accoglienza"]),
+                      "disponibilita": rnd.choice(AVAILABILITY)})
+    db.session.execute(db.insert(User), users)
+
+    now = datetime.utcnow()
+    events = []
+    for i in range(n_events):
+        lat, lng, gh = point()
+        # Un terzo passati (storico dei volontari), il resto futuri (candidati)
+        when = now + timedelta(days=rnd.randint(-365, -1) if i % 3 == 0 else rnd.randint(1, 120))
+        events.append({"title": f"Evento {i}", "description": "x", "date": when, "location": "Nord Italia",
+                       "latitude": lat, "longitude": lng, "geohash": gh, "association_id": rnd.randint(1, n_assoc),
+                       "skills": "[]", "duration": "temporary", "type": "event", "created_at": now, "updated_at": now})
+    db.session.execute(db.insert(Event), events)
+    db.session.execute(db.insert(event_skill), [
+        {"event_id": e, "skill": s} for e in range(1, n_events + 1) for s in rnd.sample(SKILLS, rnd.randint(0, 3))
+    ])
+    past = list(range(1, n_events + 1, 3))
+    db.session.execute(db.insert(Participation), [
+        {"volunteer_id": v, "event_id": e, "status": "accepted", "applied_at": now, "updated_at": now}
+        for v in range(n_assoc + 1, n_assoc + n_volunteers + 1) for e in rnd.sample(past, rnd.randint(0, 3))
+    ])
+    db.session.commit()
+
+
+def _bench_db(args, rnd: random.Random) -> None:
+    tmpdir = tempfile.mkdtemp(prefix="volo-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from app import create_app, db
+    from app.database.models.event import Event
+    from app.database.models.user import User
+    from app.utils.matching import suggested_events, suggested_volunteers
+    from app.utils.query_counter import count_queries
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"\nSeeding {args.db_volunteers} volontari e {args.db_events} eventi in {tmpdir} ...")
+        _seed_db(db, args.db_volunteers, args.db_events, rnd)
+
+        events = Event.query.filter(Event.date >= datetime.utcnow(), Event.latitude.isnot(None)).limit(5).all()
+        users = User.query.filter(User.user_type == "volunteer", User.latitude.isnot(None)).limit(5).all()
+        print(f"{'scenario (DB, end to end)':<34}{'tempo (s)':>13}{'query':>8}")
+        for label, fn, items in (("suggested_volunteers", suggested_volunteers, events),
+                                 ("suggested_events", suggested_events, users)):
+            best, queries = float("inf"), 0
+            for _ in range(args.repeat):
+                for item in items:
+                    with count_queries() as counter:
+                        start = time.perf_counter()
+                        fn(item)
+                        best = min(best, time.perf_counter() - start)
+                    queries = max(queries, counter.count)
+            print(f"{label:<34}{best:>13.4f}{queries:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--volunteers", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db-volunteers", type=int, default=20_000)
+    parser.add_argument("--db-events", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    raw_volunteers = _raw_people(args.volunteers, rnd, max_skills=4)
+    raw_events = _raw_people(args.events, rnd, max_skills=3)
+    for e in raw_events:
+        e["availability"] = rnd.choice(["lunedì", "martedì", "mercoledì", "giovedì", "venerdì", "sabato", "domenica"])
+    for p in raw_volunteers + raw_events:
+        p["days"] = availability_mask(p["availability"])
+
+    start = time.perf_counter()
+    volunteers, events = _profiles(raw_volunteers), _profiles(raw_events)
+    print(f"Profili: {args.volunteers} volontari, {args.events} eventi in {time.perf_counter() - start:.2f}s")
+
+    v_anchor, e_anchor = volunteers[0], events[0]
+    # Stessi punteggi (a meno dell'approssimazione equirettangolare della distanza)
+    fast_scores = [s for _, s, _ in rank_events(v_anchor, events)]
+    naive_scores = [s for s, _ in _naive_rank(raw_volunteers[0], raw_events, False)]
+    assert all(abs(a - b) < 1e-3 for a, b in zip(fast_scores, naive_scores)), (fast_scores, naive_scores)
+
+    print(f"{'scenario':<34}{'ingenuo (s)':>13}{'bitset (s)':>12}{'speed-up':>10}")
+    scenarios = [
+        ("eventi per 1 volontario", lambda: _naive_rank(raw_volunteers[0], raw_events, False),
+         lambda: rank_events(v_anchor, events)),
+        ("volontari per 1 evento", lambda: _naive_rank(raw_events[0], raw_volunteers, True),
+         lambda: rank_volunteers(e_anchor, volunteers)),
+    ]
+    for label, naive, fast in scenarios:
+        t_naive, t_fast = _timeit(naive, args.repeat), _timeit(fast, args.repeat)
+        print(f"{label:<34}{t_naive:>13.4f}{t_fast:>12.4f}{t_naive / t_fast:>9.1f}x")
+
+    if args.db_volunteers:
+        _bench_db(args, rnd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark delle ricevute PDF: setup ricostruito a ogni ricevuta (comportamento
+storico di generate_receipt) contro il ReceiptRenderer condiviso.
+
+Misura la latenza di una singola ricevuta e il throughput (ricevute/s) su un
+lotto; i PDF vengono scritti in memoria, non su disco.
+
+    python scripts/bench_receipts.py [--batch 200] [--repeat 20]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from reportlab.platypus import Image  # noqa: E402
+
+from app.utils.pdf_generator import LOGO_MAX_SIZE, LOGO_PATH, ReceiptRenderer  # noqa: E402
+
+
+class _PerCallRenderer(ReceiptRenderer):
+    """Come prima: stili/TableStyle ricostruiti, logo a piena risoluzione e immagini ASCII85."""
+
+    use_a85 = True
+
+    def _logo_flowable(self):
+        if not LOGO_PATH:
+            return None
+        img = Image(str(LOGO_PATH))
+        img._restrictSize(*LOGO_MAX_SIZE)
+        return img
+
+
+def _legacy(donation, campaign) -> None:
+    _PerCallRenderer(logo_path=None).render(donation, campaign, BytesIO())
+
+
+def _fake(i: int):
+    association = SimpleNamespace(name=f"Associazione {i % 50}", tax_id="01234567890", address="Via Roma 1, Milano")
+    campaign = SimpleNamespace(title=f"Campagna {i % 200}", association=association)
+    donation = SimpleNamespace(id=i, full_name=f"Donatore {i}", email=f"d{i}@example.org",
+                               amount=10 + i % 90, method="card", created_at=datetime(2025, 1, 1))
+    return donation, campaign
+
+
+def _per_second(fn, items) -> float:
+    start = time.perf_counter()
+    for donation, campaign in items:
+        fn(donation, campaign)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    renderer = ReceiptRenderer()
+
+    def shared(donation, campaign):
+        renderer.render(donation, campaign, BytesIO())
+
+    single = [_fake(1)] * args.repeat
+    batch = [_fake(i) for i in range(1, args.batch + 1)]
+
+    # warm-up (import lazy di ReportLab, font)
+    _legacy(*_fake(0))
+    shared(*_fake(0))
+
+    print(f"{'scenario':<28}{'prima':>12}{'dopo':>12}{'speed-up':>11}")
+    for label, items in ((f"singola (x{args.repeat})", single), (f"lotto ({args.batch})", batch)):
+        before = _per_second(_legacy, items)
+        after = _per_second(shared, items)
+        print(f"{label:<28}{before:>9.1f}/s{after:>9.1f}/s{after / before:>10.1f}x")
+
+    size_before, size_after = BytesIO(), BytesIO()
+    _PerCallRenderer(logo_path=None).render(*_fake(1), size_before)
+    renderer.render(*_fake(1), size_after)
+    print(f"dimensione PDF: {len(size_before.getvalue()) / 1024:.0f} KiB -> {len(size_after.getvalue()) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# tests/conftest.py
+"""
+Fixture comuni: app su un DB SQLite temporaneo con un piccolo dataset
+(associazioni, volontari, eventi, post, campagne, partecipazioni,
+donazioni, segnalazioni) e client già autenticati.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# Configurazione letta da create_app(): va impostata prima dell'import
+os.environ.setdefault("PAGE_CACHE_URL", "null://")
+os.environ.setdefault("PUBSUB_URL", "memory://")
+
+# Righe per tipo: abbastanza perché un caricamento lazy per riga sfori i limiti
+ROWS_PER_KIND = 15
+
+
+def _seed(db) -> dict:
+    from app.database.models import Campaign, Donation, Event, Participation, Post, Report, User
+
+    base = datetime.utcnow()
+    associations = [
+        User(email=f"assoc{i}@test.local", password="x", name=f"Associazione {i}", user_type="association")
+        for i in range(3)
+    ]
+    volunteers = [
+        User(email=f"vol{i}@test.local", password="x", name=f"Volontario {i}", user_type="volunteer",
+             latitude=45.46, longitude=9.19)
+        for i in range(3)
+    ]
+    db.session.add_all(associations + volunteers)
+    db.session.flush()
+
+    events, campaigns = [], []
+    for i in range(ROWS_PER_KIND):
+        assoc = associations[i % len(associations)]
+        # Metà passati e metà futuri: riempiono sia le partecipazioni sia lo storico
+        when = base + timedelta(days=i - ROWS_PER_KIND // 2)
+        events.append(Event(title=f"Evento {i}", description="Descrizione", date=when, location="Milano",
+                            latitude=45.46, longitude=9.19, association_id=assoc.id, skills="cucina,guida"))
+        campaigns.append(Campaign(title=f"Campagna {i}", description="Raccolta", date=when,
+                                  association_id=assoc.id))
+        db.session.add(Post(title=f"Post {i}", content="Contenuto", association_id=assoc.id,
+                            created_at=base - timedelta(hours=i)))
+    db.session.add_all(events + campaigns)
+    db.session.flush()
+
+    for i, event in enumerate(events):
+        for vol in volunteers:
+            db.session.add(Participation(volunteer_id=vol.id, event_id=event.id,
+                                         status="accepted" if i % 2 else "pending"))
+    for i, campaign in enumerate(campaigns):
+        vol = volunteers[i % len(volunteers)]
+        db.session.add(Donation(user_id=vol.id, campaign_id=campaign.id, full_name=vol.name, email=vol.email,
+                                amount=10 + i, method="card"))
+    for i in range(ROWS_PER_KIND):
+        db.session.add(Report(title=f"Segnalazione {i}", description="Buca", latitude=45.46, longitude=9.19,
+                              user_id=volunteers[i % len(volunteers)].id))
+    for vol in volunteers:
+        vol.followed_associations.extend(associations)
+    db.session.commit()
+
+    return {
+        "association_ids": [a.id for a in associations],
+        "volunteer_ids": [v.id for v in volunteers],
+    }
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("db") / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        app.config["SEED"] = _seed(db)
+    yield app
+
+
+@pytest.fixture
+def seed(app) -> dict:
+    return app.config["SEED"]
+
+
+@pytest.fixture
+def login(app):
+    """Ritorna un client di test autenticato come l'utente indicato."""
+    def _login(user_id: int):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
+        return client
+
+    return _login
@@ -0,0 +1,128 @@
+# tests/test_participation.py
+"""
+Capienza degli eventi sotto concorrenza: molti thread prenotano posti dello
+stesso evento (reserve_seat) o annullano in parallelo con la lista d'attesa
+piena (promote_waitlist). Gli accettati non superano mai la capienza, il
+contatore coincide con le righe e la coda è servita in ordine FIFO.
+"""
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.database.models import Event, Participation, User
+from app.utils.participation import WAITLIST_STATUS, remove_participation, reserve_seat
+
+THREADS = 8
+CAPACITY = 5
+VOLUNTEERS = 24
+
+_seq = itertools.count()
+
+
+def _run_threads(app, work_items, action) -> list:
+    """
+    Esegue ``action(item)`` + commit per ogni item, ripartiti su THREADS thread
+    che partono insieme. Ritorna gli item per cui ``action`` ha restituito True.
+    """
+    barrier = threading.Barrier(THREADS)
+    done, errors = [], []
+
+    def worker(items):
+        with app.app_context():
+            barrier.wait()
+            for item in items:
+                for _ in range(100):  # SQLite: "database is locked" tra writer concorrenti -> si riprova
+                    try:
+                        ok = action(item)
+                        db.session.commit()
+                        break
+                    except OperationalError:
+                        db.session.rollback()
+                        time.sleep(0.005)
+                else:
+                    errors.append(item)
+                    continue
+                if ok:
+                    done.append(item)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(work_items[i::THREADS],)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, f"{len(errors)} operazioni mai riuscite"
+    return done
+
+
+@pytest.fixture
+def capacity_event(app):
+    """Evento a numero chiuso con VOLUNTEERS volontari dedicati: (event_id, volunteer_ids)."""
+    n = next(_seq)
+    with app.app_context():
+        assoc = User(email=f"assoc-cap{n}@test.local", password="x", name=f"Associazione capienza {n}",
+                     user_type="association")
+        volunteers = [
+            User(email=f"vol-cap{n}-{i}@test.local", password="x", name=f"Volontario capienza {i}",
+                 user_type="volunteer")
+            for i in range(VOLUNTEERS)
+        ]
+        db.session.add_all([assoc, *volunteers])
+        db.session.flush()
+        event = Event(title=f"Evento a numero chiuso {n}", description="", date=datetime.utcnow() + timedelta(days=7),
+                      location="Milano", association_id=assoc.id, capacity_max=CAPACITY)
+        db.session.add(event)
+        db.session.commit()
+        return event.id, [v.id for v in volunteers]
+
+
+def _accepted_rows(event_id: int) -> list:
+    return db.session.execute(
+        db.select(Participation.id)
+        .where(Participation.event_id == event_id, Participation.status == "accepted")
+        .order_by(Participation.id)
+    ).scalars().all()
+
+
+def test_reserve_seat_concurrent(app, capacity_event):
+    event_id, _ = capacity_event
+    attempts = list(range(THREADS * 6))
+
+    reserved = _run_threads(app, attempts, lambda _: reserve_seat(event_id))
+
+    assert len(reserved) == CAPACITY
+    with app.app_context():
+        assert db.session.get(Event, event_id).accepted_count == CAPACITY
+
+
+def test_waitlist_promoted_in_order(app, capacity_event):
+    event_id, volunteer_ids = capacity_event
+    start = datetime.utcnow()
+    with app.app_context():
+        # I primi CAPACITY accettati, tutti gli altri in lista d'attesa con applied_at crescente
+        parts = [
+            Participation(volunteer_id=vid, event_id=event_id,
+                          status="accepted" if i < CAPACITY else WAITLIST_STATUS,
+                          applied_at=start + timedelta(seconds=i))
+            for i, vid in enumerate(volunteer_ids)
+        ]
+        db.session.add_all(parts)
+        db.session.get(Event, event_id).accepted_count = CAPACITY
+        db.session.commit()
+        part_ids = [p.id for p in parts]
+
+    def cancel(part_id):
+        remove_participation(db.session.get(Participation, part_id))
+        return True
+
+    _run_threads(app, part_ids[:CAPACITY], cancel)
+
+    with app.app_context():
+        accepted = _accepted_rows(event_id)
+        assert accepted == part_ids[CAPACITY:2 * CAPACITY]
+        assert db.session.get(Event, event_id).accepted_count == CAPACITY
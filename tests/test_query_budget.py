@@ -0,0 +1,40 @@
+# tests/test_query_budget.py
+"""
+Tetto di query SQL per le pagine che attraversano relazioni riga per riga:
+se un profilo di app/database/loaders.py smette di essere applicato (o un
+template introduce un accesso lazy), il numero di query cresce con le righe
+e l'asserzione fallisce.
+"""
+from flask import url_for
+
+from app import db
+from app.utils.query_counter import assert_max_queries
+
+
+def _get(app, client, endpoint, limit, **values):
+    with app.test_request_context():
+        url = url_for(endpoint, **values)
+        engine = db.engine
+    with assert_max_queries(limit, engine=engine, label=endpoint):
+        resp = client.get(url, follow_redirects=True)
+    assert resp.status_code == 200, f"{url}: {resp.status_code}"
+
+
+def test_home_feed(app, seed, login):
+    _get(app, login(seed["volunteer_ids"][0]), "home.home", 7)
+
+
+def test_dashboard_volunteer(app, seed, login):
+    _get(app, login(seed["volunteer_ids"][0]), "dashboard.dashboard", 12)
+
+
+def test_dashboard_association(app, seed, login):
+    _get(app, login(seed["association_ids"][0]), "dashboard.dashboard", 9)
+
+
+def test_association_public_profile(app, seed):
+    _get(app, app.test_client(), "public.public_profile", 5, association_id=seed["association_ids"][0])
+
+
+def test_volunteer_public_profile(app, seed):
+    _get(app, app.test_client(), "volunteers.public_profile", 4, volunteer_id=seed["volunteer_ids"][0])